@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""Incrementally maintained cohort analytics for assessment results
+
+Every call to /api/analyze folds its per-trait results into running sums, counters
+and fixed-width histograms, so reading the statistics for a trait costs the same
+no matter how many assessments have been recorded. The raw results are also kept
+in an append-only log which `python analytics.py rebuild` replays for backfills.
+"""
+import argparse
+import json
+import math
+import sys
+import time
+import uuid
+
+import storage
+
+DB_NAME = 'analytics'
+
+# Scores live on a 0-2 scale, self-rating gaps (self-rating minus scenario average) on -2..2
+SCORE_BIN_WIDTH = 0.25
+SCORE_BINS = 8
+GAP_BIN_WIDTH = 0.5
+GAP_BINS = 8
+GAP_MIN = -2.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS assessment_log (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    results TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trait_totals (
+    trait TEXT PRIMARY KEY,
+    n INTEGER NOT NULL DEFAULT 0,
+    sum_score REAL NOT NULL DEFAULT 0,
+    sum_score_sq REAL NOT NULL DEFAULT 0,
+    sum_consistency REAL NOT NULL DEFAULT 0,
+    sum_agreement REAL NOT NULL DEFAULT 0,
+    sum_gap REAL NOT NULL DEFAULT 0,
+    sum_abs_gap REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS trait_patterns (
+    trait TEXT NOT NULL,
+    pattern TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (trait, pattern)
+);
+CREATE TABLE IF NOT EXISTS trait_histograms (
+    trait TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (trait, kind, bucket)
+);
+"""
+
+
+def _connect():
+    return storage.connect(DB_NAME, SCHEMA)
+
+
+def _bucket(value, lower, width, bins):
+    """Map a value onto a fixed-width histogram bucket, clamping the edges"""
+    index = int((value - lower) / width)
+    return min(max(index, 0), bins - 1)
+
+
+def _apply_results(conn, results):
+    """Fold one assessment's per-trait results into the running aggregates"""
+    for trait, result in results.items():
+        score = float(result['score'])
+        gap = float(result['verification']) - score
+
+        conn.execute(
+            """INSERT INTO trait_totals (trait, n, sum_score, sum_score_sq, sum_consistency, sum_agreement, sum_gap, sum_abs_gap)
+               VALUES (?, 1, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(trait) DO UPDATE SET
+                   n = n + 1,
+                   sum_score = sum_score + excluded.sum_score,
+                   sum_score_sq = sum_score_sq + excluded.sum_score_sq,
+                   sum_consistency = sum_consistency + excluded.sum_consistency,
+                   sum_agreement = sum_agreement + excluded.sum_agreement,
+                   sum_gap = sum_gap + excluded.sum_gap,
+                   sum_abs_gap = sum_abs_gap + excluded.sum_abs_gap""",
+            (trait, score, score * score, float(result['consistency']), float(result['agreement']), gap, abs(gap))
+        )
+        conn.execute(
+            """INSERT INTO trait_patterns (trait, pattern, count) VALUES (?, ?, 1)
+               ON CONFLICT(trait, pattern) DO UPDATE SET count = count + 1""",
+            (trait, result['pattern'])
+        )
+        for kind, bucket in (
+            ('score', _bucket(score, 0.0, SCORE_BIN_WIDTH, SCORE_BINS)),
+            ('gap', _bucket(gap, GAP_MIN, GAP_BIN_WIDTH, GAP_BINS)),
+        ):
+            conn.execute(
+                """INSERT INTO trait_histograms (trait, kind, bucket, count) VALUES (?, ?, ?, 1)
+                   ON CONFLICT(trait, kind, bucket) DO UPDATE SET count = count + 1""",
+                (trait, kind, bucket)
+            )
+
+
+def record_results(results, assessment_id=None):
+    """Log an assessment's results and update the cohort aggregates in one transaction"""
+    if not results:
+        return None
+    assessment_id = assessment_id or uuid.uuid4().hex
+    conn = _connect()
+    with storage.transaction(conn):
+        conn.execute(
+            'INSERT OR IGNORE INTO assessment_log (id, created_at, results) VALUES (?, ?, ?)',
+            (assessment_id, time.time(), json.dumps(results))
+        )
+        _apply_results(conn, results)
+    return assessment_id
+
+
+def _histogram(rows, lower, width, bins):
+    counts = [0] * bins
+    for row in rows:
+        counts[row['bucket']] = row['count']
+    return [
+        {'range': [round(lower + i * width, 2), round(lower + (i + 1) * width, 2)], 'count': counts[i]}
+        for i in range(bins)
+    ]
+
+
+def get_trait_stats(trait):
+    """Return population statistics for one trait, or None if it has never been assessed"""
+    conn = _connect()
+    totals = conn.execute('SELECT * FROM trait_totals WHERE trait = ?', (trait,)).fetchone()
+    if totals is None or totals['n'] == 0:
+        return None
+
+    n = totals['n']
+    mean_score = totals['sum_score'] / n
+    variance = max(totals['sum_score_sq'] / n - mean_score * mean_score, 0.0)
+
+    patterns = conn.execute(
+        'SELECT pattern, count FROM trait_patterns WHERE trait = ? ORDER BY count DESC, pattern', (trait,)
+    ).fetchall()
+    histograms = conn.execute(
+        'SELECT kind, bucket, count FROM trait_histograms WHERE trait = ?', (trait,)
+    ).fetchall()
+
+    return {
+        'trait': trait,
+        'assessments': n,
+        'score': {
+            'mean': mean_score,
+            'stddev': math.sqrt(variance),
+            'histogram': _histogram([r for r in histograms if r['kind'] == 'score'], 0.0, SCORE_BIN_WIDTH, SCORE_BINS)
+        },
+        'mean_consistency': totals['sum_consistency'] / n,
+        'mean_agreement': totals['sum_agreement'] / n,
+        'pattern_frequency': {
+            row['pattern']: {'count': row['count'], 'share': row['count'] / n} for row in patterns
+        },
+        'self_rating_gap': {
+            'mean': totals['sum_gap'] / n,
+            'mean_absolute': totals['sum_abs_gap'] / n,
+            'histogram': _histogram([r for r in histograms if r['kind'] == 'gap'], GAP_MIN, GAP_BIN_WIDTH, GAP_BINS)
+        }
+    }
+
+
+RESULT_FIELDS = ('score', 'verification', 'consistency', 'agreement', 'pattern')
+
+
+def _valid_results(results):
+    return isinstance(results, dict) and bool(results) and all(
+        isinstance(result, dict) and all(field in result for field in RESULT_FIELDS)
+        for result in results.values()
+    )
+
+
+def _read_jsonl(path):
+    """Yield (assessment_id, results) pairs from a JSONL export.
+
+    Records are {"id", "results"} or a bare results map; anything else (e.g. batch_score.py
+    error rows) is skipped with its line number.
+    """
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                print(f"Skipping {path}:{line_number}: invalid JSON ({str(e)})")
+                continue
+            results = record.get('results', record) if isinstance(record, dict) else None
+            if not _valid_results(results):
+                print(f"Skipping {path}:{line_number}: no per-trait results")
+                continue
+            yield record.get('id') or f'{path}:{line_number}', results
+
+
+def rebuild(source=None):
+    """Recompute every aggregate from the assessment log, optionally importing a JSONL backfill first"""
+    conn = _connect()
+    with storage.transaction(conn):
+        if source:
+            for assessment_id, results in _read_jsonl(source):
+                conn.execute(
+                    'INSERT OR IGNORE INTO assessment_log (id, created_at, results) VALUES (?, ?, ?)',
+                    (assessment_id, time.time(), json.dumps(results))
+                )
+
+        conn.execute('DELETE FROM trait_totals')
+        conn.execute('DELETE FROM trait_patterns')
+        conn.execute('DELETE FROM trait_histograms')
+
+        replayed = 0
+        for row in conn.execute('SELECT results FROM assessment_log ORDER BY created_at').fetchall():
+            _apply_results(conn, json.loads(row['results']))
+            replayed += 1
+    return replayed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Cohort analytics maintenance')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    rebuild_parser = subparsers.add_parser('rebuild', help='Recompute all aggregates from the assessment log')
+    rebuild_parser.add_argument('--from', dest='source', help='JSONL file of {"id", "results"} records to backfill first')
+
+    stats_parser = subparsers.add_parser('stats', help='Print the statistics for one trait')
+    stats_parser.add_argument('trait')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'rebuild':
+        replayed = rebuild(args.source)
+        print(f"Rebuilt cohort analytics from {replayed} assessments")
+    elif args.command == 'stats':
+        stats = get_trait_stats(args.trait)
+        if stats is None:
+            print(f"No assessments recorded for {args.trait}")
+            return 1
+        print(json.dumps(stats, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,35 +1,214 @@
 #!/usr/bin/env python3
-from flask import Flask, request, jsonify, send_file, send_from_directory
-import openai
+"""Personality assessment server
+
+Create the Flask app with create_app(); `gunicorn app:app` resolves the module-level
+`app` lazily through the same factory. Heavy dependencies (ReportLab, PyPDF2, the OpenAI
+client) load on first use, or up front in warm_up() when PRELOAD_HEAVY_IMPORTS=1, which
+is what gunicorn --preload uses to share them copy-on-write across workers.
+"""
+from flask import Flask, Blueprint, Request, Response, redirect, request, jsonify, send_file, send_from_directory, stream_with_context
 import os
 import json
+import contextvars
+import hashlib
+import hmac
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib.enums import TA_LEFT, TA_CENTER
-import io
+import re
+import time
+
+import analytics
+import assessment_store
+import bulk_export
+import candidate_index
+import catalog
+import deadlines
+from fragment_cache import FragmentCache
+import job_profiles
+import llm_stub
+import memprofile
+import model_router
+import pdf_reports
+import prescoring
+from json_stream import IncrementalJSONParser
+from memprofile import profiled
+from ratelimit import rate_limited
+import report_index
+from resolved_assessment import resolve_assessment
+from singleflight import SingleFlight, canonical_key
+from tracing import span, traced
+import uploads
+from uploads import upload_limited
+import warmup
+
+bp = Blueprint('assessment', __name__)
+
+# Identical concurrent submissions share one pipeline run
+analysis_flight = SingleFlight('analysis')
+matching_flight = SingleFlight('matching')
+
+# Rendered per-trait result cards, bounded by characters held; 0 disables the cache
+HTML_FRAGMENT_CACHE_CHARS = int(os.environ.get('HTML_FRAGMENT_CACHE_CHARS', 8000000))
+trait_card_cache = FragmentCache('trait_card', HTML_FRAGMENT_CACHE_CHARS)
+
+# Profiles one /api/match-candidate/multi request may compare, and how many are matched at once
+MULTI_MATCH_MAX_PROFILES = int(os.environ.get('MULTI_MATCH_MAX_PROFILES', 20))
+MULTI_MATCH_CONCURRENCY = int(os.environ.get('MULTI_MATCH_CONCURRENCY', 4))
+
+# Compiled role-specific matching prompt prefixes, keyed by requirements set
+MATCHING_PREFIX_CACHE_CHARS = int(os.environ.get('MATCHING_PREFIX_CACHE_CHARS', 2000000))
+matching_prefix_cache = FragmentCache('matching_prefix', MATCHING_PREFIX_CACHE_CHARS)
+
+_env_loaded = False
+_openai_client = None
+_openai_client_pid = None
+
+def load_env():
+    """Load variables from .env once per process"""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+def get_openai_api_key():
+    """Return the configured OpenAI API key (explicit, fail-fast)"""
+    load_env()
+    if llm_stub.enabled():
+        return os.environ.get('OPENAI_API_KEY', 'stub')
+    api_key = os.environ.get('OPENAI_API_KEY')
+    if not api_key:
+        raise RuntimeError("OPENAI_API_KEY environment variable is not set. Set it before running.")
+    return api_key
+
+def get_openai_client():
+    """Return this process's OpenAI client, creating it on first use.
+    
+    The client owns a connection pool that must not be shared across fork, so a worker
+    forked from a preloaded master builds its own.
+    """
+    global _openai_client, _openai_client_pid
+    if _openai_client is None or _openai_client_pid != os.getpid():
+        if llm_stub.enabled():
+            _openai_client = llm_stub.StubClient()
+        else:
+            import openai
+            _openai_client = openai.OpenAI(api_key=get_openai_api_key())
+        _openai_client_pid = os.getpid()
+    return _openai_client
+
+def warm_up():
+    """Import the heavy dependencies now instead of on the first request that needs them"""
+    import numpy  # noqa: F401
+    import openai  # noqa: F401
+    import PyPDF2  # noqa: F401
+    pdf_reports.prepare()
+
+def open_llm_connection():
+    """Open the OpenAI client's connection pool (TLS handshake included) with one cheap request"""
+    if llm_stub.enabled():
+        return
+    # with_options() shares the client's connection pool
+    get_openai_client().with_options(timeout=warmup.WARM_UP_TIMEOUT, max_retries=0).models.list()
+
+def warm_up_steps(llm_connection=True):
+    """Steps that make a freshly started worker as fast on its first requests as on later ones"""
+    steps = [
+        ('imports', warm_up),
+        ('catalog', catalog.bundles),
+        # A throwaway report loads the fonts and runs ReportLab's layout code once
+        ('pdf', lambda: pdf_reports.render_report('assessment', {})),
+    ]
+    if llm_connection:
+        steps.append(('llm_connection', open_llm_connection))
+    return steps
 
-# ADD THESE TWO LINES AT THE TOP (after imports)
-from dotenv import load_dotenv
-load_dotenv()
+def start_warm_up():
+    """Warm this worker up in the background; /readyz turns ready when it is done"""
+    warmup.start(warm_up_steps())
 
-app = Flask(__name__, static_folder='public', static_url_path='')
+class UploadRequest(Request):
+    """Request whose uploaded files are spooled to disk above uploads.UPLOAD_SPOOL_BYTES"""
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return uploads.spooled_stream_factory(total_content_length, content_type, filename, content_length)
 
-# Configure OpenAI (explicit, fail-fast)
-OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
-if not OPENAI_API_KEY:
-    raise RuntimeError("OPENAI_API_KEY environment variable is not set. Set it before running.")
+def create_app():
+    """Application factory"""
+    load_env()
+    get_openai_api_key()
+    
+    memprofile.start()
+    flask_app = Flask(__name__, static_folder='public', static_url_path='')
+    flask_app.request_class = UploadRequest
+    flask_app.config['MAX_CONTENT_LENGTH'] = uploads.MAX_REQUEST_BYTES
+    flask_app.register_blueprint(bp)
+    
+    if os.environ.get('PRELOAD_HEAVY_IMPORTS', '0') == '1':
+        warm_up()
+    
+    return flask_app
 
-# create the client instance (use the same API used elsewhere in your code)
-openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
+def __getattr__(name):
+    # `gunicorn app:app` and `from app import app` get a lazily created application
+    if name == 'app':
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-@app.route('/')
+@bp.route('/')
 def index():
     return send_from_directory('public', 'index.html')
 
-@app.route('/api/analyze', methods=['POST'])
+@bp.route('/healthz')
+def healthz():
+    """Liveness: the worker is up and serving"""
+    return jsonify({'status': 'ok'})
+
+@bp.route('/readyz')
+def readyz():
+    """Readiness: 503 until this worker has finished warming up"""
+    status = warmup.status()
+    return jsonify(status), 200 if status['ready'] else 503
+
+@bp.app_errorhandler(413)
+def request_too_large(e):
+    return jsonify({'error': f'Request is larger than {uploads.MAX_REQUEST_BYTES} bytes'}), 413
+
+def estimate_tokens(text):
+    """Rough token estimate for English prompt text (about four characters per token)"""
+    return len(text) // 4
+
+def estimate_analyze_cost(data=None):
+    """Estimate the LLM tokens an /api/analyze request will consume (prompts plus completions);
+    `data` defaults to the current request's JSON body
+    """
+    if data is None:
+        data = request.get_json(silent=True) or {}
+    trait_data = data.get('traitData', {})
+    selected_traits = data.get('selectedTraits', [])
+    
+    # The overall prompt walks every trait's questions; each trait prompt walks its own
+    cost = estimate_tokens(json.dumps(trait_data)) + model_router.max_tokens('overall')
+    for trait in selected_traits:
+        cost += estimate_tokens(json.dumps(trait_data.get(trait, {}))) + model_router.max_tokens('trait')
+    return cost
+
+def estimate_match_cost(form=None):
+    """Estimate the LLM tokens an /api/match-candidate request will consume; `form` defaults to
+    the current request's form
+    """
+    try:
+        job_requirements = requested_job_requirements(form if form is not None else request.form) or {}
+        prompt, _, _ = build_matching_prompt('x' * 10000, job_requirements, [])
+    except Exception:
+        prompt = 'x' * 20000
+    return estimate_tokens(prompt) + model_router.max_tokens('matching')
+
+@bp.route('/api/analyze', methods=['POST'])
+@traced('analyze')
+@rate_limited(estimate_analyze_cost)
 def analyze():
     """Analyze personality assessment using GPT"""
     try:
@@ -50,140 +229,525 @@ def analyze():
                 print(f"    {q_id}: {value}")
         print("="*80 + "\n")
         
-        # Calculate basic metrics for each trait
-        results = {}
-        print("\nCALCULATED METRICS:")
-        print("-"*80)
-        for trait in selected_traits:
-            trait_questions = trait_data[trait]['questions']
-            trait_answers = answers[trait]
-            
-            # Separate scenario and verification questions
-            scenario_qs = [q for q in trait_questions if not q['id'].startswith('V')]
-            verification_q = next(q for q in trait_questions if q['id'].startswith('V'))
-            
-            # Calculate metrics
-            scenario_values = [trait_answers[q['id']] for q in scenario_qs]
-            verification_value = trait_answers[verification_q['id']]
-            
-            base = sum(scenario_values) / len(scenario_values)
-            count_0 = sum(1 for v in scenario_values if v == 0)
-            count_2 = sum(1 for v in scenario_values if v == 2)
-            
-            # Consistency: fraction of responses matching the most common response
-            max_count = max(count_0, count_2)
-            consistency = max_count / len(scenario_values)
-            
-            # Agreement: alignment with self-rating
-            delta = abs(base - verification_value)
-            agreement = 1 - delta / 2.0
-            
-            # Situationality: same as consistency (with only 2 choices)
-            situationality = consistency
-            
-            pattern = '-'.join(['A' if v == 0 else 'B' for v in scenario_values])
-            
-            results[trait] = {
-                'score': base,
-                'consistency': consistency,
-                'agreement': agreement,
-                'situationality': situationality,
-                'pattern': pattern,
-                'verification': verification_value,
-                'scenario_count': len(scenario_values),
-                'consistency_count': max_count,
-                'agreement_delta': delta,
-                'response_distribution': {'0': count_0, '2': count_2}
-            }
-            
-            print(f"\n{trait}:")
-            print(f"  Score: {base:.2f}")
-            print(f"  Pattern: {pattern}")
-            print(f"  Consistency: {max_count}/{len(scenario_values)}")
-            print(f"  Self-Awareness: {agreement:.2f}")
-            print(f"  Adaptability: {max_count}/{len(scenario_values)}")
+        # Identical in-flight submissions (double clicks, retries) attach to one pipeline run
+        key = canonical_key(selected_traits, answers, trait_data)
+        with span('pipeline') as attrs, deadlines.deadline(request_budget_ms(deadlines.ANALYZE_DEADLINE_MS, data)):
+            response, shared = analysis_flight.do(key, lambda: run_analysis(selected_traits, answers, trait_data))
+            attrs['shared'] = shared
+        if shared:
+            print(f"Coalesced with in-flight analysis {key[:12]}")
         
-        print("-"*80 + "\n")
+        with span('serialize'):
+            return jsonify(response)
+        
+    except Exception as e:
+        print(f"Error in analyze: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+def request_budget_ms(configured_ms, fields):
+    """Time budget of this request: configured_ms, or less if the client asked for less"""
+    return deadlines.budget_ms(configured_ms, request.headers.get(deadlines.DEADLINE_HEADER) or fields.get('deadlineMs'))
+
+def trait_input_hash(trait, trait_data, answers):
+    """Hash everything a trait's metrics and GPT analysis depend on"""
+    return canonical_key(trait, trait_data[trait], answers[trait])
+
+def overall_input_hash(selected_traits, trait_hashes):
+    """Hash everything the overall assessment depends on"""
+    return canonical_key(selected_traits, [trait_hashes[t] for t in selected_traits])
+
+def store_assessment(assessment_id, selected_traits, answers, trait_data, response, parent_id=None):
+    """Persist an analysis with the input hashes used to decide reuse on re-analysis"""
+    trait_hashes = {t: trait_input_hash(t, trait_data, answers) for t in selected_traits}
+    record = {
+        'selectedTraits': selected_traits,
+        'answers': answers,
+        'traitData': trait_data,
+        'results': response['results'],
+        'overallAssessment': response['overallAssessment'],
+        'traitAnalyses': response['traitAnalyses'],
+        'partial': response.get('partial', []),
+        'traitInputHashes': trait_hashes,
+        'overallInputHash': overall_input_hash(selected_traits, trait_hashes)
+    }
+    try:
+        assessment_store.save_assessment(assessment_id, record, parent_id)
+    except Exception as e:
+        print(f"Assessment store error: {str(e)}")
+    try:
+        candidate_index.save_candidate(assessment_id, response['results'])
+    except Exception as e:
+        print(f"Candidate index error: {str(e)}")
+
+def run_analysis(selected_traits, answers, trait_data):
+    """Run the full scoring and GPT analysis pipeline and return the /api/analyze response body"""
+    assessment_id = assessment_store.new_assessment_id()
+    
+    # Calculate basic metrics for each trait
+    with span('metrics'):
+        results = calculate_results(selected_traits, answers, trait_data)
+    
+    # Resolve every answer to its chosen option once; prompts and HTML share the view
+    with span('resolve'):
+        assessment = resolve_assessment(selected_traits, answers, trait_data, results)
+    
+    # Fold the metrics into the cohort aggregates (never fail the request over analytics)
+    with span('analytics'):
+        try:
+            analytics.record_results(results, assessment_id)
+        except Exception as e:
+            print(f"Analytics Error: {str(e)}")
+    
+    # Generate overall assessment first
+    overall_assessment = generate_overall_assessment(assessment)
+    
+    # Generate GPT-powered analysis for individual traits
+    html_output, trait_analyses = generate_gpt_analysis(assessment, overall_assessment)
+    
+    print("\nANALYSIS COMPLETE - Returning results")
+    print("="*80 + "\n")
+    
+    response = {
+        'assessmentId': assessment_id,
+        'html': html_output,
+        'results': results,
+        'overallAssessment': overall_assessment,
+        'traitAnalyses': trait_analyses,
+        'partial': deadlines.partial_sections()
+    }
+    with span('store'):
+        store_assessment(assessment_id, selected_traits, answers, trait_data, response)
+    return response
+
+def stream_analysis(selected_traits, answers, trait_data, budget_ms):
+    """Run the analysis pipeline as NDJSON events for /api/analyze/stream.
+    
+    Emits 'metrics' first, a 'field' event for each overall/trait field as soon as GPT has
+    written it, an 'overall' or 'trait' event with each parsed object, and finally 'result'
+    with the same body /api/analyze returns.
+    """
+    # The deadline starts here: the generator runs after the view has returned
+    with deadlines.deadline(budget_ms):
+        yield from _stream_analysis(selected_traits, answers, trait_data)
+
+def _stream_analysis(selected_traits, answers, trait_data):
+    assessment_id = assessment_store.new_assessment_id()
+    results = calculate_results(selected_traits, answers, trait_data)
+    assessment = resolve_assessment(selected_traits, answers, trait_data, results)
+    try:
+        analytics.record_results(results, assessment_id)
+    except Exception as e:
+        print(f"Analytics Error: {str(e)}")
+    yield ndjson({'event': 'metrics', 'assessmentId': assessment_id, 'results': results})
+    
+    overall_assessment = yield from stream_fields(
+        lambda: overall_completion_kwargs(build_overall_prompt(assessment)), {'scope': 'overall'},
+        lambda: fallback_overall_assessment(selected_traits), 'overallAssessment'
+    )
+    yield ndjson({'event': 'overall', 'value': overall_assessment})
+    
+    trait_analyses = {}
+    for trait in assessment:
+        trait_analyses[trait.key] = yield from stream_fields(
+            lambda: trait_completion_kwargs(build_trait_prompt(trait)), {'scope': 'trait', 'trait': trait.key},
+            lambda: fallback_trait_analysis(trait), f'traitAnalyses.{trait.key}'
+        )
+        yield ndjson({'event': 'trait', 'trait': trait.key, 'value': trait_analyses[trait.key]})
+    
+    response = {
+        'assessmentId': assessment_id,
+        'html': fill_trait_placeholders(generate_html_structure(assessment, overall_assessment), trait_analyses),
+        'results': results,
+        'overallAssessment': overall_assessment,
+        'traitAnalyses': trait_analyses,
+        'partial': deadlines.partial_sections()
+    }
+    store_assessment(assessment_id, selected_traits, answers, trait_data, response)
+    yield ndjson({'event': 'result', 'value': response})
+
+@bp.route('/api/analyze/stream', methods=['POST'])
+@rate_limited(estimate_analyze_cost)
+def analyze_stream():
+    """Streaming /api/analyze: newline-delimited JSON events while GPT writes the analysis"""
+    try:
+        data = request.json or {}
+        selected_traits = data.get('selectedTraits', [])
+        answers = data.get('answers', {})
+        trait_data = data.get('traitData', {})
+        print(f"\nSTREAMED ANALYSIS REQUEST - traits: {selected_traits}")
+        return Response(
+            stream_with_context(stream_analysis(
+                selected_traits, answers, trait_data, request_budget_ms(deadlines.ANALYZE_DEADLINE_MS, data)
+            )),
+            mimetype='application/x-ndjson'
+        )
+    except Exception as e:
+        print(f"Error in analyze-stream: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+def run_reanalysis(prior, selected_traits, answers, trait_data, parent_id):
+    """Re-analyze an edited assessment, recomputing only what its changed inputs affect"""
+    prior_hashes = prior.get('traitInputHashes', {})
+    # Sections that were fallbacks last time are generated again
+    prior_partial = {entry['section'] for entry in prior.get('partial', [])}
+    results = {}
+    trait_analyses = {}
+    reuse = {'metrics': {}, 'traitAnalyses': {}}
+    
+    trait_hashes = {}
+    stale = []
+    for trait in selected_traits:
+        trait_hashes[trait] = trait_input_hash(trait, trait_data, answers)
+        unchanged = (
+            prior_hashes.get(trait) == trait_hashes[trait]
+            and trait in prior.get('results', {})
+            and trait in prior.get('traitAnalyses', {})
+            and f'traitAnalyses.{trait}' not in prior_partial
+        )
+        if unchanged:
+            results[trait] = prior['results'][trait]
+            trait_analyses[trait] = prior['traitAnalyses'][trait]
+            reuse['metrics'][trait] = 'reused'
+            reuse['traitAnalyses'][trait] = 'reused'
+        else:
+            results[trait] = calculate_trait_metrics(trait_data[trait]['questions'], answers[trait])
+            stale.append(trait)
+            reuse['metrics'][trait] = 'recomputed'
+            reuse['traitAnalyses'][trait] = 'regenerated'
+    
+    assessment = resolve_assessment(selected_traits, answers, trait_data, results)
+    for trait in stale:
+        trait_analyses[trait] = generate_trait_analysis(assessment.traits[trait])
+    
+    # The overall assessment only changes when the aggregate inputs do
+    overall_unchanged = (
+        overall_input_hash(selected_traits, trait_hashes) == prior.get('overallInputHash')
+        and prior.get('overallAssessment')
+        and 'overallAssessment' not in prior_partial
+    )
+    if overall_unchanged:
+        overall_assessment = prior['overallAssessment']
+        reuse['overallAssessment'] = 'reused'
+    else:
+        overall_assessment = generate_overall_assessment(assessment)
+        reuse['overallAssessment'] = 'regenerated'
+    
+    html = fill_trait_placeholders(generate_html_structure(assessment, overall_assessment), trait_analyses)
+    
+    assessment_id = assessment_store.new_assessment_id()
+    response = {
+        'assessmentId': assessment_id,
+        'previousAssessmentId': parent_id,
+        'html': html,
+        'results': results,
+        'overallAssessment': overall_assessment,
+        'traitAnalyses': trait_analyses,
+        'reuse': reuse,
+        'partial': deadlines.partial_sections()
+    }
+    store_assessment(assessment_id, selected_traits, answers, trait_data, response, parent_id)
+    return response
+
+@bp.route('/api/reanalyze', methods=['POST'])
+@rate_limited(estimate_analyze_cost)
+def reanalyze():
+    """Re-analyze a stored assessment after answers were edited or traits added or removed.
+    
+    Body: {"assessmentId": ..., "answers": {trait: {question_id: value}} (changed answers only),
+    "traitData": {trait: ...} (for added traits), "selectedTraits": [...] (optional full list)}
+    """
+    try:
+        data = request.json or {}
+        parent_id = data.get('assessmentId')
+        prior = assessment_store.get_assessment(parent_id) if parent_id else None
+        if prior is None:
+            return jsonify({'error': 'Unknown assessmentId'}), 404
         
-        # Generate overall assessment first
-        overall_assessment = generate_overall_assessment(selected_traits, results, trait_data, answers)
+        changed_answers = data.get('answers', {})
+        answers = {trait: dict(values) for trait, values in prior['answers'].items()}
+        for trait, values in changed_answers.items():
+            answers.setdefault(trait, {}).update(values)
         
-        # Generate GPT-powered analysis for individual traits
-        html_output, trait_analyses = generate_gpt_analysis(selected_traits, results, answers, trait_data, overall_assessment)
+        trait_data = dict(prior['traitData'])
+        trait_data.update(data.get('traitData', {}))
         
-        print("\nANALYSIS COMPLETE - Returning results")
-        print("="*80 + "\n")
+        selected_traits = data.get('selectedTraits') or (
+            prior['selectedTraits'] + [t for t in changed_answers if t not in prior['selectedTraits']]
+        )
         
-        return jsonify({
-            'html': html_output,
-            'results': results,
-            'overallAssessment': overall_assessment,
-            'traitAnalyses': trait_analyses
-        })
+        missing = [t for t in selected_traits if t not in trait_data or t not in answers]
+        if missing:
+            return jsonify({'error': f'Missing trait data or answers for: {", ".join(missing)}'}), 400
+        
+        print(f"\nRE-ANALYSIS of {parent_id} - traits: {selected_traits}")
+        
+        key = canonical_key('reanalyze', parent_id, selected_traits, answers, trait_data)
+        with deadlines.deadline(request_budget_ms(deadlines.ANALYZE_DEADLINE_MS, data)):
+            response, _ = analysis_flight.do(
+                key, lambda: run_reanalysis(prior, selected_traits, answers, trait_data, parent_id)
+            )
+        print(f"Reuse summary: {response['reuse']}")
+        return jsonify(response)
         
     except Exception as e:
-        print(f"Error in analyze: {str(e)}")
+        print(f"Error in reanalyze: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-def generate_overall_assessment(selected_traits, results, trait_data, answers):
-    """Generate comprehensive overall personality assessment using GPT"""
+@bp.route('/api/metrics/routing', methods=['GET'])
+def routing_metrics():
+    """Report model routing configuration, per-model health and recent routing decisions"""
+    try:
+        return jsonify(model_router.stats())
+    except Exception as e:
+        print(f"Error in routing metrics: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+def debug_authorized(supplied):
+    """Debug endpoints need DEBUG_TOKEN set on the server and sent back in X-Debug-Token"""
+    token = os.environ.get('DEBUG_TOKEN', '')
+    return bool(token) and hmac.compare_digest(supplied, token)
+
+@bp.route('/api/debug/memory', methods=['GET'])
+def debug_memory():
+    """Per-stage allocation figures and top allocators of this worker (MEMORY_PROFILING=1).
+    
+    Query: limit (default 25), group (lineno, filename or traceback), growth=1 for the
+    allocations that grew most since start-up instead of the largest ones.
+    """
+    if not debug_authorized(request.headers.get('X-Debug-Token', '')):
+        return jsonify({'error': 'Not found'}), 404
+    try:
+        limit = min(int(request.args.get('limit', 25)), 200)
+        group_by = request.args.get('group', 'lineno')
+        if group_by not in ('lineno', 'filename', 'traceback'):
+            return jsonify({'error': 'group must be lineno, filename or traceback'}), 400
+        return jsonify(memprofile.report(limit, group_by, request.args.get('growth') == '1'))
+    except Exception as e:
+        print(f"Error in debug memory: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/metrics/fragments', methods=['GET'])
+def fragment_metrics():
+    """Report size, hit rate and evictions of the rendered HTML fragment and prompt prefix caches"""
+    return jsonify({'traitCards': trait_card_cache.stats(), 'matchingPrefixes': matching_prefix_cache.stats()})
+
+@bp.route('/api/metrics/singleflight', methods=['GET'])
+def singleflight_metrics():
+    """Report in-flight and recently coalesced analysis and matching computations"""
+    return jsonify({
+        'analysis': analysis_flight.stats(),
+        'matching': matching_flight.stats()
+    })
+
+def calculate_trait_metrics(trait_questions, trait_answers):
+    """Compute the scenario metrics for one trait from its questions and the respondent's answers"""
+    # Separate scenario and verification questions
+    scenario_qs = [q for q in trait_questions if not q['id'].startswith('V')]
+    verification_q = next(q for q in trait_questions if q['id'].startswith('V'))
+    
+    # Calculate metrics
+    scenario_values = [trait_answers[q['id']] for q in scenario_qs]
+    verification_value = trait_answers[verification_q['id']]
+    
+    base = sum(scenario_values) / len(scenario_values)
+    count_0 = sum(1 for v in scenario_values if v == 0)
+    count_2 = sum(1 for v in scenario_values if v == 2)
+    
+    # Consistency: fraction of responses matching the most common response
+    max_count = max(count_0, count_2)
+    consistency = max_count / len(scenario_values)
+    
+    # Agreement: alignment with self-rating
+    delta = abs(base - verification_value)
+    agreement = 1 - delta / 2.0
+    
+    # Situationality: same as consistency (with only 2 choices)
+    situationality = consistency
+    
+    pattern = '-'.join(['A' if v == 0 else 'B' for v in scenario_values])
+    
+    return {
+        'score': base,
+        'consistency': consistency,
+        'agreement': agreement,
+        'situationality': situationality,
+        'pattern': pattern,
+        'verification': verification_value,
+        'scenario_count': len(scenario_values),
+        'consistency_count': max_count,
+        'agreement_delta': delta,
+        'response_distribution': {'0': count_0, '2': count_2}
+    }
+
+@profiled('scoring')
+def calculate_results(selected_traits, answers, trait_data):
+    """Calculate basic metrics for each selected trait"""
+    results = {}
+    print("\nCALCULATED METRICS:")
+    print("-"*80)
+    for trait in selected_traits:
+        result = calculate_trait_metrics(trait_data[trait]['questions'], answers[trait])
+        results[trait] = result
+        
+        print(f"\n{trait}:")
+        print(f"  Score: {result['score']:.2f}")
+        print(f"  Pattern: {result['pattern']}")
+        print(f"  Consistency: {result['consistency_count']}/{result['scenario_count']}")
+        print(f"  Self-Awareness: {result['agreement']:.2f}")
+        print(f"  Adaptability: {result['consistency_count']}/{result['scenario_count']}")
+    
+    print("-"*80 + "\n")
+    return results
+
+def parse_gpt_json(content):
+    """Parse a JSON completion, stripping markdown fences if present"""
+    # Clean up markdown if present
+    if '```json' in content:
+        content = content.split('```json')[1].split('```')[0].strip()
+    elif '```' in content:
+        content = content.split('```')[1].split('```')[0].strip()
+    
+    return json.loads(content)
+
+def create_completion(kwargs):
+    """Run a chat completion within the request deadline, recording its latency and outcome for model routing"""
+    attempt = 1
+    while True:
+        client = deadlines.bounded(get_openai_client())
+        start = time.perf_counter()
+        try:
+            response = client.chat.completions.create(**kwargs)
+        except Exception as e:
+            delay = failed_completion(kwargs, start, e, attempt)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            attempt += 1
+            continue
+        model_router.observe(kwargs['model'], time.perf_counter() - start, True)
+        return response
+
+def failed_completion(kwargs, start, error, attempt, retry=True):
+    """Record a failed completion attempt; returns seconds to wait before retrying it, or None"""
+    # Running out of the request's (possibly client-shortened) budget says nothing about the model
+    if not deadlines.out_of_time(error):
+        model_router.observe(kwargs['model'], time.perf_counter() - start, False)
+    delay = deadlines.retry_delay(error, attempt) if retry else None
+    if delay is not None:
+        print(f"Retrying {kwargs['model']} in {delay:.1f}s after attempt {attempt} failed: {str(error)}")
+    return delay
+
+def stream_completion(kwargs, nested=()):
+    """Stream a JSON chat completion.
+    
+    Yields ('field', name, value) and ('entry', field, name, value) events as values complete
+    (see json_stream), then ('content', full_text) once the stream ends. A call is retried only
+    while nothing of it has been streamed.
+    """
+    parser = IncrementalJSONParser(nested)
+    parts = []
+    attempt = 1
+    while True:
+        client = deadlines.bounded(get_openai_client())
+        start = time.perf_counter()
+        try:
+            for chunk in client.chat.completions.create(stream=True, **kwargs):
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield from parser.feed(delta)
+        except Exception as e:
+            delay = failed_completion(kwargs, start, e, attempt, retry=not parts)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            attempt += 1
+            continue
+        break
+    model_router.observe(kwargs['model'], time.perf_counter() - start, True)
+    yield ('content', ''.join(parts))
+
+def ndjson(event):
+    """One line of a streamed application/x-ndjson response"""
+    return json.dumps(event) + '\n'
+
+def stream_fields(make_kwargs, scope, fallback, section):
+    """Forward each field of a streamed GPT analysis as a 'field' event; returns the parsed object.
+    
+    make_kwargs is called when the section's turn comes, so routing sees the time left then.
+    """
+    content = ''
+    try:
+        for event in stream_completion(make_kwargs()):
+            if event[0] == 'field':
+                yield ndjson(dict(scope, event='field', name=event[1], value=event[2]))
+            elif event[0] == 'content':
+                content = event[1]
+        return parse_gpt_json(content or "{}")
+    except Exception as e:
+        print(f"GPT Error for streamed {scope}: {str(e)}")
+        deadlines.mark_partial(section, e)
+        return fallback()
+
+@bp.route('/api/analytics/<trait>', methods=['GET'])
+def trait_analytics(trait):
+    """Return cohort statistics for a trait from the incrementally maintained aggregates"""
+    try:
+        stats = analytics.get_trait_stats(trait)
+        if stats is None:
+            return jsonify({'error': f'No assessments recorded for {trait}'}), 404
+        return jsonify(stats)
+    except Exception as e:
+        print(f"Error in trait analytics: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+OVERALL_SYSTEM_PROMPT = "You are an expert organizational psychologist. Analyze the actual scenarios and choices made by the respondent. Be specific and concrete, referencing their actual decisions. Create a memorable personality type title. Respond only with valid JSON."
+
+TRAIT_SYSTEM_PROMPT = "You are an expert organizational psychologist. Analyze based on actual scenarios and specific choices. Be concrete and reference actual decisions made. Respond only with valid JSON."
+
+@profiled('prompt')
+def build_overall_prompt(assessment):
+    """Build the GPT prompt for the overall assessment from the actual questions and answers"""
     
     # Calculate aggregate metrics
-    avg_consistency = sum(results[t]['consistency'] for t in selected_traits) / len(selected_traits)
-    avg_agreement = sum(results[t]['agreement'] for t in selected_traits) / len(selected_traits)
-    avg_situationality = sum(results[t]['situationality'] for t in selected_traits) / len(selected_traits)
+    avg_consistency = sum(t.result['consistency'] for t in assessment) / len(assessment)
+    avg_agreement = sum(t.result['agreement'] for t in assessment) / len(assessment)
+    avg_situationality = sum(t.result['situationality'] for t in assessment) / len(assessment)
     
     # Build GPT prompt with actual questions and answers
-    prompt = f"""You are an expert organizational psychologist. Analyze this complete personality assessment based on the actual scenarios and choices made by the respondent.
+    prompt = [f"""You are an expert organizational psychologist. Analyze this complete personality assessment based on the actual scenarios and choices made by the respondent.
 
 ASSESSMENT PROFILE:
-Number of traits assessed: {len(selected_traits)}
+Number of traits assessed: {len(assessment)}
 
 DETAILED RESPONSES BY TRAIT:
-"""
+"""]
     
-    for trait in selected_traits:
-        result = results[trait]
-        interp = trait_data[trait]['interpretation']
-        pattern_info = trait_data[trait]['patterns'].get(result['pattern'], {})
+    for trait in assessment:
+        result = trait.result
         
-        prompt += f"""
+        prompt.append(f"""
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-TRAIT: {interp['name']}
-Interpretation: Low end = {interp['lowEnd']}, High end = {interp['highEnd']}
+TRAIT: {trait.name}
+Interpretation: Low end = {trait.low_end}, High end = {trait.high_end}
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
-Pattern: {result['pattern']} - {pattern_info.get('label', '')}
+Pattern: {result['pattern']} - {trait.pattern_info.get('label', '')}
 Metrics: Consistency={result['consistency_count']}/{result['scenario_count']} | Self-Awareness={result['agreement']:.2f} | Adaptability={result['consistency_count']}/{result['scenario_count']}
 
 SCENARIO QUESTIONS & RESPONDENT'S CHOICES:
-"""
-        
-        trait_questions = trait_data[trait]['questions']
-        trait_answers = answers[trait]
+""")
         
-        for q in trait_questions:
-            q_id = q['id']
-            q_text = q['text']
-            user_answer = trait_answers.get(q_id)
-            
-            # Find the selected option
-            selected_option = None
-            for opt in q['options']:
-                if opt['value'] == user_answer:
-                    selected_option = opt
-                    break
-            
-            if selected_option:
-                prompt += f"""
-Question {q_id}: {q_text}
+        for answer in trait.answers:
+            prompt.append(f"""
+Question {answer.id}: {answer.text}
 
-CHOSEN OPTION: {selected_option['label']}
-Psychological Meaning: {selected_option.get('decoding', 'N/A')}
-"""
+CHOSEN OPTION: {answer.label}
+Psychological Meaning: {answer.decoding}
+""")
     
-    prompt += f"""
+    prompt.append(f"""
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 AGGREGATE METRICS ACROSS ALL TRAITS:
@@ -213,7 +777,39 @@ THEN write 6 analysis sections (4-6 paragraphs, 3-4 sentences each):
 
 CRITICAL: Base your analysis on the SPECIFIC SCENARIOS and CHOICES described above. Reference actual situations they faced and decisions they made. Avoid generic trait descriptions. Be concrete and specific.
 
-Format as JSON with keys: {{"personality_type_title": "title", "profile_summary": "text", "decision_style": "text", "awareness_adaptability": "text", "patterns_themes": "text", "professional_implications": "text", "development_insights": "text"}}"""
+Format as JSON with keys: {{"personality_type_title": "title", "profile_summary": "text", "decision_style": "text", "awareness_adaptability": "text", "patterns_themes": "text", "professional_implications": "text", "development_insights": "text"}}""")
+    
+    return ''.join(prompt)
+
+def overall_completion_kwargs(prompt):
+    """Chat completion parameters for the overall assessment call"""
+    model, max_tokens = model_router.route('overall', prompt, deadlines.remaining_ms())
+    return dict(
+        model=model,
+        messages=[
+            {"role": "system", "content": OVERALL_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.7,
+        max_tokens=max_tokens
+    )
+
+def fallback_overall_assessment(selected_traits):
+    """Overall assessment used when the GPT call fails"""
+    return {
+        'personality_type_title': 'Multifaceted Professional',
+        'profile_summary': f'Your assessment covered {len(selected_traits)} personality dimensions, revealing distinct behavioral patterns.',
+        'decision_style': 'Your responses demonstrate a characteristic approach to professional decision-making.',
+        'awareness_adaptability': f'Your self-awareness level is high and you show strong adaptability.',
+        'patterns_themes': 'Multiple behavioral patterns emerge from your responses.',
+        'professional_implications': 'These traits have specific implications for your professional effectiveness.',
+        'development_insights': 'Consider focusing on areas where your scores show opportunities for growth.'
+    }
+
+def generate_overall_assessment(assessment):
+    """Generate comprehensive overall personality assessment using GPT"""
+    with span('prompt_overall'):
+        prompt = build_overall_prompt(assessment)
     
     print("\nGPT PROMPT FOR OVERALL ASSESSMENT:")
     print("-"*80)
@@ -221,15 +817,9 @@ Format as JSON with keys: {{"personality_type_title": "title", "profile_summary"
     print("-"*80 + "\n")
     
     try:
-        response = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are an expert organizational psychologist. Analyze the actual scenarios and choices made by the respondent. Be specific and concrete, referencing their actual decisions. Create a memorable personality type title. Respond only with valid JSON."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=2500
-        )
+        kwargs = overall_completion_kwargs(prompt)
+        with span('llm_overall', model=kwargs['model']):
+            response = create_completion(kwargs)
         
         content = response.choices[0].message.content or "{}"
         
@@ -238,50 +828,27 @@ Format as JSON with keys: {{"personality_type_title": "title", "profile_summary"
         print(content)
         print("-"*80 + "\n")
         
-        # Clean up markdown if present
-        if '```json' in content:
-            content = content.split('```json')[1].split('```')[0].strip()
-        elif '```' in content:
-            content = content.split('```')[1].split('```')[0].strip()
-        
-        return json.loads(content)
+        return parse_gpt_json(content)
         
     except Exception as e:
         print(f"GPT Error for overall assessment: {str(e)}")
-        return {
-            'personality_type_title': 'Multifaceted Professional',
-            'profile_summary': f'Your assessment covered {len(selected_traits)} personality dimensions, revealing distinct behavioral patterns.',
-            'decision_style': 'Your responses demonstrate a characteristic approach to professional decision-making.',
-            'awareness_adaptability': f'Your self-awareness level is high and you show strong adaptability.',
-            'patterns_themes': 'Multiple behavioral patterns emerge from your responses.',
-            'professional_implications': 'These traits have specific implications for your professional effectiveness.',
-            'development_insights': 'Consider focusing on areas where your scores show opportunities for growth.'
-        }
-
-def generate_gpt_analysis(selected_traits, results, answers, trait_data, overall_assessment):
-    """Use GPT to generate comprehensive personality analysis"""
-    
-    # First, generate the HTML structure with overall assessment
-    html = generate_html_structure(selected_traits, results, answers, trait_data, overall_assessment)
-    
-    # Store trait analyses for PDF generation
-    trait_analyses = {}
+        deadlines.mark_partial('overallAssessment', e)
+        return fallback_overall_assessment(assessment.selected_traits)
+
+@profiled('prompt')
+def build_trait_prompt(trait):
+    """Build the GPT prompt for one resolved trait from the actual questions and answers"""
+    interp = trait.interpretation
+    pattern_info = trait.pattern_info
+    result = trait.result
     
-    # Then, for each trait, get GPT to write the analysis content
-    for trait in selected_traits:
-        result = results[trait]
-        interp = trait_data[trait]['interpretation']
-        pattern_info = trait_data[trait]['patterns'].get(result['pattern'], {})
-        trait_questions = trait_data[trait]['questions']
-        trait_answers = answers[trait]
-        
-        # Build prompt with actual questions and answers
-        prompt = f"""You are an expert organizational psychologist. Analyze this personality trait based on the ACTUAL SCENARIOS and CHOICES made by the respondent.
+    # Build prompt with actual questions and answers
+    prompt = [f"""You are an expert organizational psychologist. Analyze this personality trait based on the ACTUAL SCENARIOS and CHOICES made by the respondent.
 
-TRAIT: {interp['name']}
+TRAIT: {trait.name}
 TRAIT INTERPRETATION:
-- Low End ({interp['lowEnd']}): {interp.get('lowDescription', '')}
-- High End ({interp['highEnd']}): {interp.get('highDescription', '')}
+- Low End ({trait.low_end}): {interp.get('lowDescription', '')}
+- High End ({trait.high_end}): {interp.get('highDescription', '')}
 - Mixed: {interp.get('mixedDescription', '')}
 
 PATTERN IDENTIFIED: {result['pattern']} - {pattern_info.get('label', '')}
@@ -295,30 +862,18 @@ METRICS:
 - Self-rating: {result['verification']}
 
 ACTUAL SCENARIOS & RESPONDENT'S CHOICES:
-"""
-        
-        for q in trait_questions:
-            q_id = q['id']
-            q_text = q['text']
-            user_answer = trait_answers.get(q_id)
-            
-            # Find the selected option
-            selected_option = None
-            for opt in q['options']:
-                if opt['value'] == user_answer:
-                    selected_option = opt
-                    break
-            
-            if selected_option:
-                prompt += f"""
+"""]
+    
+    for answer in trait.answers:
+        prompt.append(f"""
 
-Question {q_id}: {q_text}
+Question {answer.id}: {answer.text}
 
-CHOSEN: {selected_option['label']}
-What this reveals: {selected_option.get('decoding', 'N/A')}
-"""
-        
-        prompt += f"""
+CHOSEN: {answer.label}
+What this reveals: {answer.decoding}
+""")
+    
+    prompt.append(f"""
 
 ANALYSIS TASK:
 Generate 4 analysis paragraphs (2-3 sentences each) based on their SPECIFIC CHOICES in the scenarios above:
@@ -333,63 +888,103 @@ Generate 4 analysis paragraphs (2-3 sentences each) based on their SPECIFIC CHOI
 
 CRITICAL: Reference the ACTUAL SCENARIOS and SPECIFIC CHOICES they made. Be concrete, not generic.
 
-Format as JSON: {{"behavioral_profile": "text", "self_awareness": "text", "adaptability": "text", "pattern_summary": "text"}}"""
+Format as JSON: {{"behavioral_profile": "text", "self_awareness": "text", "adaptability": "text", "pattern_summary": "text"}}""")
+    
+    return ''.join(prompt)
+
+def trait_completion_kwargs(prompt):
+    """Chat completion parameters for a per-trait analysis call"""
+    model, max_tokens = model_router.route('trait', prompt, deadlines.remaining_ms())
+    return dict(
+        model=model,
+        messages=[
+            {"role": "system", "content": TRAIT_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.7,
+        max_tokens=max_tokens
+    )
+
+def fallback_trait_analysis(trait):
+    """Per-trait analysis used when the GPT call fails"""
+    return {
+        'behavioral_profile': f'Based on your responses, you show a tendency toward {trait.low_end if trait.result["score"] < 1.0 else trait.high_end}.',
+        'self_awareness': f'Your self-perception alignment shows room for development.',
+        'adaptability': f'You demonstrate contextual flexibility in your responses.',
+        'pattern_summary': trait.pattern_info.get('label', 'Pattern analysis unavailable')
+    }
+
+TRAIT_PLACEHOLDERS = {
+    'BEHAVIORAL_PROFILE': 'behavioral_profile',
+    'SELF_AWARENESS': 'self_awareness',
+    'ADAPTABILITY': 'adaptability',
+    'PATTERN_SUMMARY': 'pattern_summary'
+}
+
+TRAIT_PLACEHOLDER_RE = re.compile(r'\{(' + '|'.join(TRAIT_PLACEHOLDERS) + r')_([^{}]+)\}')
+
+@profiled('html')
+def fill_trait_placeholders(html, trait_analyses):
+    """Replace every trait's placeholders in the HTML with its analysis text, in one pass"""
+    def replace(match):
+        analysis = trait_analyses.get(match.group(2))
+        if analysis is None:
+            return match.group(0)
+        return analysis.get(TRAIT_PLACEHOLDERS[match.group(1)], 'Analysis unavailable')
+    return TRAIT_PLACEHOLDER_RE.sub(replace, html)
+
+def generate_trait_analysis(trait):
+    """Use GPT to write one resolved trait's analysis, falling back to templated text on failure"""
+    with span('prompt_trait', trait=trait.key):
+        prompt = build_trait_prompt(trait)
+    
+    print(f"\nGPT PROMPT FOR TRAIT: {trait.key}")
+    print("-"*80)
+    print(prompt[:500] + "..." if len(prompt) > 500 else prompt)
+    print("-"*80 + "\n")
+    
+    try:
+        kwargs = trait_completion_kwargs(prompt)
+        with span('llm_trait', trait=trait.key, model=kwargs['model']):
+            response = create_completion(kwargs)
+        
+        content = response.choices[0].message.content or "{}"
         
-        print(f"\nGPT PROMPT FOR TRAIT: {trait}")
+        print(f"GPT RESPONSE FOR TRAIT {trait.key}:")
         print("-"*80)
-        print(prompt[:500] + "..." if len(prompt) > 500 else prompt)
+        print(content)
         print("-"*80 + "\n")
         
-        try:
-            response = openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You are an expert organizational psychologist. Analyze based on actual scenarios and specific choices. Be concrete and reference actual decisions made. Respond only with valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=1200
-            )
-            
-            content = response.choices[0].message.content or "{}"
-            
-            print(f"GPT RESPONSE FOR TRAIT {trait}:")
-            print("-"*80)
-            print(content)
-            print("-"*80 + "\n")
-            
-            # Clean up markdown if present
-            if '```json' in content:
-                content = content.split('```json')[1].split('```')[0].strip()
-            elif '```' in content:
-                content = content.split('```')[1].split('```')[0].strip()
-            
-            analysis = json.loads(content)
-            
-            # Store for PDF generation
-            trait_analyses[trait] = analysis
-            
-            # Replace placeholders in HTML with GPT analysis
-            html = html.replace(f'{{BEHAVIORAL_PROFILE_{trait}}}', analysis.get('behavioral_profile', 'Analysis unavailable'))
-            html = html.replace(f'{{SELF_AWARENESS_{trait}}}', analysis.get('self_awareness', 'Analysis unavailable'))
-            html = html.replace(f'{{ADAPTABILITY_{trait}}}', analysis.get('adaptability', 'Analysis unavailable'))
-            html = html.replace(f'{{PATTERN_SUMMARY_{trait}}}', analysis.get('pattern_summary', 'Analysis unavailable'))
-            
-        except Exception as e:
-            print(f"GPT Error for {trait}: {str(e)}")
-            # Use fallback text
-            fallback_analysis = {
-                'behavioral_profile': f'Based on your responses, you show a tendency toward {interp["lowEnd"] if result["score"] < 1.0 else interp["highEnd"]}.',
-                'self_awareness': f'Your self-perception alignment shows room for development.',
-                'adaptability': f'You demonstrate contextual flexibility in your responses.',
-                'pattern_summary': pattern_info.get('label', 'Pattern analysis unavailable')
-            }
-            trait_analyses[trait] = fallback_analysis
-            
-            html = html.replace(f'{{BEHAVIORAL_PROFILE_{trait}}}', fallback_analysis['behavioral_profile'])
-            html = html.replace(f'{{SELF_AWARENESS_{trait}}}', fallback_analysis['self_awareness'])
-            html = html.replace(f'{{ADAPTABILITY_{trait}}}', fallback_analysis['adaptability'])
-            html = html.replace(f'{{PATTERN_SUMMARY_{trait}}}', fallback_analysis['pattern_summary'])
+        analysis = parse_gpt_json(content)
+        
+    except Exception as e:
+        print(f"GPT Error for {trait.key}: {str(e)}")
+        deadlines.mark_partial(f'traitAnalyses.{trait.key}', e)
+        # Use fallback text
+        analysis = fallback_trait_analysis(trait)
+    
+    return analysis
+
+def generate_gpt_analysis(assessment, overall_assessment):
+    """Use GPT to generate comprehensive personality analysis"""
+    
+    # First, generate the HTML structure with overall assessment
+    with span('html'):
+        html = generate_html_structure(assessment, overall_assessment)
+    
+    # Store trait analyses for PDF generation
+    trait_analyses = {}
+    
+    # Then, for each trait, get GPT to write the analysis content
+    for trait in assessment:
+        analysis = generate_trait_analysis(trait)
+        
+        # Store for PDF generation
+        trait_analyses[trait.key] = analysis
+    
+    # Replace placeholders in HTML with GPT analysis
+    with span('fill_html'):
+        html = fill_trait_placeholders(html, trait_analyses)
     
     return html, trait_analyses
 
@@ -406,36 +1001,145 @@ def format_fraction(numerator, denominator):
     """Format as fraction without percentage"""
     return f"{numerator}/{denominator}"
 
-def generate_html_structure(selected_traits, results, answers, trait_data, overall_assessment):
+# The patternInterpretations fields shown on a result card
+PATTERN_CARD_FIELDS = ('label', 'logic', 'cues', 'impact', 'risk', 'development')
+
+def trait_card_key(trait):
+    """Everything a trait's result card is rendered from"""
+    result = trait.result
+    return (
+        trait.key, trait.name, trait.low_end, trait.high_end,
+        result['score'], result['pattern'], result['consistency'], result['agreement'],
+        result['situationality'], result['verification'],
+        tuple(trait.pattern_info.get(field) for field in PATTERN_CARD_FIELDS),
+        tuple((a.id, a.text, a.value, a.label, a.decoding) for a in trait.answers)
+    )
+
+def trait_card_html(trait):
+    """A trait's result card (with analysis placeholders), from the fragment cache when possible"""
+    if HTML_FRAGMENT_CACHE_CHARS <= 0:
+        return render_trait_card(trait)
+    try:
+        return trait_card_cache.get_or_render(trait_card_key(trait), lambda: render_trait_card(trait))
+    except TypeError:
+        # Unhashable values in a client-supplied payload: render without caching
+        return render_trait_card(trait)
+
+def render_trait_card(trait):
+    """Render the result card of one trait, with placeholders for its GPT analysis"""
+    result = trait.result
+    pattern_info = trait.pattern_info
+    html = []
+    
+    html.append('<div class="result-card">')
+    html.append(f'<div class="result-header"><h3>{trait.name}</h3><span class="toggle-icon">▼</span></div>')
+    html.append('<div class="result-content">')
+    
+    # Metrics
+    html.append('<div class="metric-grid">')
+    consistency_class = 'badge-high' if result['consistency'] > 0.7 else ('badge-medium' if result['consistency'] > 0.4 else 'badge-low')
+    agreement_class = 'badge-high' if result['agreement'] > 0.7 else ('badge-medium' if result['agreement'] > 0.4 else 'badge-low')
+    situationality_class = 'badge-high' if result['situationality'] > 0.6 else ('badge-medium' if result['situationality'] > 0.3 else 'badge-low')
+    
+    html.append(f'<div class="metric-card has-tooltip"><div class="metric-label">Consistency</div><div class="metric-value badge {consistency_class}">{int(result["consistency"]*100)}%</div><span class="tooltip">How similar your responses were across scenarios for this trait</span></div>')
+    html.append(f'<div class="metric-card has-tooltip"><div class="metric-label">Self-Awareness</div><div class="metric-value badge {agreement_class}">{int(result["agreement"]*100)}%</div><span class="tooltip">Match between self-rating and scenario-based behavior</span></div>')
+    html.append(f'<div class="metric-card has-tooltip"><div class="metric-label">Adaptability</div><div class="metric-value badge {situationality_class}">{int(result["situationality"]*100)}%</div><span class="tooltip">Degree of contextual flexibility in your responses</span></div>')
+    html.append('</div>')
+    
+    # Behavioral Profile
+    html.append('<div class="analysis-section">')
+    html.append('<h4>Behavioral Profile <span class="help-icon has-tooltip">?<span class="tooltip">How you actually behave in professional situations based on your scenario choices</span></span> <span class="toggle-icon">▼</span></h4>')
+    html.append('<div class="analysis-content">')
+    
+    if result['score'] < 0.7:
+        tendency = trait.low_end
+    elif result['score'] > 1.3:
+        tendency = trait.high_end
+    else:
+        tendency = 'Balanced'
+    
+    html.append(f'<p><strong>Primary Orientation:</strong> {tendency}</p>')
+    html.append(f'<p>{{BEHAVIORAL_PROFILE_{trait.key}}}</p>')
+    html.append(f'<p><strong>Response Pattern:</strong> {result["pattern"]}</p>')
+    html.append('</div></div>')
+    
+    # Self-Awareness Analysis
+    html.append('<div class="analysis-section">')
+    html.append('<h4>Self-Awareness Analysis <span class="help-icon has-tooltip">?<span class="tooltip">Comparison between how you see yourself and how you actually behave</span></span> <span class="toggle-icon">▼</span></h4>')
+    html.append('<div class="analysis-content">')
+    html.append(f'<p>{{SELF_AWARENESS_{trait.key}}}</p>')
+    html.append(f'<p><strong>Agreement Score:</strong> {int(result["agreement"]*100)}% (Self-rating: {result["verification"]}, Scenario average: {result["score"]:.2f})</p>')
+    html.append('</div></div>')
+    
+    # Adaptability
+    html.append('<div class="analysis-section">')
+    html.append('<h4>Contextual Adaptability <span class="help-icon has-tooltip">?<span class="tooltip">Your tendency to adjust behavior based on different situations</span></span> <span class="toggle-icon">▼</span></h4>')
+    html.append('<div class="analysis-content">')
+    html.append(f'<p>{{ADAPTABILITY_{trait.key}}}</p>')
+    html.append(f'<p><strong>Consistency Score:</strong> {int(result["consistency"]*100)}%</p>')
+    html.append('</div></div>')
+    
+    # Pattern Analysis
+    html.append('<div class="analysis-section">')
+    html.append('<h4>Pattern Analysis <span class="help-icon has-tooltip">?<span class="tooltip">Interpretation of your specific response pattern across scenarios</span></span> <span class="toggle-icon">▼</span></h4>')
+    html.append('<div class="analysis-content">')
+    html.append(f'<p><strong>{pattern_info.get("label", "Pattern Identified")}</strong></p>')
+    html.append(f'<p>{{PATTERN_SUMMARY_{trait.key}}}</p>')
+    html.append(f'<p><strong>Decision Logic:</strong> {pattern_info.get("logic", "N/A")}</p>')
+    html.append(f'<p><strong>Observable Cues:</strong> {pattern_info.get("cues", "N/A")}</p>')
+    html.append(f'<p><strong>Organizational Impact:</strong> {pattern_info.get("impact", "N/A")}</p>')
+    html.append(f'<p><strong>Risk Profile:</strong> {pattern_info.get("risk", "N/A")}</p>')
+    html.append(f'<p><strong>Development Recommendations:</strong> {pattern_info.get("development", "N/A")}</p>')
+    html.append('</div></div>')
+    
+    # Your Responses section
+    html.append('<div class="analysis-section">')
+    html.append('<h4>Your Responses & Score Breakdown <span class="help-icon has-tooltip">?<span class="tooltip">Detailed view of each question and your specific choice</span></span> <span class="toggle-icon">▼</span></h4>')
+    html.append('<div class="analysis-content">')
+    
+    for answer in trait.answers:
+        html.append('<div style="margin-bottom: 20px; padding: 15px; background: hsl(var(--card-bg)); border-left: 3px solid hsl(var(--primary));">')
+        html.append(f'<p><strong>Question {answer.id}:</strong> {answer.text}</p>')
+        html.append(f'<p><strong>Your Choice:</strong> {answer.label}</p>')
+        html.append(f'<p><strong>Score:</strong> {answer.value} | <strong>What this reveals:</strong> {answer.decoding}</p>')
+        html.append('</div>')
+    
+    html.append('</div></div>')
+    
+    html.append('</div></div>')
+    
+    return ''.join(html)
+
+@profiled('html')
+def generate_html_structure(assessment, overall_assessment):
     """Generate the complete HTML structure with placeholders for GPT content"""
     
     # Calculate aggregate metrics
-    total_scenarios = sum(results[t]['scenario_count'] for t in selected_traits)
-    total_consistent = sum(results[t]['consistency_count'] for t in selected_traits)
-    avg_consistency = sum(results[t]['consistency'] for t in selected_traits) / len(selected_traits)
-    avg_agreement = sum(results[t]['agreement'] for t in selected_traits) / len(selected_traits)
-    avg_situationality = sum(results[t]['situationality'] for t in selected_traits) / len(selected_traits)
+    total_scenarios = sum(t.result['scenario_count'] for t in assessment)
+    total_consistent = sum(t.result['consistency_count'] for t in assessment)
+    avg_consistency = sum(t.result['consistency'] for t in assessment) / len(assessment)
+    avg_agreement = sum(t.result['agreement'] for t in assessment) / len(assessment)
+    avg_situationality = sum(t.result['situationality'] for t in assessment) / len(assessment)
     
     # Start with detailed metrics table
-    html = '<div class="card metrics-table-card">'
-    html += '<h2>Assessment Metrics Summary</h2>'
-    html += '<p class="help-text" style="margin-bottom: 20px;">This table shows your scores across all assessed traits. Hover over any metric for an explanation.</p>'
-    
-    html += '<div class="metrics-table-wrapper">'
-    html += '<table class="metrics-table">'
-    html += '<thead><tr>'
-    html += '<th class="has-tooltip">Trait<span class="tooltip">The personality dimension being measured</span></th>'
-    html += '<th class="has-tooltip">Orientation<span class="tooltip">Your tendency on this trait: Low (0-0.6), Moderate (0.7-1.3), or High (1.4-2.0)</span></th>'
-    html += '<th class="has-tooltip">Score<span class="tooltip">Average of your scenario-based responses (0-2 scale)</span></th>'
-    html += '<th class="has-tooltip">Pattern<span class="tooltip">Your response pattern across scenarios: A=Low-end choice, B=High-end choice</span></th>'
-    html += '<th class="has-tooltip">Consistency<span class="tooltip">Number of responses matching your most common answer. Higher = more predictable behavior</span></th>'
-    html += '<th class="has-tooltip">Self-Match<span class="tooltip">How close your self-rating is to your scenario average (0=perfect match, 2=maximum difference)</span></th>'
-    html += '<th class="has-tooltip">Adaptability<span class="tooltip">Same as consistency - shows if you maintain a consistent approach or vary by context</span></th>'
-    html += '</tr></thead><tbody>'
+    html = ['<div class="card metrics-table-card">']
+    html.append('<h2>Assessment Metrics Summary</h2>')
+    html.append('<p class="help-text" style="margin-bottom: 20px;">This table shows your scores across all assessed traits. Hover over any metric for an explanation.</p>')
     
-    for trait in selected_traits:
-        result = results[trait]
-        interp = trait_data[trait]['interpretation']
+    html.append('<div class="metrics-table-wrapper">')
+    html.append('<table class="metrics-table">')
+    html.append('<thead><tr>')
+    html.append('<th class="has-tooltip">Trait<span class="tooltip">The personality dimension being measured</span></th>')
+    html.append('<th class="has-tooltip">Orientation<span class="tooltip">Your tendency on this trait: Low (0-0.6), Moderate (0.7-1.3), or High (1.4-2.0)</span></th>')
+    html.append('<th class="has-tooltip">Score<span class="tooltip">Average of your scenario-based responses (0-2 scale)</span></th>')
+    html.append('<th class="has-tooltip">Pattern<span class="tooltip">Your response pattern across scenarios: A=Low-end choice, B=High-end choice</span></th>')
+    html.append('<th class="has-tooltip">Consistency<span class="tooltip">Number of responses matching your most common answer. Higher = more predictable behavior</span></th>')
+    html.append('<th class="has-tooltip">Self-Match<span class="tooltip">How close your self-rating is to your scenario average (0=perfect match, 2=maximum difference)</span></th>')
+    html.append('<th class="has-tooltip">Adaptability<span class="tooltip">Same as consistency - shows if you maintain a consistent approach or vary by context</span></th>')
+    html.append('</tr></thead><tbody>')
+    
+    for trait in assessment:
+        result = trait.result
         orientation, orientation_class = get_trait_orientation(result['score'])
         
         # Determine badge classes
@@ -447,19 +1151,19 @@ def generate_html_structure(selected_traits, results, answers, trait_data, overa
         agreement_display = f"Δ {result['agreement_delta']:.1f}"
         situationality_display = format_fraction(result['consistency_count'], result['scenario_count'])
         
-        html += '<tr>'
-        html += f'<td class="trait-name-cell"><strong>{interp["name"]}</strong><br><span class="trait-range">{interp["lowEnd"]} ↔ {interp["highEnd"]}</span></td>'
-        html += f'<td><span class="badge badge-{orientation_class}">{orientation}</span></td>'
-        html += f'<td class="score-cell">{result["score"]:.2f}</td>'
-        html += f'<td class="pattern-cell"><code>{result["pattern"]}</code></td>'
-        html += f'<td><span class="badge {consistency_class}">{consistency_display}</span></td>'
-        html += f'<td><span class="badge {agreement_class}">{agreement_display}</span></td>'
-        html += f'<td><span class="badge {situationality_class}">{situationality_display}</span></td>'
-        html += '</tr>'
+        html.append('<tr>')
+        html.append(f'<td class="trait-name-cell"><strong>{trait.name}</strong><br><span class="trait-range">{trait.low_end} ↔ {trait.high_end}</span></td>')
+        html.append(f'<td><span class="badge badge-{orientation_class}">{orientation}</span></td>')
+        html.append(f'<td class="score-cell">{result["score"]:.2f}</td>')
+        html.append(f'<td class="pattern-cell"><code>{result["pattern"]}</code></td>')
+        html.append(f'<td><span class="badge {consistency_class}">{consistency_display}</span></td>')
+        html.append(f'<td><span class="badge {agreement_class}">{agreement_display}</span></td>')
+        html.append(f'<td><span class="badge {situationality_class}">{situationality_display}</span></td>')
+        html.append('</tr>')
     
     # Add summary row
-    html += '<tr class="summary-row">'
-    html += '<td colspan="4"><strong>Average Across All Traits</strong></td>'
+    html.append('<tr class="summary-row">')
+    html.append('<td colspan="4"><strong>Average Across All Traits</strong></td>')
     avg_consistency_class = 'badge-high' if avg_consistency > 0.7 else ('badge-medium' if avg_consistency > 0.4 else 'badge-low')
     avg_agreement_class = 'badge-high' if avg_agreement > 0.7 else ('badge-medium' if avg_agreement > 0.4 else 'badge-low')
     avg_situationality_class = 'badge-high' if avg_situationality > 0.7 else ('badge-medium' if avg_situationality > 0.4 else 'badge-low')
@@ -468,317 +1172,74 @@ def generate_html_structure(selected_traits, results, answers, trait_data, overa
     avg_agreement_display = f"{avg_agreement:.2f}"
     avg_situationality_display = format_fraction(total_consistent, total_scenarios)
     
-    html += f'<td><span class="badge {avg_consistency_class}">{avg_consistency_display}</span></td>'
-    html += f'<td><span class="badge {avg_agreement_class}">{avg_agreement_display}</span></td>'
-    html += f'<td><span class="badge {avg_situationality_class}">{avg_situationality_display}</span></td>'
-    html += '</tr>'
+    html.append(f'<td><span class="badge {avg_consistency_class}">{avg_consistency_display}</span></td>')
+    html.append(f'<td><span class="badge {avg_agreement_class}">{avg_agreement_display}</span></td>')
+    html.append(f'<td><span class="badge {avg_situationality_class}">{avg_situationality_display}</span></td>')
+    html.append('</tr>')
     
-    html += '</tbody></table></div></div>'
+    html.append('</tbody></table></div></div>')
     
     # Overall assessment with personality type title
-    html += '<div class="card overall-assessment">'
-    html += '<h2>Overall Personality Assessment</h2>'
+    html.append('<div class="card overall-assessment">')
+    html.append('<h2>Overall Personality Assessment</h2>')
     
     # Add personality type title
     personality_title = overall_assessment.get('personality_type_title', 'Multifaceted Professional')
-    html += f'<div class="personality-type-banner">'
-    html += f'<div class="personality-type-label">Your Personality Type</div>'
-    html += f'<div class="personality-type-title">{personality_title}</div>'
-    html += '<p class="help-text">This title captures your core behavioral signature based on your specific choices across all scenarios.</p>'
-    html += '</div>'
+    html.append(f'<div class="personality-type-banner">')
+    html.append(f'<div class="personality-type-label">Your Personality Type</div>')
+    html.append(f'<div class="personality-type-title">{personality_title}</div>')
+    html.append('<p class="help-text">This title captures your core behavioral signature based on your specific choices across all scenarios.</p>')
+    html.append('</div>')
     
     # Quick metrics overview
-    html += '<div class="metric-grid" style="margin: 20px 0;">'
-    html += f'<div class="metric-card has-tooltip"><div class="metric-label">Traits Assessed</div><div class="metric-value">{len(selected_traits)}</div><span class="tooltip">Number of personality dimensions evaluated in your assessment</span></div>'
-    html += f'<div class="metric-card has-tooltip"><div class="metric-label">Avg Consistency</div><div class="metric-value">{avg_consistency_display}</div><span class="tooltip">How predictable your behavior is across different scenarios</span></div>'
-    html += f'<div class="metric-card has-tooltip"><div class="metric-label">Self-Awareness</div><div class="metric-value">{avg_agreement_display}</div><span class="tooltip">How well your self-perception matches your actual behavioral choices (0-2 scale, lower is better)</span></div>'
-    html += f'<div class="metric-card has-tooltip"><div class="metric-label">Adaptability</div><div class="metric-value">{avg_situationality_display}</div><span class="tooltip">Your tendency to maintain consistent behavior across contexts</span></div>'
-    html += '</div>'
+    html.append('<div class="metric-grid" style="margin: 20px 0;">')
+    html.append(f'<div class="metric-card has-tooltip"><div class="metric-label">Traits Assessed</div><div class="metric-value">{len(assessment)}</div><span class="tooltip">Number of personality dimensions evaluated in your assessment</span></div>')
+    html.append(f'<div class="metric-card has-tooltip"><div class="metric-label">Avg Consistency</div><div class="metric-value">{avg_consistency_display}</div><span class="tooltip">How predictable your behavior is across different scenarios</span></div>')
+    html.append(f'<div class="metric-card has-tooltip"><div class="metric-label">Self-Awareness</div><div class="metric-value">{avg_agreement_display}</div><span class="tooltip">How well your self-perception matches your actual behavioral choices (0-2 scale, lower is better)</span></div>')
+    html.append(f'<div class="metric-card has-tooltip"><div class="metric-label">Adaptability</div><div class="metric-value">{avg_situationality_display}</div><span class="tooltip">Your tendency to maintain consistent behavior across contexts</span></div>')
+    html.append('</div>')
     
     # Add GPT-generated overall assessment sections
-    html += '<div style="margin-top: 30px;">'
-    html += '<h3 style="color: hsl(var(--primary)); font-size: 20px; margin-bottom: 15px;">Personality Profile</h3>'
-    html += f'<p style="line-height: 1.8; margin-bottom: 20px;">{overall_assessment.get("profile_summary", "")}</p>'
+    html.append('<div style="margin-top: 30px;">')
+    html.append('<h3 style="color: hsl(var(--primary)); font-size: 20px; margin-bottom: 15px;">Personality Profile</h3>')
+    html.append(f'<p style="line-height: 1.8; margin-bottom: 20px;">{overall_assessment.get("profile_summary", "")}</p>')
     
-    html += '<h3 style="color: hsl(var(--primary)); font-size: 20px; margin-bottom: 15px;">Decision-Making Style <span class="help-icon has-tooltip">?<span class="tooltip">How you approach decisions and solve problems in professional contexts</span></span></h3>'
-    html += f'<p style="line-height: 1.8; margin-bottom: 20px;">{overall_assessment.get("decision_style", "")}</p>'
+    html.append('<h3 style="color: hsl(var(--primary)); font-size: 20px; margin-bottom: 15px;">Decision-Making Style <span class="help-icon has-tooltip">?<span class="tooltip">How you approach decisions and solve problems in professional contexts</span></span></h3>')
+    html.append(f'<p style="line-height: 1.8; margin-bottom: 20px;">{overall_assessment.get("decision_style", "")}</p>')
     
-    html += '<h3 style="color: hsl(var(--primary)); font-size: 20px; margin-bottom: 15px;">Self-Awareness & Adaptability <span class="help-icon has-tooltip">?<span class="tooltip">How well you understand yourself and adjust to different situations</span></span></h3>'
-    html += f'<p style="line-height: 1.8; margin-bottom: 20px;">{overall_assessment.get("awareness_adaptability", "")}</p>'
+    html.append('<h3 style="color: hsl(var(--primary)); font-size: 20px; margin-bottom: 15px;">Self-Awareness & Adaptability <span class="help-icon has-tooltip">?<span class="tooltip">How well you understand yourself and adjust to different situations</span></span></h3>')
+    html.append(f'<p style="line-height: 1.8; margin-bottom: 20px;">{overall_assessment.get("awareness_adaptability", "")}</p>')
     
-    html += '<h3 style="color: hsl(var(--primary)); font-size: 20px; margin-bottom: 15px;">Behavioral Patterns & Themes <span class="help-icon has-tooltip">?<span class="tooltip">Recurring patterns in how you handle professional challenges</span></span></h3>'
-    html += f'<p style="line-height: 1.8; margin-bottom: 20px;">{overall_assessment.get("patterns_themes", "")}</p>'
+    html.append('<h3 style="color: hsl(var(--primary)); font-size: 20px; margin-bottom: 15px;">Behavioral Patterns & Themes <span class="help-icon has-tooltip">?<span class="tooltip">Recurring patterns in how you handle professional challenges</span></span></h3>')
+    html.append(f'<p style="line-height: 1.8; margin-bottom: 20px;">{overall_assessment.get("patterns_themes", "")}</p>')
     
-    html += '<h3 style="color: hsl(var(--primary)); font-size: 20px; margin-bottom: 15px;">Professional Implications <span class="help-icon has-tooltip">?<span class="tooltip">How your personality affects your work performance and career fit</span></span></h3>'
-    html += f'<p style="line-height: 1.8; margin-bottom: 20px;">{overall_assessment.get("professional_implications", "")}</p>'
+    html.append('<h3 style="color: hsl(var(--primary)); font-size: 20px; margin-bottom: 15px;">Professional Implications <span class="help-icon has-tooltip">?<span class="tooltip">How your personality affects your work performance and career fit</span></span></h3>')
+    html.append(f'<p style="line-height: 1.8; margin-bottom: 20px;">{overall_assessment.get("professional_implications", "")}</p>')
     
-    html += '<h3 style="color: hsl(var(--primary)); font-size: 20px; margin-bottom: 15px;">Development Insights <span class="help-icon has-tooltip">?<span class="tooltip">Recommendations for personal and professional growth</span></span></h3>'
-    html += f'<p style="line-height: 1.8; margin-bottom: 20px;">{overall_assessment.get("development_insights", "")}</p>'
-    html += '</div>'
+    html.append('<h3 style="color: hsl(var(--primary)); font-size: 20px; margin-bottom: 15px;">Development Insights <span class="help-icon has-tooltip">?<span class="tooltip">Recommendations for personal and professional growth</span></span></h3>')
+    html.append(f'<p style="line-height: 1.8; margin-bottom: 20px;">{overall_assessment.get("development_insights", "")}</p>')
+    html.append('</div>')
     
-    html += '</div>'
+    html.append('</div>')
     
-    # Detailed trait analysis
-    for trait in selected_traits:
-        interp = trait_data[trait]['interpretation']
-        result = results[trait]
-        pattern_info = trait_data[trait]['patterns'].get(result['pattern'], {})
-        
-        html += '<div class="result-card">'
-        html += f'<div class="result-header"><h3>{interp["name"]}</h3><span class="toggle-icon">▼</span></div>'
-        html += '<div class="result-content">'
-        
-        # Metrics
-        html += '<div class="metric-grid">'
-        consistency_class = 'badge-high' if result['consistency'] > 0.7 else ('badge-medium' if result['consistency'] > 0.4 else 'badge-low')
-        agreement_class = 'badge-high' if result['agreement'] > 0.7 else ('badge-medium' if result['agreement'] > 0.4 else 'badge-low')
-        situationality_class = 'badge-high' if result['situationality'] > 0.6 else ('badge-medium' if result['situationality'] > 0.3 else 'badge-low')
-        
-        html += f'<div class="metric-card has-tooltip"><div class="metric-label">Consistency</div><div class="metric-value badge {consistency_class}">{int(result["consistency"]*100)}%</div><span class="tooltip">How similar your responses were across scenarios for this trait</span></div>'
-        html += f'<div class="metric-card has-tooltip"><div class="metric-label">Self-Awareness</div><div class="metric-value badge {agreement_class}">{int(result["agreement"]*100)}%</div><span class="tooltip">Match between self-rating and scenario-based behavior</span></div>'
-        html += f'<div class="metric-card has-tooltip"><div class="metric-label">Adaptability</div><div class="metric-value badge {situationality_class}">{int(result["situationality"]*100)}%</div><span class="tooltip">Degree of contextual flexibility in your responses</span></div>'
-        html += '</div>'
-        
-        # Behavioral Profile
-        html += '<div class="analysis-section">'
-        html += '<h4>Behavioral Profile <span class="help-icon has-tooltip">?<span class="tooltip">How you actually behave in professional situations based on your scenario choices</span></span> <span class="toggle-icon">▼</span></h4>'
-        html += '<div class="analysis-content">'
-        
-        if result['score'] < 0.7:
-            tendency = interp['lowEnd']
-        elif result['score'] > 1.3:
-            tendency = interp['highEnd']
-        else:
-            tendency = 'Balanced'
-        
-        html += f'<p><strong>Primary Orientation:</strong> {tendency}</p>'
-        html += f'<p>{{BEHAVIORAL_PROFILE_{trait}}}</p>'
-        html += f'<p><strong>Response Pattern:</strong> {result["pattern"]}</p>'
-        html += '</div></div>'
-        
-        # Self-Awareness Analysis
-        html += '<div class="analysis-section">'
-        html += '<h4>Self-Awareness Analysis <span class="help-icon has-tooltip">?<span class="tooltip">Comparison between how you see yourself and how you actually behave</span></span> <span class="toggle-icon">▼</span></h4>'
-        html += '<div class="analysis-content">'
-        html += f'<p>{{SELF_AWARENESS_{trait}}}</p>'
-        html += f'<p><strong>Agreement Score:</strong> {int(result["agreement"]*100)}% (Self-rating: {result["verification"]}, Scenario average: {result["score"]:.2f})</p>'
-        html += '</div></div>'
-        
-        # Adaptability
-        html += '<div class="analysis-section">'
-        html += '<h4>Contextual Adaptability <span class="help-icon has-tooltip">?<span class="tooltip">Your tendency to adjust behavior based on different situations</span></span> <span class="toggle-icon">▼</span></h4>'
-        html += '<div class="analysis-content">'
-        html += f'<p>{{ADAPTABILITY_{trait}}}</p>'
-        html += f'<p><strong>Consistency Score:</strong> {int(result["consistency"]*100)}%</p>'
-        html += '</div></div>'
-        
-        # Pattern Analysis
-        html += '<div class="analysis-section">'
-        html += '<h4>Pattern Analysis <span class="help-icon has-tooltip">?<span class="tooltip">Interpretation of your specific response pattern across scenarios</span></span> <span class="toggle-icon">▼</span></h4>'
-        html += '<div class="analysis-content">'
-        html += f'<p><strong>{pattern_info.get("label", "Pattern Identified")}</strong></p>'
-        html += f'<p>{{PATTERN_SUMMARY_{trait}}}</p>'
-        html += f'<p><strong>Decision Logic:</strong> {pattern_info.get("logic", "N/A")}</p>'
-        html += f'<p><strong>Observable Cues:</strong> {pattern_info.get("cues", "N/A")}</p>'
-        html += f'<p><strong>Organizational Impact:</strong> {pattern_info.get("impact", "N/A")}</p>'
-        html += f'<p><strong>Risk Profile:</strong> {pattern_info.get("risk", "N/A")}</p>'
-        html += f'<p><strong>Development Recommendations:</strong> {pattern_info.get("development", "N/A")}</p>'
-        html += '</div></div>'
-        
-        # Your Responses section
-        html += '<div class="analysis-section">'
-        html += '<h4>Your Responses & Score Breakdown <span class="help-icon has-tooltip">?<span class="tooltip">Detailed view of each question and your specific choice</span></span> <span class="toggle-icon">▼</span></h4>'
-        html += '<div class="analysis-content">'
-        
-        trait_questions = trait_data[trait]['questions']
-        trait_answers = answers[trait]
-        
-        for q in trait_questions:
-            q_id = q['id']
-            q_text = q['text']
-            user_answer = trait_answers.get(q_id)
-            
-            # Find the selected option
-            selected_option = None
-            for opt in q['options']:
-                if opt['value'] == user_answer:
-                    selected_option = opt
-                    break
-            
-            if selected_option:
-                html += '<div style="margin-bottom: 20px; padding: 15px; background: hsl(var(--card-bg)); border-left: 3px solid hsl(var(--primary));">'
-                html += f'<p><strong>Question {q_id}:</strong> {q_text}</p>'
-                html += f'<p><strong>Your Choice:</strong> {selected_option["label"]}</p>'
-                html += f'<p><strong>Score:</strong> {selected_option["value"]} | <strong>What this reveals:</strong> {selected_option.get("decoding", "N/A")}</p>'
-                html += '</div>'
-        
-        html += '</div></div>'
-        
-        html += '</div></div>'
+    # Detailed trait analysis, one cached card per trait
+    html.extend(trait_card_html(trait) for trait in assessment)
     
-    return html
+    return ''.join(html)
 
-@app.route('/api/download', methods=['POST'])
+def build_assessment_pdf(data):
+    """Render the personality assessment PDF for a /api/download payload into a buffer"""
+    return pdf_reports.render_report('assessment', data)
+
+@bp.route('/api/download', methods=['POST'])
+@traced('download_report')
 def download_report():
     """Generate comprehensive PDF report with AI analysis"""
     try:
-        data = request.json or {}
-        selected_traits = data.get('selectedTraits', [])
-        answers = data.get('answers', {})
-        results = data.get('results', {})
-        overall_assessment = data.get('overallAssessment', {})
-        trait_analyses = data.get('traitAnalyses', {})
-        trait_data = data.get('traitData', {})
-        
-        # Create PDF in memory
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.75*inch, bottomMargin=0.75*inch)
-        story = []
-        
-        # Styles
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor='#5a9f8a',
-            spaceAfter=12,
-            alignment=TA_CENTER
-        )
-        
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=16,
-            textColor='#4a8f7a',
-            spaceAfter=10,
-            spaceBefore=15
-        )
-        
-        subheading_style = ParagraphStyle(
-            'CustomSubheading',
-            parent=styles['Heading3'],
-            fontSize=13,
-            textColor='#3a7f6a',
-            spaceAfter=8,
-            spaceBefore=10
-        )
-        
-        body_style = ParagraphStyle(
-            'CustomBody',
-            parent=styles['Normal'],
-            fontSize=10,
-            spaceAfter=6,
-            leading=14
-        )
-        
-        # Title Page
-        story.append(Paragraph("Personality Assessment Report", title_style))
-        story.append(Paragraph(f"Generated: {datetime.now().strftime('%B %d, %Y')}", styles['Normal']))
-        story.append(Spacer(1, 0.5*inch))
-        
-        # Overall Assessment
-        if overall_assessment:
-            story.append(Paragraph("Overall Personality Assessment", heading_style))
-            
-            # Personality Type Title
-            personality_title = overall_assessment.get('personality_type_title', 'Multifaceted Professional')
-            story.append(Paragraph(f"<b>Your Personality Type: {personality_title}</b>", body_style))
-            story.append(Spacer(1, 0.2*inch))
-            
-            # Profile Summary
-            story.append(Paragraph("<b>Personality Profile</b>", subheading_style))
-            story.append(Paragraph(overall_assessment.get('profile_summary', ''), body_style))
-            story.append(Spacer(1, 0.1*inch))
-            
-            # Decision-Making Style
-            story.append(Paragraph("<b>Decision-Making Style</b>", subheading_style))
-            story.append(Paragraph(overall_assessment.get('decision_style', ''), body_style))
-            story.append(Spacer(1, 0.1*inch))
-            
-            # Self-Awareness & Adaptability
-            story.append(Paragraph("<b>Self-Awareness &amp; Adaptability</b>", subheading_style))
-            story.append(Paragraph(overall_assessment.get('awareness_adaptability', ''), body_style))
-            story.append(Spacer(1, 0.1*inch))
-            
-            # Behavioral Patterns
-            story.append(Paragraph("<b>Behavioral Patterns &amp; Themes</b>", subheading_style))
-            story.append(Paragraph(overall_assessment.get('patterns_themes', ''), body_style))
-            story.append(Spacer(1, 0.1*inch))
-            
-            # Professional Implications
-            story.append(Paragraph("<b>Professional Implications</b>", subheading_style))
-            story.append(Paragraph(overall_assessment.get('professional_implications', ''), body_style))
-            story.append(Spacer(1, 0.1*inch))
-            
-            # Development Insights
-            story.append(Paragraph("<b>Development Insights</b>", subheading_style))
-            story.append(Paragraph(overall_assessment.get('development_insights', ''), body_style))
-            
-            story.append(PageBreak())
-        
-        # Detailed Trait Analysis
-        for trait in selected_traits:
-            result = results.get(trait, {})
-            trait_info = trait_data.get(trait, {})
-            interp = trait_info.get('interpretation', {})
-            trait_analysis = trait_analyses.get(trait, {})
-            
-            story.append(Paragraph(f"{interp.get('name', trait)}", heading_style))
-            story.append(Paragraph(f"<i>{interp.get('lowEnd', '')} ↔ {interp.get('highEnd', '')}</i>", body_style))
-            story.append(Spacer(1, 0.1*inch))
-            
-            # Metrics
-            story.append(Paragraph(f"<b>Score:</b> {result.get('score', 0):.2f} | <b>Pattern:</b> {result.get('pattern', 'N/A')} | <b>Consistency:</b> {int(result.get('consistency', 0)*100)}% | <b>Self-Awareness:</b> {int(result.get('agreement', 0)*100)}%", body_style))
-            story.append(Spacer(1, 0.15*inch))
-            
-            # AI Analysis
-            if trait_analysis:
-                story.append(Paragraph("<b>Behavioral Profile</b>", subheading_style))
-                story.append(Paragraph(trait_analysis.get('behavioral_profile', ''), body_style))
-                story.append(Spacer(1, 0.1*inch))
-                
-                story.append(Paragraph("<b>Self-Awareness Analysis</b>", subheading_style))
-                story.append(Paragraph(trait_analysis.get('self_awareness', ''), body_style))
-                story.append(Spacer(1, 0.1*inch))
-                
-                story.append(Paragraph("<b>Adaptability</b>", subheading_style))
-                story.append(Paragraph(trait_analysis.get('adaptability', ''), body_style))
-                story.append(Spacer(1, 0.1*inch))
-                
-                story.append(Paragraph("<b>Pattern Summary</b>", subheading_style))
-                story.append(Paragraph(trait_analysis.get('pattern_summary', ''), body_style))
-            
-            # Questions and Answers
-            story.append(Spacer(1, 0.2*inch))
-            story.append(Paragraph("<b>Your Responses</b>", subheading_style))
-            
-            trait_questions = trait_info.get('questions', [])
-            trait_answers = answers.get(trait, {})
-            
-            for q in trait_questions:
-                q_id = q.get('id', '')
-                q_text = q.get('text', '')
-                user_answer = trait_answers.get(q_id)
-                
-                # Find selected option
-                selected_option = None
-                for opt in q.get('options', []):
-                    if opt.get('value') == user_answer:
-                        selected_option = opt
-                        break
-                
-                if selected_option:
-                    story.append(Paragraph(f"<b>Q{q_id}:</b> {q_text}", body_style))
-                    story.append(Paragraph(f"<i>Your choice:</i> {selected_option.get('label', '')} (Score: {selected_option.get('value', 0)})", body_style))
-                    story.append(Paragraph(f"<i>Reveals:</i> {selected_option.get('decoding', 'N/A')}", body_style))
-                    story.append(Spacer(1, 0.1*inch))
-            
-            story.append(PageBreak())
-        
-        # Build PDF
-        doc.build(story)
-        buffer.seek(0)
+        with span('parse_request'):
+            data = request.json or {}
+        with span('render_pdf'):
+            buffer = build_assessment_pdf(data)
         
         return send_file(
             buffer,
@@ -799,10 +1260,223 @@ def download_report():
 
 
 
+def render_report(kind, data):
+    """Render an assessment or match report payload to PDF bytes (picklable for process pools)"""
+    return pdf_reports.render_report(kind, data).getvalue()
+
+def load_stored_assessment(assessment_id):
+    """Return a stored assessment as a /api/download payload"""
+    record = assessment_store.get_assessment(assessment_id)
+    if record is None:
+        raise ValueError(f'Unknown assessmentId {assessment_id}')
+    return record
+
+@bp.route('/api/export/bulk', methods=['POST'])
+def export_reports():
+    """Render many assessment and match reports in parallel and stream them as one ZIP archive.
+    
+    Body: {"reports": [{"type": "assessment", "assessmentId": ...} |
+                       {"type": "assessment" | "match", "data": <download payload>, "label": ...}]}
+    Poll GET /api/export/<jobId> (jobId is in the X-Export-Job header) for progress.
+    """
+    try:
+        data = request.json or {}
+        reports = data.get('reports', [])
+        if not reports:
+            return jsonify({'error': 'No reports requested'}), 400
+        if len(reports) > bulk_export.EXPORT_MAX_REPORTS:
+            return jsonify({'error': f'At most {bulk_export.EXPORT_MAX_REPORTS} reports per export'}), 400
+        
+        entries = []
+        for item in reports:
+            kind = item.get('type', 'assessment')
+            if kind not in ('assessment', 'match'):
+                return jsonify({'error': f'Unknown report type: {kind}'}), 400
+            if kind == 'assessment' and item.get('assessmentId'):
+                assessment_id = item['assessmentId']
+                entries.append({
+                    'kind': kind,
+                    'label': item.get('label') or assessment_id,
+                    'load': lambda assessment_id=assessment_id: load_stored_assessment(assessment_id)
+                })
+            elif isinstance(item.get('data'), dict):
+                payload = item['data']
+                entries.append({
+                    'kind': kind,
+                    'label': item.get('label') or payload.get('candidateName'),
+                    'load': lambda payload=payload: payload
+                })
+            else:
+                return jsonify({'error': 'Each report needs an assessmentId or a data payload'}), 400
+        
+        job_id = bulk_export.new_job(len(entries))
+        print(f"\nBULK EXPORT {job_id}: {len(entries)} reports")
+        
+        return Response(
+            stream_with_context(bulk_export.stream_zip(job_id, entries, render_report)),
+            mimetype='application/zip',
+            headers={
+                'Content-Disposition': f'attachment; filename=reports-{datetime.now().strftime("%Y-%m-%d")}.zip',
+                'X-Export-Job': job_id
+            }
+        )
+        
+    except Exception as e:
+        print(f"Error in bulk export: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/export/<job_id>', methods=['GET'])
+def export_progress(job_id):
+    """Report how many reports of a bulk export have been written"""
+    progress = bulk_export.get_progress(job_id)
+    if progress is None:
+        return jsonify({'error': 'Unknown export job'}), 404
+    return jsonify(progress)
+
+@bp.route('/api/rank', methods=['POST'])
+@traced('rank')
+def rank_candidates():
+    """Rank every indexed candidate against a job profile from stored trait scores, without GPT calls.
+    
+    Body: {"job_requirements": {trait: "low"|"medium"|"high" or {"level": ...}}, "k": 10,
+    "min_coverage": 0.5 (optional share of required traits the candidate must have been assessed on)};
+    "job_profile_id" may stand in for job_requirements.
+    """
+    try:
+        data = request.json or {}
+        try:
+            job_requirements = requested_job_requirements(data) or {}
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        if not job_requirements:
+            return jsonify({'error': 'Job requirements are required'}), 400
+        job_requirements = {
+            name: requirement if isinstance(requirement, dict) else {'level': requirement}
+            for name, requirement in job_requirements.items()
+        }
+        k = int(data.get('k', 10))
+        min_coverage = float(data.get('min_coverage', 0))
+        
+        with span('rank'):
+            ranking = candidate_index.rank(job_requirements, k, min_coverage)
+        return jsonify(ranking)
+        
+    except Exception as e:
+        print(f"Error in rank: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/catalog/manifest', methods=['GET'])
+def catalog_manifest():
+    """Trait names and question counts for trait selection, with each trait's bundle URL"""
+    try:
+        manifest = catalog.manifest()
+        response = jsonify(manifest)
+        response.set_etag(manifest['version'])
+        # Small and revalidated on every load so new bundle fingerprints are picked up
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+    except Exception as e:
+        print(f"Error in catalog manifest: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/catalog/<fingerprint>/<trait>.json', methods=['GET'])
+def catalog_bundle(fingerprint, trait):
+    """One trait's questions, interpretation and patterns; immutable under its fingerprinted URL"""
+    bundle = catalog.bundles().get(trait)
+    if bundle is None:
+        return jsonify({'error': f'Unknown trait {trait}'}), 404
+    if fingerprint != bundle[0]:
+        # A page loaded before a catalog change asks for an old fingerprint; send the current one
+        return redirect(catalog.bundle_url(trait, bundle[0]))
+    response = Response(bundle[1], mimetype='application/json')
+    response.set_etag(fingerprint)
+    response.cache_control.public = True
+    response.cache_control.max_age = 31536000
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
+
+def requested_job_requirements(fields):
+    """Job requirements a match request refers to: the stored profile named by job_profile_id, or
+    its job_requirements (a JSON string in forms, an object in JSON bodies). None when neither is
+    given; LookupError for an unknown profile id.
+    """
+    profile_id = fields.get('job_profile_id')
+    if profile_id:
+        profile = job_profiles.get_profile(profile_id)
+        if profile is None:
+            raise LookupError(f'Unknown job profile {profile_id}')
+        return profile['requirements']
+    job_requirements = fields.get('job_requirements')
+    if isinstance(job_requirements, str):
+        return json.loads(job_requirements) if job_requirements else None
+    return job_requirements
+
+def save_job_profile(profile_id, data):
+    """Validate and store a profile body ({"name", "requirements"}) and compile its prompt prefixes"""
+    name = job_profiles.normalize_name(data.get('name'))
+    requirements = job_profiles.normalize_requirements(data.get('requirements'))
+    profile = job_profiles.save_profile(profile_id, name, requirements)
+    # Compiled now rather than on this worker's first match against the profile
+    for kind in ('report', 'prescored'):
+        matching_prompt_prefix(kind, requirements)
+    return profile
+
+@bp.route('/api/job-profiles', methods=['GET'])
+def list_job_profiles():
+    """Stored job profiles, most recently updated first"""
+    try:
+        return jsonify({'profiles': job_profiles.list_profiles()})
+    except Exception as e:
+        print(f"Error listing job profiles: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/job-profiles', methods=['POST'])
+def create_job_profile():
+    """Store a job profile; match requests can then send its id as job_profile_id.
+    
+    Body: {"name": ..., "requirements": {trait: {"level": "low"|"medium"|"high", "description": ...}}}
+    """
+    try:
+        profile = save_job_profile(job_profiles.new_profile_id(), request.json or {})
+        print(f"Created job profile {profile['id']} ({profile['name']}, {len(profile['requirements'])} traits)")
+        return jsonify(profile), 201
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error creating job profile: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/job-profiles/<profile_id>', methods=['GET'])
+def get_job_profile(profile_id):
+    profile = job_profiles.get_profile(profile_id)
+    if profile is None:
+        return jsonify({'error': 'Unknown job profile'}), 404
+    return jsonify(profile)
+
+@bp.route('/api/job-profiles/<profile_id>', methods=['PUT'])
+def update_job_profile(profile_id):
+    """Replace a stored profile's name and requirements"""
+    try:
+        if job_profiles.get_profile(profile_id) is None:
+            return jsonify({'error': 'Unknown job profile'}), 404
+        return jsonify(save_job_profile(profile_id, request.json or {}))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error updating job profile: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/job-profiles/<profile_id>', methods=['DELETE'])
+def delete_job_profile(profile_id):
+    if not job_profiles.delete_profile(profile_id):
+        return jsonify({'error': 'Unknown job profile'}), 404
+    return jsonify({'deleted': profile_id})
+
+
 #!/usr/bin/env python3
 # ADD THIS ROUTE TO YOUR EXISTING app.py FILE
 
-@app.route('/match')
+@bp.route('/match')
 def match_page():
     """Serve the job matching page"""
     return send_from_directory('public', 'match.html')
@@ -811,22 +1485,10 @@ def match_page():
 def extract_assessed_traits(candidate_text):
     """Extract list of traits that were actually assessed in the candidate's report"""
     
-    # All possible trait names from your assessment tool
-    all_trait_names = [
-        'Analytical Thinking', 'Intuitive Thinking', 'Risk-Taking', 'Risk Aversion',
-        'Collaboration', 'Independent Work', 'Detail Orientation', 'Big Picture Thinking',
-        'Adaptability', 'Consistency', 'Proactivity', 'Reactivity',
-        'Empathy', 'Task Focus', 'Innovation', 'Process Adherence',
-        'Decisiveness', 'Deliberation', 'Assertiveness', 'Diplomacy',
-        'Optimism', 'Realism', 'Structured', 'Flexible',
-        'Results-Oriented', 'Process-Oriented', 'Competitive', 'Cooperative',
-        'Confidence', 'Humility'
-    ]
-    
     assessed_traits = []
     
     # Look for traits mentioned in section headers or trait analysis sections
-    for trait in all_trait_names:
+    for trait in catalog.JOB_TRAITS:
         # Check if trait appears as a header or in "Trait:" format
         if trait in candidate_text:
             # Additional verification: check if it appears in a substantial way
@@ -851,21 +1513,18 @@ def extract_assessed_traits(candidate_text):
     
     return assessed_traits
 
+@profiled('pdf_extract')
 def extract_text_from_pdf(pdf_file):
     """Extract text content from PDF file"""
     try:
         from PyPDF2 import PdfReader
-        import io
         
-        # Read PDF from file object
-        pdf_bytes = pdf_file.read()
-        pdf_stream = io.BytesIO(pdf_bytes)
+        # Parse straight from the uploaded (possibly disk-spooled) file rather than a copy
+        pdf_stream = pdf_file.stream
+        pdf_stream.seek(0)
         
         reader = PdfReader(pdf_stream)
-        text = ""
-        
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
+        text = "\n".join(page.extract_text() for page in reader.pages)
         
         return text.strip()
         
@@ -875,46 +1534,18 @@ def extract_text_from_pdf(pdf_file):
 
 
 
-def generate_matching_analysis_from_traits(candidate_text, job_requirements, assessed_traits):
-    """Use GPT to analyze candidate-job fit based on specific trait requirements"""
-    
-    # Build requirements summary with better formatting
+def build_matching_prefix(job_requirements):
+    """Candidate-independent start of the raw-report matching prompt: the role profile and the instructions"""
     requirements_summary = "REQUIRED TRAIT PROFILE FOR THE ROLE:\n"
     requirements_summary += "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
     
-    # Categorize required traits into assessed and not assessed
-    directly_assessed = []
-    not_assessed = []
-    
     for trait_name, trait_data in job_requirements.items():
-        level = trait_data['level'].upper()
-        description = trait_data['description']
-        
-        is_assessed = trait_name in assessed_traits
-        
-        if is_assessed:
-            directly_assessed.append(trait_name)
-            requirements_summary += f"✓ **{trait_name}** (Required: {level}) — DIRECTLY ASSESSED\n"
-        else:
-            not_assessed.append(trait_name)
-            requirements_summary += f"⚠ **{trait_name}** (Required: {level}) — NOT ASSESSED (inference only)\n"
-        
-        requirements_summary += f"   Purpose: {description}\n\n"
+        requirements_summary += f"• **{trait_name}** (Required: {trait_data['level'].upper()})\n"
+        requirements_summary += f"   Purpose: {trait_data['description']}\n\n"
     
-    # Build comprehensive prompt with improvements
-    prompt = f"""You are an expert HR analyst and organizational psychologist specializing in personality-based job fit analysis.
-
-CANDIDATE'S PERSONALITY ASSESSMENT REPORT:
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-{candidate_text[:10000]}
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+    return f"""You are an expert HR analyst and organizational psychologist specializing in personality-based job fit analysis.
 
 {requirements_summary}
-
-ASSESSMENT COVERAGE:
-✓ DIRECTLY ASSESSED ({len(directly_assessed)} traits): {', '.join(directly_assessed) if directly_assessed else 'NONE'}
-⚠ NOT ASSESSED ({len(not_assessed)} traits): {', '.join(not_assessed) if not_assessed else 'NONE'}
-
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 ANALYSIS INSTRUCTIONS
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -1047,23 +1678,143 @@ Format as valid JSON (no markdown):
   "executive_summary": "Multi-paragraph summary..."
 }}
 
-Required traits to analyze: {', '.join(job_requirements.keys())}"""
+Required traits to analyze: {', '.join(job_requirements.keys())}
 
-    print("\n" + "="*80)
-    print("GPT PROMPT FOR JOB MATCHING ANALYSIS")
-    print("="*80)
-    print(f"Prompt length: {len(prompt)} characters")
-    print(f"Directly assessed: {len(directly_assessed)} traits")
-    print(f"Non-assessed: {len(not_assessed)} traits")
-    print("="*80 + "\n")
+The candidate's report and which of the required traits it assesses follow.
+
+"""
+
+def build_matching_prompt(candidate_text, job_requirements, assessed_traits):
+    """Build the GPT job-matching prompt; returns the prompt and the assessed/non-assessed trait split.
     
-    try:
-        response = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system", 
-                    "content": """You are an expert HR analyst specializing in personality-based job fit analysis.
+    The role-specific instructions come first and are compiled once per requirements set (see
+    matching_prompt_prefix), so consecutive candidates for a role share the prompt's prefix.
+    """
+    directly_assessed = [name for name in job_requirements if name in assessed_traits]
+    not_assessed = [name for name in job_requirements if name not in assessed_traits]
+    
+    prompt = matching_prompt_prefix('report', job_requirements) + f"""CANDIDATE'S PERSONALITY ASSESSMENT REPORT:
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+{candidate_text[:10000]}
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+ASSESSMENT COVERAGE:
+✓ DIRECTLY ASSESSED ({len(directly_assessed)} traits): {', '.join(directly_assessed) if directly_assessed else 'NONE'}
+⚠ NOT ASSESSED ({len(not_assessed)} traits): {', '.join(not_assessed) if not_assessed else 'NONE'}"""
+    
+    return prompt, directly_assessed, not_assessed
+
+def build_prescored_matching_prefix(job_requirements):
+    """Candidate-independent start of the pre-scored matching prompt: the role profile and the writing rules"""
+    parts = ["""You are an expert HR analyst and organizational psychologist specializing in personality-based job fit analysis.
+
+The candidate's scores have ALREADY BEEN COMPUTED from their assessment metrics. Do not re-score: your job is
+the written analysis that explains these scores with the evidence that follows.
+
+REQUIRED TRAIT PROFILE FOR THE ROLE:
+"""]
+    for trait_name, trait_data in job_requirements.items():
+        parts.append(f"• **{trait_name}** (Required: {trait_data['level'].upper()})\n")
+        parts.append(f"   Purpose: {trait_data['description']}\n")
+    
+    parts.append(f"""
+WRITING RULES:
+• Ground every statement in the candidate's dimensions and choices below; quote choices as evidence
+• Non-assessed traits: neutral framing, conditional language, recommend validation
+• Hiring recommendation (Strong Hire | Hire | Conditional | Not Recommended) must follow the computed overall fit:
+  Strong Hire ≥4.0, Hire ≥3.5, Conditional 3.0-3.4, Not Recommended <3.0
+
+Respond with JSON only:
+{{
+  "trait_scores": {{"trait_name": {{"analysis": "3-5 sentences with evidence", "secondary_inference": "non-assessed traits only"}}}},
+  "key_strengths": ["4-6 items"],
+  "potential_concerns": ["2-4 items, assessed traits only"],
+  "areas_requiring_evaluation": ["trait: reason"],
+  "development_needs": ["3-5 items"],
+  "specific_evidence": ["5-8 quoted choices"],
+  "assessment_coverage": "2-3 sentences",
+  "risk_assessment": "2-3 paragraphs",
+  "hiring_recommendation": "decision with rationale",
+  "onboarding_recommendations": ["4-6 items"],
+  "executive_summary": "3-4 paragraphs"
+}}
+
+Required traits to analyze: {', '.join(job_requirements.keys())}
+
+The candidate's assessed dimensions and computed fit follow.
+
+""")
+    return ''.join(parts)
+
+def build_prescored_matching_prompt(report, prescored, job_requirements):
+    """Build the compact job-matching prompt around locally computed scores (see prescoring)"""
+    dimensions = report['dimensions']
+    used = {entry['dimension'] for entry in prescored['trait_scores'].values() if entry.get('dimension')}
+    
+    parts = [matching_prompt_prefix('prescored', job_requirements)]
+    if report['personality_type']:
+        parts.append(f"CANDIDATE PERSONALITY TYPE: {report['personality_type']}\n\n")
+    parts.append("ASSESSED DIMENSIONS BEHIND THE REQUIRED TRAITS (score 0 = first end, 2 = second end):\n")
+    for key in [key for key in dimensions if key in used]:
+        d = dimensions[key]
+        parts.append(
+            f"- {d['name']} ({d['low_end']} ↔ {d['high_end']}): score {d['score']:.2f}, pattern {d['pattern']}, "
+            f"consistency {d['consistency']:.0%}, self-awareness {d['agreement']:.0%}\n"
+        )
+        for choice in d['choices']:
+            parts.append(f"    • chose: {choice}\n")
+    
+    others = [d for key, d in dimensions.items() if key not in used]
+    if others:
+        parts.append("\nOTHER ASSESSED DIMENSIONS (for cautious inference only):\n")
+        for d in others:
+            parts.append(f"- {d['name']} ({d['low_end']} ↔ {d['high_end']}): score {d['score']:.2f}, consistency {d['consistency']:.0%}\n")
+    
+    parts.append("\nCOMPUTED FIT FOR THE ROLE (1-5):\n")
+    for trait_name, trait_data in job_requirements.items():
+        computed = prescored['trait_scores'][trait_name]
+        level = trait_data['level'].upper()
+        if computed['directly_assessed']:
+            parts.append(f"✓ **{trait_name}** (Required: {level}) — DIRECTLY ASSESSED via {dimensions[computed['dimension']]['name']} — score {computed['score']}\n")
+        else:
+            parts.append(f"⚠ **{trait_name}** (Required: {level}) — NOT ASSESSED — neutral score 3\n")
+    parts.append(f"\nOVERALL FIT: {prescored['overall_fit_score']} ({prescored['overall_fit_label']})\n")
+    
+    return ''.join(parts)
+
+def matching_prompt_prefix(kind, job_requirements):
+    """Role-specific start of a matching prompt ('report' or 'prescored'), compiled once per requirements set"""
+    build = build_matching_prefix if kind == 'report' else build_prescored_matching_prefix
+    return matching_prefix_cache.get_or_render((kind, canonical_key(job_requirements)), lambda: build(job_requirements))
+
+@profiled('prompt')
+def prepare_matching(candidate_text, job_requirements, assessed_traits, report=None):
+    """Matching prompt for a candidate report.
+    
+    Returns (prompt, directly_assessed, not_assessed, prescored). When the report's metrics
+    can be parsed, scores are computed locally (prescored) and the prompt is the compact
+    narrative-only one; otherwise prescored is None and the raw report text is sent.
+    `report` is the text's prescoring.parse_report() result when the caller already has it.
+    """
+    if report is None:
+        report = prescoring.parse_report(candidate_text)
+    if report['dimensions']:
+        prescored = prescoring.prescore(job_requirements, report)
+        prompt = build_prescored_matching_prompt(report, prescored, job_requirements)
+        return prompt, prescored['directly_assessed'], prescored['not_assessed'], prescored
+    prompt, directly_assessed, not_assessed = build_matching_prompt(candidate_text, job_requirements, assessed_traits)
+    return prompt, directly_assessed, not_assessed, None
+
+def complete_matching(analysis, job_requirements, directly_assessed, not_assessed, prescored):
+    """Validate and enrich a matching analysis (or a fallback when analysis is None), applying computed scores"""
+    if analysis is None:
+        analysis = _generate_fallback_response(job_requirements, directly_assessed, directly_assessed, not_assessed)
+        return prescoring.apply_scores(analysis, prescored) if prescored else analysis
+    if prescored:
+        analysis = prescoring.apply_scores(analysis, prescored)
+    return finalize_matching_analysis(analysis, job_requirements, directly_assessed, directly_assessed, not_assessed)
+
+MATCHING_SYSTEM_PROMPT = """You are an expert HR analyst specializing in personality-based job fit analysis.
 
 CORE PRINCIPLES:
 1. Evidence-based: Use specific quotes and behavioral examples
@@ -1077,13 +1828,108 @@ CRITICAL RULES:
 • For non-assessed traits: Default to score 3, use conditional language, cite inference basis
 • Never use negative framing for non-assessed traits
 • Always respond with valid JSON only (no markdown, no additional text)"""
-                },
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.5,  # Lower temperature for more consistent, precise responses
-            max_tokens=5000,  # Increased for comprehensive analysis
-            response_format={"type": "json_object"}  # Enforce JSON response
+
+def matching_completion_kwargs(prompt):
+    """Chat completion parameters for the job-matching call"""
+    model, max_tokens = model_router.route('matching', prompt, deadlines.remaining_ms())
+    return dict(
+        model=model,
+        messages=[
+            {"role": "system", "content": MATCHING_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.5,  # Lower temperature for more consistent, precise responses
+        max_tokens=max_tokens,
+        response_format={"type": "json_object"}  # Enforce JSON response
+    )
+
+def finalize_matching_analysis(analysis, job_requirements, assessed_traits, directly_assessed, not_assessed):
+    """Validate and enrich the parsed GPT matching analysis"""
+    # Validation and enrichment
+    if 'trait_scores' not in analysis:
+        analysis['trait_scores'] = {}
+    
+    # Ensure all required traits are present and properly structured
+    for trait_name, trait_data in job_requirements.items():
+        is_assessed = trait_name in assessed_traits
+        
+        if trait_name not in analysis['trait_scores']:
+            # Add missing trait with default structure
+            analysis['trait_scores'][trait_name] = {
+                'score': 3,
+                'required_level': trait_data['level'],
+                'directly_assessed': is_assessed,
+                'confidence_level': 'high' if is_assessed else 'low',
+                'analysis': 'Insufficient information provided in report.' if is_assessed else 'NOT DIRECTLY ASSESSED. This trait requires supplementary evaluation for accurate assessment.',
+                'secondary_inference': '' if is_assessed else 'This trait was not included in the candidate assessment. Direct evaluation recommended if critical for role success.'
+            }
+        else:
+            # Enrich existing trait with missing fields
+            trait_score = analysis['trait_scores'][trait_name]
+            
+            if 'directly_assessed' not in trait_score:
+                trait_score['directly_assessed'] = is_assessed
+            
+            if 'confidence_level' not in trait_score:
+                trait_score['confidence_level'] = 'high' if is_assessed else 'low'
+            
+            if 'required_level' not in trait_score:
+                trait_score['required_level'] = trait_data['level']
+            
+            # Ensure non-assessed traits have secondary_inference
+            if not is_assessed and 'secondary_inference' not in trait_score:
+                trait_score['secondary_inference'] = 'Inferred from related behavioral patterns. Direct assessment needed for validation.'
+            
+            # Validate scoring rules for non-assessed traits
+            if not is_assessed and trait_score.get('score', 3) < 3:
+                trait_score['score'] = 3  # Enforce minimum score of 3 for non-assessed
+                trait_score['analysis'] = f"NOT DIRECTLY ASSESSED (score adjusted to neutral). {trait_score.get('analysis', '')}"
+    
+    # Add missing top-level fields
+    if 'areas_requiring_evaluation' not in analysis:
+        analysis['areas_requiring_evaluation'] = [
+            f"{trait}: Not directly assessed, requires validation" 
+            for trait in not_assessed
+        ]
+    
+    if 'assessment_coverage' not in analysis:
+        coverage_pct = (len(directly_assessed) / len(job_requirements) * 100) if job_requirements else 0
+        analysis['assessment_coverage'] = (
+            f"Assessment Coverage: {len(directly_assessed)}/{len(job_requirements)} required traits "
+            f"({coverage_pct:.0f}%) were directly assessed. The remaining {len(not_assessed)} trait(s) "
+            f"are inferred from related behaviors and should not be weighted heavily in final decisions "
+            f"without supplementary evaluation."
         )
+    
+    # Add metadata for tracking
+    analysis['_metadata'] = {
+        'total_traits_required': len(job_requirements),
+        'directly_assessed_count': len(directly_assessed),
+        'non_assessed_count': len(not_assessed),
+        'assessment_coverage_percentage': (len(directly_assessed) / len(job_requirements) * 100) if job_requirements else 0
+    }
+    
+    return analysis
+
+def generate_matching_analysis_from_traits(candidate_text, job_requirements, assessed_traits, report=None):
+    """Use GPT to analyze candidate-job fit based on specific trait requirements"""
+    with span('prompt_matching') as attrs:
+        prompt, directly_assessed, not_assessed, prescored = prepare_matching(candidate_text, job_requirements, assessed_traits, report)
+        attrs['prescored'] = prescored is not None
+    
+    print("\n" + "="*80)
+    print("GPT PROMPT FOR JOB MATCHING ANALYSIS")
+    print("="*80)
+    print(f"Prompt length: {len(prompt)} characters ({'pre-scored' if prescored else 'raw report text'})")
+    print(f"Directly assessed: {len(directly_assessed)} traits")
+    print(f"Non-assessed: {len(not_assessed)} traits")
+    print("="*80 + "\n")
+    
+    content = ""
+    try:
+        kwargs = matching_completion_kwargs(prompt)
+        with span('llm_matching', model=kwargs['model']):
+            response = create_completion(kwargs)
         
         content = response.choices[0].message.content or "{}"
         
@@ -1097,84 +1943,23 @@ CRITICAL RULES:
         # Parse JSON (should be clean with response_format)
         analysis = json.loads(content)
         
-        # Validation and enrichment
-        if 'trait_scores' not in analysis:
-            analysis['trait_scores'] = {}
-        
-        # Ensure all required traits are present and properly structured
-        for trait_name, trait_data in job_requirements.items():
-            is_assessed = trait_name in assessed_traits
-            
-            if trait_name not in analysis['trait_scores']:
-                # Add missing trait with default structure
-                analysis['trait_scores'][trait_name] = {
-                    'score': 3,
-                    'required_level': trait_data['level'],
-                    'directly_assessed': is_assessed,
-                    'confidence_level': 'high' if is_assessed else 'low',
-                    'analysis': 'Insufficient information provided in report.' if is_assessed else 'NOT DIRECTLY ASSESSED. This trait requires supplementary evaluation for accurate assessment.',
-                    'secondary_inference': '' if is_assessed else 'This trait was not included in the candidate assessment. Direct evaluation recommended if critical for role success.'
-                }
-            else:
-                # Enrich existing trait with missing fields
-                trait_score = analysis['trait_scores'][trait_name]
-                
-                if 'directly_assessed' not in trait_score:
-                    trait_score['directly_assessed'] = is_assessed
-                
-                if 'confidence_level' not in trait_score:
-                    trait_score['confidence_level'] = 'high' if is_assessed else 'low'
-                
-                if 'required_level' not in trait_score:
-                    trait_score['required_level'] = trait_data['level']
-                
-                # Ensure non-assessed traits have secondary_inference
-                if not is_assessed and 'secondary_inference' not in trait_score:
-                    trait_score['secondary_inference'] = 'Inferred from related behavioral patterns. Direct assessment needed for validation.'
-                
-                # Validate scoring rules for non-assessed traits
-                if not is_assessed and trait_score.get('score', 3) < 3:
-                    trait_score['score'] = 3  # Enforce minimum score of 3 for non-assessed
-                    trait_score['analysis'] = f"NOT DIRECTLY ASSESSED (score adjusted to neutral). {trait_score.get('analysis', '')}"
-        
-        # Add missing top-level fields
-        if 'areas_requiring_evaluation' not in analysis:
-            analysis['areas_requiring_evaluation'] = [
-                f"{trait}: Not directly assessed, requires validation" 
-                for trait in not_assessed
-            ]
-        
-        if 'assessment_coverage' not in analysis:
-            coverage_pct = (len(directly_assessed) / len(job_requirements) * 100) if job_requirements else 0
-            analysis['assessment_coverage'] = (
-                f"Assessment Coverage: {len(directly_assessed)}/{len(job_requirements)} required traits "
-                f"({coverage_pct:.0f}%) were directly assessed. The remaining {len(not_assessed)} trait(s) "
-                f"are inferred from related behaviors and should not be weighted heavily in final decisions "
-                f"without supplementary evaluation."
-            )
-        
-        # Add metadata for tracking
-        analysis['_metadata'] = {
-            'total_traits_required': len(job_requirements),
-            'directly_assessed_count': len(directly_assessed),
-            'non_assessed_count': len(not_assessed),
-            'assessment_coverage_percentage': (len(directly_assessed) / len(job_requirements) * 100) if job_requirements else 0
-        }
-        
-        return analysis
+        with span('validate'):
+            return complete_matching(analysis, job_requirements, directly_assessed, not_assessed, prescored)
         
     except json.JSONDecodeError as e:
         print(f"JSON Parsing Error: {str(e)}")
         print(f"Content received: {content[:500]}")
         import traceback
         traceback.print_exc()
-        return _generate_fallback_response(job_requirements, assessed_traits, directly_assessed, not_assessed)
+        deadlines.mark_partial('analysis', e)
+        return complete_matching(None, job_requirements, directly_assessed, not_assessed, prescored)
         
     except Exception as e:
         print(f"GPT Error for job matching: {str(e)}")
         import traceback
         traceback.print_exc()
-        return _generate_fallback_response(job_requirements, assessed_traits, directly_assessed, not_assessed)
+        deadlines.mark_partial('analysis', e)
+        return complete_matching(None, job_requirements, directly_assessed, not_assessed, prescored)
 
 
 def _generate_fallback_response(job_requirements, assessed_traits, directly_assessed, not_assessed):
@@ -1216,7 +2001,90 @@ def _generate_fallback_response(job_requirements, assessed_traits, directly_asse
         }
     }
 
-@app.route('/api/match-candidate', methods=['POST'])
+def file_digest(file_storage):
+    """SHA-256 of an uploaded file's content, leaving the stream rewound"""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: file_storage.stream.read(65536), b''):
+        digest.update(chunk)
+    file_storage.stream.seek(0)
+    return digest.hexdigest()
+
+def reuse_prior_match(fingerprint, profile_key):
+    """Stored analysis of a near-duplicate report against the same job profile, or None"""
+    try:
+        prior = report_index.find_near_duplicate(fingerprint, profile_key)
+    except Exception as e:
+        print(f"Report index error: {str(e)}")
+        return None
+    if prior is None:
+        return None
+    print(f"Reusing analysis of near-duplicate report {prior['reportId']} (distance {prior['distance']})")
+    analysis = prior['analysis']
+    analysis['_reuse'] = {
+        'reportId': prior['reportId'],
+        'distance': prior['distance'],
+        'analyzedAt': datetime.fromtimestamp(prior['createdAt']).isoformat(timespec='seconds')
+    }
+    analysis['partial'] = []
+    return analysis
+
+def index_match(fingerprint, profile_key, analysis):
+    """Remember a completed analysis for near-duplicate uploads (fallback responses are not kept)"""
+    if analysis.get('_metadata', {}).get('error'):
+        return
+    try:
+        report_index.save_report(fingerprint, profile_key, analysis)
+    except Exception as e:
+        print(f"Report index error: {str(e)}")
+
+def run_matching(candidate_file, job_requirements, allow_reuse=True):
+    """Extract the candidate report and run the GPT matching analysis; None if the PDF has no text.
+    
+    A near-duplicate of an already analyzed report for the same job profile returns the stored
+    analysis (with a `_reuse` note) unless allow_reuse is False.
+    """
+    # Extract text from candidate PDF
+    with span('pdf_extract'):
+        candidate_text = extract_text_from_pdf(candidate_file)
+    
+    if not candidate_text:
+        return None
+    
+    print(f"\nExtracted candidate text: {len(candidate_text)} characters")
+    
+    profile_key = canonical_key(job_requirements)
+    with span('fingerprint'):
+        fingerprint = report_index.simhash(candidate_text)
+    if allow_reuse:
+        with span('reuse_lookup'):
+            prior = reuse_prior_match(fingerprint, profile_key)
+        if prior is not None:
+            return prior
+    
+    # Extract which traits were actually assessed in the candidate's report
+    with span('extract_assessed_traits'):
+        assessed_traits = extract_assessed_traits(candidate_text)
+    print(f"\nTraits found in candidate's report: {assessed_traits}")
+    print("-"*80 + "\n")
+    
+    # Generate AI matching analysis with awareness of what was actually tested
+    matching_analysis = generate_matching_analysis_from_traits(
+        candidate_text, 
+        job_requirements, 
+        assessed_traits
+    )
+    index_match(fingerprint, profile_key, matching_analysis)
+    matching_analysis['partial'] = deadlines.partial_sections()
+    
+    print("\nMATCHING ANALYSIS COMPLETE")
+    print("="*80 + "\n")
+    
+    return matching_analysis
+
+@bp.route('/api/match-candidate', methods=['POST'])
+@traced('match_candidate')
+@upload_limited
+@rate_limited(estimate_match_cost)
 def match_candidate():
     """Compare candidate report against selected job trait requirements using AI"""
     try:
@@ -1226,9 +2094,12 @@ def match_candidate():
         
         candidate_file = request.files['candidate_report']
         
-        # Get job requirements (now as JSON from form data)
-        job_requirements_json = request.form.get('job_requirements')
-        if not job_requirements_json:
+        # Job requirements come as JSON in the form, or as the id of a stored job profile
+        try:
+            job_requirements = requested_job_requirements(request.form)
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        if not job_requirements:
             return jsonify({'error': 'Job requirements are required'}), 400
         
         # Validate file type
@@ -1240,39 +2111,272 @@ def match_candidate():
         print("="*80)
         print(f"Candidate Report: {candidate_file.filename}")
         
-        # Parse job requirements
-        job_requirements = json.loads(job_requirements_json)
         print(f"\nJob Requirements ({len(job_requirements)} traits selected):")
         for trait_name, trait_data in job_requirements.items():
             print(f"  - {trait_name}: {trait_data['level'].upper()}")
         
-        # Extract text from candidate PDF
-        candidate_text = extract_text_from_pdf(candidate_file)
+        # reuse=0 asks for a fresh analysis even if a near-identical report was analyzed before
+        allow_reuse = request.form.get('reuse', '1') != '0'
         
-        if not candidate_text:
+        # Identical concurrent uploads against the same profile share one extraction and GPT call
+        with span('hash_upload'):
+            key = canonical_key(file_digest(candidate_file), job_requirements, allow_reuse)
+        with span('pipeline') as attrs, deadlines.deadline(request_budget_ms(deadlines.MATCH_DEADLINE_MS, request.form)):
+            matching_analysis, shared = matching_flight.do(
+                key, lambda: run_matching(candidate_file, job_requirements, allow_reuse)
+            )
+            attrs['shared'] = shared
+        if shared:
+            print(f"Coalesced with in-flight matching {key[:12]}")
+        
+        if matching_analysis is None:
             return jsonify({'error': 'Could not extract text from candidate PDF'}), 400
         
-        print(f"\nExtracted candidate text: {len(candidate_text)} characters")
+        with span('serialize'):
+            return jsonify(matching_analysis)
+        
+    except Exception as e:
+        print(f"Error in match-candidate: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+def stream_matching(candidate_text, job_requirements, assessed_traits, fingerprint, budget_ms):
+    """Run the GPT matching analysis as NDJSON events for /api/match-candidate/stream.
+    
+    Emits a 'field' event for each top-level field and a 'trait_score' event for each
+    trait_scores entry as soon as GPT has written it, then 'result' with the validated
+    and enriched analysis (the same body /api/match-candidate returns). With pre-scoring the
+    computed scores go out first and GPT's per-trait text arrives as 'trait_analysis' events.
+    """
+    with deadlines.deadline(budget_ms):
+        yield from _stream_matching(candidate_text, job_requirements, assessed_traits, fingerprint)
+
+def _stream_matching(candidate_text, job_requirements, assessed_traits, fingerprint):
+    prompt, directly_assessed, not_assessed, prescored = prepare_matching(candidate_text, job_requirements, assessed_traits)
+    if prescored:
+        # Computed scores are known before GPT writes anything
+        yield ndjson({'event': 'field', 'name': 'overall_fit_score', 'value': prescored['overall_fit_score']})
+        yield ndjson({'event': 'field', 'name': 'overall_fit_label', 'value': prescored['overall_fit_label']})
+        for name, computed in prescored['trait_scores'].items():
+            yield ndjson({'event': 'trait_score', 'name': name, 'value': computed})
+    content = ""
+    try:
+        for event in stream_completion(matching_completion_kwargs(prompt), nested=('trait_scores',)):
+            if event[0] == 'entry':
+                yield ndjson({'event': 'trait_analysis' if prescored else 'trait_score', 'name': event[2], 'value': event[3]})
+            elif event[0] == 'field' and event[1] != 'trait_scores' and not (prescored and event[1] in prescored):
+                yield ndjson({'event': 'field', 'name': event[1], 'value': event[2]})
+            elif event[0] == 'content':
+                content = event[1]
+        
+        print(f"Streamed GPT response received: {len(content)} characters")
+        analysis = complete_matching(json.loads(content or "{}"), job_requirements, directly_assessed, not_assessed, prescored)
+        index_match(fingerprint, canonical_key(job_requirements), analysis)
+        
+    except Exception as e:
+        print(f"GPT Error for streamed job matching: {str(e)}")
+        print(f"Content received: {content[:500]}")
+        deadlines.mark_partial('analysis', e)
+        analysis = complete_matching(None, job_requirements, directly_assessed, not_assessed, prescored)
+    
+    analysis['partial'] = deadlines.partial_sections()
+    yield ndjson({'event': 'result', 'value': analysis})
+
+@bp.route('/api/match-candidate/stream', methods=['POST'])
+@upload_limited
+@rate_limited(estimate_match_cost)
+def match_candidate_stream():
+    """Streaming /api/match-candidate: newline-delimited JSON events while GPT writes the analysis"""
+    try:
+        if 'candidate_report' not in request.files:
+            return jsonify({'error': 'Candidate report PDF is required'}), 400
+        
+        candidate_file = request.files['candidate_report']
+        
+        try:
+            job_requirements = requested_job_requirements(request.form)
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        if not job_requirements:
+            return jsonify({'error': 'Job requirements are required'}), 400
+        
+        if not candidate_file.filename.endswith('.pdf'):
+            return jsonify({'error': 'Candidate report must be PDF format'}), 400
+        
+        print(f"\nSTREAMED JOB MATCHING REQUEST - {candidate_file.filename}, {len(job_requirements)} traits")
+        
+        # Extract before the stream starts so an unreadable PDF still gets a plain 400
+        candidate_text = extract_text_from_pdf(candidate_file)
+        if not candidate_text:
+            return jsonify({'error': 'Could not extract text from candidate PDF'}), 400
         
-        # Extract which traits were actually assessed in the candidate's report
+        fingerprint = report_index.simhash(candidate_text)
+        if request.form.get('reuse', '1') != '0':
+            prior = reuse_prior_match(fingerprint, canonical_key(job_requirements))
+            if prior is not None:
+                return Response(ndjson({'event': 'result', 'value': prior}), mimetype='application/x-ndjson')
         assessed_traits = extract_assessed_traits(candidate_text)
-        print(f"\nTraits found in candidate's report: {assessed_traits}")
-        print("-"*80 + "\n")
         
-        # Generate AI matching analysis with awareness of what was actually tested
-        matching_analysis = generate_matching_analysis_from_traits(
-            candidate_text, 
-            job_requirements, 
-            assessed_traits
+        budget_ms = request_budget_ms(deadlines.MATCH_DEADLINE_MS, request.form)
+        return Response(
+            stream_with_context(stream_matching(candidate_text, job_requirements, assessed_traits, fingerprint, budget_ms)),
+            mimetype='application/x-ndjson'
         )
         
-        print("\nMATCHING ANALYSIS COMPLETE")
-        print("="*80 + "\n")
+    except Exception as e:
+        print(f"Error in match-candidate-stream: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+def requested_job_profiles(form):
+    """Profiles a multi-profile match request names: stored ones by id (job_profile_ids, a JSON
+    array) and ad-hoc ones (job_profiles, a JSON array of {"name", "requirements"}).
+    
+    Returns [{'key', 'profileId', 'name', 'requirements'}]; LookupError for an unknown id and
+    ValueError for an invalid ad-hoc profile.
+    """
+    profiles = []
+    for profile_id in json.loads(form.get('job_profile_ids') or '[]'):
+        profile = job_profiles.get_profile(profile_id)
+        if profile is None:
+            raise LookupError(f'Unknown job profile {profile_id}')
+        profiles.append({'key': profile_id, 'profileId': profile_id, 'name': profile['name'], 'requirements': profile['requirements']})
+    for i, entry in enumerate(json.loads(form.get('job_profiles') or '[]'), 1):
+        if not isinstance(entry, dict):
+            raise ValueError('job_profiles entries must be {"name", "requirements"} objects')
+        profiles.append({
+            'key': f'profile-{i}',
+            'profileId': None,
+            'name': job_profiles.normalize_name(entry.get('name') or f'Profile {i}'),
+            'requirements': job_profiles.normalize_requirements(entry.get('requirements'))
+        })
+    return profiles
+
+def estimate_multi_match_cost(form=None):
+    """Estimate the LLM tokens a multi-profile match request will consume (one matching call per
+    profile); `form` defaults to the current request's form
+    """
+    try:
+        profiles = requested_job_profiles(form if form is not None else request.form)
+    except Exception:
+        profiles = []
+    cost = 0
+    for profile in profiles or [{'requirements': {}}]:
+        prompt, _, _ = build_matching_prompt('x' * 10000, profile['requirements'], [])
+        cost += estimate_tokens(prompt) + model_router.max_tokens('matching')
+    return cost
+
+def match_extracted_report(candidate_text, fingerprint, assessed_traits, report, job_requirements, allow_reuse):
+    """Matching analysis of already extracted and parsed report text against one set of requirements"""
+    profile_key = canonical_key(job_requirements)
+    if allow_reuse:
+        prior = reuse_prior_match(fingerprint, profile_key)
+        if prior is not None:
+            return prior
+    analysis = generate_matching_analysis_from_traits(candidate_text, job_requirements, assessed_traits, report)
+    index_match(fingerprint, profile_key, analysis)
+    analysis['partial'] = deadlines.partial_sections()
+    return analysis
+
+def rank_profile_matches(profiles, analyses):
+    """Comparison rows for the profiles, best fit first (ties: higher assessment coverage first)"""
+    ranking = []
+    for profile, analysis in zip(profiles, analyses):
+        metadata = analysis.get('_metadata', {})
+        ranking.append({
+            'key': profile['key'],
+            'profileId': profile['profileId'],
+            'name': profile['name'],
+            'overallFitScore': analysis.get('overall_fit_score'),
+            'overallFitLabel': analysis.get('overall_fit_label'),
+            'hiringRecommendation': analysis.get('hiring_recommendation'),
+            'assessmentCoverage': metadata.get('assessment_coverage_percentage'),
+            'reused': '_reuse' in analysis,
+            'partial': analysis.get('partial', [])
+        })
+    ranking.sort(key=lambda row: (-(row['overallFitScore'] or 0), -(row['assessmentCoverage'] or 0)))
+    for rank, row in enumerate(ranking, 1):
+        row['rank'] = rank
+    return ranking
+
+def run_multi_matching(candidate_file, profiles, allow_reuse=True):
+    """Extract and parse the report once, match it against every profile concurrently and rank the
+    results; None if the PDF has no text.
+    """
+    with span('pdf_extract'):
+        candidate_text = extract_text_from_pdf(candidate_file)
+    if not candidate_text:
+        return None
+    
+    with span('fingerprint'):
+        fingerprint = report_index.simhash(candidate_text)
+    with span('extract_assessed_traits'):
+        assessed_traits = extract_assessed_traits(candidate_text)
+    with span('parse_report'):
+        report = prescoring.parse_report(candidate_text)
+    print(f"\nMULTI-PROFILE MATCHING - {len(profiles)} profiles, traits found: {assessed_traits}")
+    
+    def match_profile(profile):
+        # Each profile reports the sections it had to cut on its own
+        with deadlines.scope(), span('match_profile', profile=profile['name']):
+            return match_extracted_report(candidate_text, fingerprint, assessed_traits, report, profile['requirements'], allow_reuse)
+    
+    # Pool threads start from the request's context so spans and the deadline carry over
+    contexts = [contextvars.copy_context() for _ in profiles]
+    with ThreadPoolExecutor(max_workers=max(1, min(MULTI_MATCH_CONCURRENCY, len(profiles)))) as pool:
+        analyses = list(pool.map(lambda context, profile: context.run(match_profile, profile), contexts, profiles))
+    
+    return {
+        'ranking': rank_profile_matches(profiles, analyses),
+        'analyses': {profile['key']: analysis for profile, analysis in zip(profiles, analyses)},
+        'assessedTraits': assessed_traits,
+        'personalityType': report['personality_type']
+    }
+
+@bp.route('/api/match-candidate/multi', methods=['POST'])
+@traced('match_candidate_multi')
+@upload_limited
+@rate_limited(estimate_multi_match_cost)
+def match_candidate_multi():
+    """Match one candidate report against several job profiles and rank them.
+    
+    Form: candidate_report (PDF), job_profile_ids (JSON array of stored profile ids) and/or
+    job_profiles (JSON array of {"name", "requirements"}), reuse (optional, "0" for fresh analyses).
+    Returns {"ranking": [...best first], "analyses": {key: the /api/match-candidate body}, ...}.
+    """
+    try:
+        if 'candidate_report' not in request.files:
+            return jsonify({'error': 'Candidate report PDF is required'}), 400
+        
+        candidate_file = request.files['candidate_report']
+        if not candidate_file.filename.endswith('.pdf'):
+            return jsonify({'error': 'Candidate report must be PDF format'}), 400
+        
+        try:
+            profiles = requested_job_profiles(request.form)
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if not profiles:
+            return jsonify({'error': 'At least one job profile is required'}), 400
+        if len(profiles) > MULTI_MATCH_MAX_PROFILES:
+            return jsonify({'error': f'At most {MULTI_MATCH_MAX_PROFILES} job profiles per request'}), 400
+        
+        allow_reuse = request.form.get('reuse', '1') != '0'
+        with span('pipeline'), deadlines.deadline(request_budget_ms(deadlines.MATCH_DEADLINE_MS, request.form)):
+            comparison = run_multi_matching(candidate_file, profiles, allow_reuse)
+        
+        if comparison is None:
+            return jsonify({'error': 'Could not extract text from candidate PDF'}), 400
         
-        return jsonify(matching_analysis)
+        with span('serialize'):
+            return jsonify(comparison)
         
     except Exception as e:
-        print(f"Error in match-candidate: {str(e)}")
+        print(f"Error in match-candidate-multi: {str(e)}")
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
@@ -1283,148 +2387,19 @@ def match_candidate():
 #!/usr/bin/env python3
 # ADD THIS NEW ROUTE TO YOUR app.py FILE (after the existing /api/download route)
 
-@app.route('/api/download-match-report', methods=['POST'])
+def build_match_pdf(data):
+    """Render the candidate-job matching PDF for a /api/download-match-report payload into a buffer"""
+    return pdf_reports.render_report('match', data)
+
+@bp.route('/api/download-match-report', methods=['POST'])
+@traced('download_match_report')
 def download_match_report():
     """Generate PDF report for candidate-job matching analysis"""
     try:
-        data = request.json or {}
-        matching_analysis = data.get('matchingAnalysis', {})
-        job_requirements = data.get('jobRequirements', {})
-        candidate_name = data.get('candidateName', 'Candidate')
-        job_title = data.get('jobTitle', 'Position')
-        
-        # Create PDF in memory
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.75*inch, bottomMargin=0.75*inch)
-        story = []
-        
-        # Styles
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor='#5a9f8a',
-            spaceAfter=12,
-            alignment=TA_CENTER
-        )
-        
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=16,
-            textColor='#4a8f7a',
-            spaceAfter=10,
-            spaceBefore=15
-        )
-        
-        subheading_style = ParagraphStyle(
-            'CustomSubheading',
-            parent=styles['Heading3'],
-            fontSize=13,
-            textColor='#3a7f6a',
-            spaceAfter=8,
-            spaceBefore=10
-        )
-        
-        body_style = ParagraphStyle(
-            'CustomBody',
-            parent=styles['Normal'],
-            fontSize=10,
-            spaceAfter=6,
-            leading=14
-        )
-        
-        # Title Page
-        story.append(Paragraph("Candidate-Job Matching Report", title_style))
-        story.append(Paragraph(f"Candidate: {candidate_name}", styles['Normal']))
-        story.append(Paragraph(f"Position: {job_title}", styles['Normal']))
-        story.append(Paragraph(f"Generated: {datetime.now().strftime('%B %d, %Y')}", styles['Normal']))
-        story.append(Spacer(1, 0.5*inch))
-        
-        # Overall Fit Score
-        overall_fit = matching_analysis.get('overall_fit_score', 3)
-        fit_label = matching_analysis.get('overall_fit_label', 'Adequate Fit')
-        
-        story.append(Paragraph("Overall Candidate Fit", heading_style))
-        story.append(Paragraph(f"<b>Fit Score:</b> {overall_fit:.1f}/5.0 - {fit_label}", body_style))
-        story.append(Spacer(1, 0.2*inch))
-        
-        # Hiring Recommendation
-        story.append(Paragraph("Hiring Recommendation", heading_style))
-        story.append(Paragraph(matching_analysis.get('hiring_recommendation', 'No recommendation available'), body_style))
-        story.append(Spacer(1, 0.2*inch))
-        
-        # Executive Summary
-        story.append(Paragraph("Executive Summary", heading_style))
-        exec_summary = matching_analysis.get('executive_summary', 'No summary available')
-        for para in exec_summary.split('\n\n'):
-            if para.strip():
-                story.append(Paragraph(para.strip(), body_style))
-        story.append(Spacer(1, 0.2*inch))
-        
-        # Trait-by-Trait Analysis
-        story.append(PageBreak())
-        story.append(Paragraph("Trait-by-Trait Fit Analysis", heading_style))
-        
-        trait_scores = matching_analysis.get('trait_scores', {})
-        for trait_name, trait_data in trait_scores.items():
-            score = trait_data.get('score', 3)
-            required_level = trait_data.get('required_level', 'N/A')
-            analysis = trait_data.get('analysis', '')
-            
-            story.append(Paragraph(f"<b>{trait_name}</b>", subheading_style))
-            story.append(Paragraph(f"Score: {score:.1f}/5.0 | Required Level: {required_level.upper()}", body_style))
-            story.append(Paragraph(analysis, body_style))
-            story.append(Spacer(1, 0.15*inch))
-        
-        # Key Strengths
-        story.append(PageBreak())
-        story.append(Paragraph("Key Strengths", heading_style))
-        strengths = matching_analysis.get('key_strengths', [])
-        for strength in strengths:
-            story.append(Paragraph(f"• {strength}", body_style))
-        story.append(Spacer(1, 0.2*inch))
-        
-        # Potential Concerns
-        story.append(Paragraph("Potential Concerns", heading_style))
-        concerns = matching_analysis.get('potential_concerns', [])
-        for concern in concerns:
-            story.append(Paragraph(f"• {concern}", body_style))
-        story.append(Spacer(1, 0.2*inch))
-        
-        # Specific Evidence
-        story.append(Paragraph("Specific Evidence from Report", heading_style))
-        evidence = matching_analysis.get('specific_evidence', [])
-        for item in evidence:
-            story.append(Paragraph(f"• {item}", body_style))
-        story.append(Spacer(1, 0.2*inch))
-        
-        # Risk Assessment
-        story.append(PageBreak())
-        story.append(Paragraph("Risk Assessment", heading_style))
-        risk = matching_analysis.get('risk_assessment', 'No risk assessment available')
-        for para in risk.split('\n\n'):
-            if para.strip():
-                story.append(Paragraph(para.strip(), body_style))
-        story.append(Spacer(1, 0.2*inch))
-        
-        # Development Needs
-        story.append(Paragraph("Development Needs", heading_style))
-        dev_needs = matching_analysis.get('development_needs', [])
-        for need in dev_needs:
-            story.append(Paragraph(f"• {need}", body_style))
-        story.append(Spacer(1, 0.2*inch))
-        
-        # Onboarding Recommendations
-        story.append(Paragraph("Onboarding Recommendations", heading_style))
-        onboarding = matching_analysis.get('onboarding_recommendations', [])
-        for rec in onboarding:
-            story.append(Paragraph(f"• {rec}", body_style))
-        
-        # Build PDF
-        doc.build(story)
-        buffer.seek(0)
+        with span('parse_request'):
+            data = request.json or {}
+        with span('render_pdf'):
+            buffer = build_match_pdf(data)
         
         return send_file(
             buffer,
@@ -1439,4 +2414,6 @@ def download_match_report():
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=True)
+    flask_app = create_app()
+    start_warm_up()
+    flask_app.run(host='0.0.0.0', port=port, debug=True)
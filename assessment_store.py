@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""Persistent store of completed assessments, keyed by assessment id"""
+import json
+import time
+import uuid
+
+import storage
+
+DB_NAME = 'assessments'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS assessments (
+    id TEXT PRIMARY KEY,
+    parent_id TEXT,
+    created_at REAL NOT NULL,
+    record TEXT NOT NULL
+);
+"""
+
+
+def _connect():
+    return storage.connect(DB_NAME, SCHEMA)
+
+
+def new_assessment_id():
+    return uuid.uuid4().hex
+
+
+def save_assessment(assessment_id, record, parent_id=None):
+    """Persist an assessment record (inputs, results and generated analyses)"""
+    conn = _connect()
+    conn.execute(
+        'INSERT OR REPLACE INTO assessments (id, parent_id, created_at, record) VALUES (?, ?, ?, ?)',
+        (assessment_id, parent_id, time.time(), json.dumps(record))
+    )
+    return assessment_id
+
+
+def get_assessment(assessment_id):
+    """Return the stored record for an assessment id, or None"""
+    row = _connect().execute('SELECT record FROM assessments WHERE id = ?', (assessment_id,)).fetchone()
+    return json.loads(row['record']) if row else None
@@ -0,0 +1,644 @@
+#!/usr/bin/env python3
+"""ASGI variant of the assessment server built on Quart and the async OpenAI client
+
+Serve with an ASGI server, e.g. `uvicorn async_app:app --workers 2`. LLM calls are awaited
+instead of pinning a thread, so one process can hold many in-flight analyses; PDF rendering
+runs in a process pool and PDF text extraction in a thread so the event loop never blocks.
+Prompt building, metrics and validation are shared with the synchronous app in app.py,
+which keeps working unchanged under gunicorn.
+"""
+import asyncio
+import functools
+import io
+import json
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from quart import Quart, Request, Response, redirect, request, jsonify, send_file, send_from_directory
+from quart.formparser import FormDataParser
+
+import analytics
+import app as core
+import deadlines
+from ratelimit import rate_limited_async
+from singleflight import SingleFlight, canonical_key
+from tracing import span, traced_async
+import uploads
+from uploads import upload_limited_async
+import warmup
+
+core.get_openai_api_key()
+
+
+class UploadRequest(Request):
+    """Request whose uploaded files are spooled to disk above uploads.UPLOAD_SPOOL_BYTES"""
+    form_data_parser_class = functools.partial(FormDataParser, stream_factory=uploads.spooled_stream_factory)
+
+
+app = Quart(__name__, static_folder='public', static_url_path='')
+app.request_class = UploadRequest
+app.config['MAX_CONTENT_LENGTH'] = uploads.MAX_REQUEST_BYTES
+core.memprofile.start()
+
+_async_client = None
+
+
+def get_async_client():
+    """Return the async OpenAI client, creating it on first use inside the serving process"""
+    global _async_client
+    if _async_client is None:
+        if core.llm_stub.enabled():
+            _async_client = core.llm_stub.AsyncStubClient()
+        else:
+            import openai
+            _async_client = openai.AsyncOpenAI(api_key=core.get_openai_api_key())
+    return _async_client
+
+async def estimate_analyze_cost():
+    return core.estimate_analyze_cost(await request.get_json(silent=True) or {})
+
+
+async def estimate_match_cost():
+    return core.estimate_match_cost(await request.form)
+
+
+async def estimate_multi_match_cost():
+    return core.estimate_multi_match_cost(await request.form)
+
+analysis_flight = SingleFlight('analysis')
+matching_flight = SingleFlight('matching')
+
+# CPU-bound PDF rendering goes to separate processes; spawn avoids forking the event loop
+PDF_WORKERS = int(os.environ.get('PDF_WORKERS', os.cpu_count() or 2))
+_pdf_executor = None
+
+
+def _get_pdf_executor():
+    global _pdf_executor
+    if _pdf_executor is None:
+        _pdf_executor = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+    return _pdf_executor
+
+
+async def _render_pdf_async(kind, data):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_pdf_executor(), core.render_report, kind, data)
+
+
+def request_budget_ms(configured_ms, fields):
+    """Time budget of this request: configured_ms, or less if the client asked for less"""
+    return deadlines.budget_ms(configured_ms, request.headers.get(deadlines.DEADLINE_HEADER) or fields.get('deadlineMs'))
+
+
+async def _complete(kwargs):
+    """Await a chat completion within the request deadline and return its text content"""
+    attempt = 1
+    while True:
+        client = deadlines.bounded(get_async_client())
+        start = time.perf_counter()
+        try:
+            response = await client.chat.completions.create(**kwargs)
+        except Exception as e:
+            delay = core.failed_completion(kwargs, start, e, attempt)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        core.model_router.observe(kwargs['model'], time.perf_counter() - start, True)
+        return response.choices[0].message.content or "{}"
+
+
+async def warm_up():
+    """Warm-up steps off the event loop, then the async client's own connection pool"""
+    loop = asyncio.get_running_loop()
+    for name, fn in core.warm_up_steps(llm_connection=False):
+        with warmup.step(name):
+            await loop.run_in_executor(None, fn)
+    with warmup.step('llm_connection'):
+        if not core.llm_stub.enabled():
+            await get_async_client().with_options(timeout=warmup.WARM_UP_TIMEOUT, max_retries=0).models.list()
+    warmup.finish()
+
+
+@app.before_serving
+async def start_warm_up():
+    if warmup.WARM_UP and warmup.begin():
+        app.add_background_task(warm_up)
+
+
+@app.route('/healthz')
+async def healthz():
+    """Liveness: the worker is up and serving"""
+    return jsonify({'status': 'ok'})
+
+
+@app.route('/readyz')
+async def readyz():
+    """Readiness: 503 until this worker has finished warming up"""
+    status = warmup.status()
+    return jsonify(status), 200 if status['ready'] else 503
+
+
+@app.route('/')
+async def index():
+    return await send_from_directory('public', 'index.html')
+
+
+@app.errorhandler(413)
+async def request_too_large(e):
+    return jsonify({'error': f'Request is larger than {uploads.MAX_REQUEST_BYTES} bytes'}), 413
+
+
+@app.route('/api/catalog/manifest', methods=['GET'])
+async def catalog_manifest():
+    """Trait names and question counts for trait selection, with each trait's bundle URL"""
+    try:
+        manifest = core.catalog.manifest()
+        response = jsonify(manifest)
+        response.set_etag(manifest['version'])
+        response.cache_control.no_cache = True
+        return await response.make_conditional(request)
+    except Exception as e:
+        print(f"Error in catalog manifest: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/catalog/<fingerprint>/<trait>.json', methods=['GET'])
+async def catalog_bundle(fingerprint, trait):
+    """One trait's questions, interpretation and patterns; immutable under its fingerprinted URL"""
+    bundle = core.catalog.bundles().get(trait)
+    if bundle is None:
+        return jsonify({'error': f'Unknown trait {trait}'}), 404
+    if fingerprint != bundle[0]:
+        return redirect(core.catalog.bundle_url(trait, bundle[0]))
+    response = Response(bundle[1], mimetype='application/json')
+    response.set_etag(fingerprint)
+    response.cache_control.public = True
+    response.cache_control.max_age = 31536000
+    response.cache_control.immutable = True
+    return await response.make_conditional(request)
+
+
+@app.route('/match')
+async def match_page():
+    """Serve the job matching page"""
+    return await send_from_directory('public', 'match.html')
+
+
+async def generate_overall_assessment(assessment):
+    """Generate the overall personality assessment with the async client"""
+    with span('prompt_overall'):
+        prompt = core.build_overall_prompt(assessment)
+    try:
+        kwargs = core.overall_completion_kwargs(prompt)
+        with span('llm_overall', model=kwargs['model']):
+            content = await _complete(kwargs)
+        return core.parse_gpt_json(content)
+    except Exception as e:
+        print(f"GPT Error for overall assessment: {str(e)}")
+        deadlines.mark_partial('overallAssessment', e)
+        return core.fallback_overall_assessment(assessment.selected_traits)
+
+
+async def generate_trait_analysis(trait):
+    """Generate one resolved trait's analysis with the async client"""
+    with span('prompt_trait', trait=trait.key):
+        prompt = core.build_trait_prompt(trait)
+    try:
+        kwargs = core.trait_completion_kwargs(prompt)
+        with span('llm_trait', trait=trait.key, model=kwargs['model']):
+            content = await _complete(kwargs)
+        return core.parse_gpt_json(content)
+    except Exception as e:
+        print(f"GPT Error for {trait.key}: {str(e)}")
+        deadlines.mark_partial(f'traitAnalyses.{trait.key}', e)
+        return core.fallback_trait_analysis(trait)
+
+
+async def run_analysis(selected_traits, answers, trait_data):
+    """Score the answers and run every GPT call concurrently; returns the /api/analyze response body"""
+    assessment_id = core.assessment_store.new_assessment_id()
+    with span('metrics'):
+        results = core.calculate_results(selected_traits, answers, trait_data)
+    with span('resolve'):
+        assessment = core.resolve_assessment(selected_traits, answers, trait_data, results)
+
+    with span('analytics'):
+        try:
+            analytics.record_results(results, assessment_id)
+        except Exception as e:
+            print(f"Analytics Error: {str(e)}")
+
+    # The per-trait analyses do not depend on the overall assessment, so issue them all at once
+    overall_assessment, *analyses = await asyncio.gather(
+        generate_overall_assessment(assessment),
+        *(generate_trait_analysis(trait) for trait in assessment)
+    )
+    trait_analyses = dict(zip(selected_traits, analyses))
+
+    with span('html'):
+        html = core.fill_trait_placeholders(core.generate_html_structure(assessment, overall_assessment), trait_analyses)
+
+    response = {
+        'assessmentId': assessment_id,
+        'html': html,
+        'results': results,
+        'overallAssessment': overall_assessment,
+        'traitAnalyses': trait_analyses,
+        'partial': deadlines.partial_sections()
+    }
+    with span('store'):
+        core.store_assessment(assessment_id, selected_traits, answers, trait_data, response)
+    return response
+
+
+@app.route('/api/analyze', methods=['POST'])
+@traced_async('analyze')
+@rate_limited_async(estimate_analyze_cost)
+async def analyze():
+    """Analyze personality assessment using GPT, running all LLM calls concurrently"""
+    try:
+        data = await request.get_json() or {}
+        selected_traits = data.get('selectedTraits', [])
+        answers = data.get('answers', {})
+        trait_data = data.get('traitData', {})
+
+        print(f"API REQUEST RECEIVED - /api/analyze (async) - traits: {selected_traits}")
+
+        key = canonical_key(selected_traits, answers, trait_data)
+        with span('pipeline') as attrs, deadlines.deadline(request_budget_ms(deadlines.ANALYZE_DEADLINE_MS, data)):
+            response, attrs['shared'] = await analysis_flight.do_async(key, lambda: run_analysis(selected_traits, answers, trait_data))
+        return jsonify(response)
+
+    except Exception as e:
+        print(f"Error in analyze: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/analytics/<trait>', methods=['GET'])
+async def trait_analytics(trait):
+    """Return cohort statistics for a trait"""
+    try:
+        stats = analytics.get_trait_stats(trait)
+        if stats is None:
+            return jsonify({'error': f'No assessments recorded for {trait}'}), 404
+        return jsonify(stats)
+    except Exception as e:
+        print(f"Error in trait analytics: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/debug/memory', methods=['GET'])
+async def debug_memory():
+    """Per-stage allocation figures and top allocators of this worker (see app.debug_memory)"""
+    if not core.debug_authorized(request.headers.get('X-Debug-Token', '')):
+        return jsonify({'error': 'Not found'}), 404
+    try:
+        limit = min(int(request.args.get('limit', 25)), 200)
+        group_by = request.args.get('group', 'lineno')
+        if group_by not in ('lineno', 'filename', 'traceback'):
+            return jsonify({'error': 'group must be lineno, filename or traceback'}), 400
+        return jsonify(core.memprofile.report(limit, group_by, request.args.get('growth') == '1'))
+    except Exception as e:
+        print(f"Error in debug memory: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/metrics/singleflight', methods=['GET'])
+async def singleflight_metrics():
+    """Report in-flight and recently coalesced analysis and matching computations"""
+    return jsonify({
+        'analysis': analysis_flight.stats(),
+        'matching': matching_flight.stats()
+    })
+
+
+@app.route('/api/download', methods=['POST'])
+@traced_async('download_report')
+async def download_report():
+    """Generate comprehensive PDF report with AI analysis"""
+    try:
+        data = await request.get_json() or {}
+        with span('render_pdf'):
+            pdf_bytes = await _render_pdf_async('assessment', data)
+        return await send_file(
+            io.BytesIO(pdf_bytes),
+            mimetype='application/pdf',
+            as_attachment=True,
+            attachment_filename=f'personality-assessment-{datetime.now().strftime("%Y-%m-%d")}.pdf'
+        )
+    except Exception as e:
+        print(f"Error generating PDF: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+async def generate_matching_analysis_from_traits(candidate_text, job_requirements, assessed_traits, report=None):
+    """Analyze candidate-job fit with the async client"""
+    with span('prompt_matching') as attrs:
+        prompt, directly_assessed, not_assessed, prescored = core.prepare_matching(candidate_text, job_requirements, assessed_traits, report)
+        attrs['prescored'] = prescored is not None
+    try:
+        kwargs = core.matching_completion_kwargs(prompt)
+        with span('llm_matching', model=kwargs['model']):
+            content = await _complete(kwargs)
+        analysis = json.loads(content)
+        with span('validate'):
+            return core.complete_matching(analysis, job_requirements, directly_assessed, not_assessed, prescored)
+    except Exception as e:
+        print(f"GPT Error for job matching: {str(e)}")
+        traceback.print_exc()
+        deadlines.mark_partial('analysis', e)
+        return core.complete_matching(None, job_requirements, directly_assessed, not_assessed, prescored)
+
+
+async def run_matching(candidate_file, job_requirements, allow_reuse=True):
+    """Extract the report off the event loop and run the matching analysis; None if the PDF has no text"""
+    loop = asyncio.get_running_loop()
+    with span('pdf_extract'):
+        candidate_text = await loop.run_in_executor(None, core.extract_text_from_pdf, candidate_file)
+    if not candidate_text:
+        return None
+
+    profile_key = canonical_key(job_requirements)
+    with span('fingerprint'):
+        fingerprint = core.report_index.simhash(candidate_text)
+    if allow_reuse:
+        with span('reuse_lookup'):
+            prior = core.reuse_prior_match(fingerprint, profile_key)
+        if prior is not None:
+            return prior
+
+    with span('extract_assessed_traits'):
+        assessed_traits = core.extract_assessed_traits(candidate_text)
+    analysis = await generate_matching_analysis_from_traits(candidate_text, job_requirements, assessed_traits)
+    core.index_match(fingerprint, profile_key, analysis)
+    analysis['partial'] = deadlines.partial_sections()
+    return analysis
+
+
+@app.route('/api/match-candidate', methods=['POST'])
+@traced_async('match_candidate')
+@upload_limited_async
+@rate_limited_async(estimate_match_cost)
+async def match_candidate():
+    """Compare candidate report against selected job trait requirements using AI"""
+    try:
+        files = await request.files
+        form = await request.form
+
+        if 'candidate_report' not in files:
+            return jsonify({'error': 'Candidate report PDF is required'}), 400
+
+        candidate_file = files['candidate_report']
+
+        try:
+            job_requirements = core.requested_job_requirements(form)
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        if not job_requirements:
+            return jsonify({'error': 'Job requirements are required'}), 400
+
+        if not candidate_file.filename.endswith('.pdf'):
+            return jsonify({'error': 'Candidate report must be PDF format'}), 400
+
+        allow_reuse = form.get('reuse', '1') != '0'
+
+        with span('hash_upload'):
+            key = canonical_key(core.file_digest(candidate_file), job_requirements, allow_reuse)
+        with span('pipeline') as attrs, deadlines.deadline(request_budget_ms(deadlines.MATCH_DEADLINE_MS, form)):
+            matching_analysis, attrs['shared'] = await matching_flight.do_async(
+                key, lambda: run_matching(candidate_file, job_requirements, allow_reuse)
+            )
+
+        if matching_analysis is None:
+            return jsonify({'error': 'Could not extract text from candidate PDF'}), 400
+
+        return jsonify(matching_analysis)
+
+    except Exception as e:
+        print(f"Error in match-candidate: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+async def stream_completion(kwargs, nested=()):
+    """Async counterpart of app.stream_completion"""
+    parser = core.IncrementalJSONParser(nested)
+    parts = []
+    attempt = 1
+    while True:
+        client = deadlines.bounded(get_async_client())
+        start = time.perf_counter()
+        try:
+            async for chunk in await client.chat.completions.create(stream=True, **kwargs):
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    for event in parser.feed(delta):
+                        yield event
+        except Exception as e:
+            delay = core.failed_completion(kwargs, start, e, attempt, retry=not parts)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        break
+    core.model_router.observe(kwargs['model'], time.perf_counter() - start, True)
+    yield ('content', ''.join(parts))
+
+
+async def stream_matching(candidate_text, job_requirements, assessed_traits, fingerprint, budget_ms):
+    """NDJSON events for /api/match-candidate/stream (see app.stream_matching)"""
+    with deadlines.deadline(budget_ms):
+        prompt, directly_assessed, not_assessed, prescored = core.prepare_matching(candidate_text, job_requirements, assessed_traits)
+        if prescored:
+            yield core.ndjson({'event': 'field', 'name': 'overall_fit_score', 'value': prescored['overall_fit_score']})
+            yield core.ndjson({'event': 'field', 'name': 'overall_fit_label', 'value': prescored['overall_fit_label']})
+            for name, computed in prescored['trait_scores'].items():
+                yield core.ndjson({'event': 'trait_score', 'name': name, 'value': computed})
+        content = ""
+        try:
+            async for event in stream_completion(core.matching_completion_kwargs(prompt), nested=('trait_scores',)):
+                if event[0] == 'entry':
+                    yield core.ndjson({'event': 'trait_analysis' if prescored else 'trait_score', 'name': event[2], 'value': event[3]})
+                elif event[0] == 'field' and event[1] != 'trait_scores' and not (prescored and event[1] in prescored):
+                    yield core.ndjson({'event': 'field', 'name': event[1], 'value': event[2]})
+                elif event[0] == 'content':
+                    content = event[1]
+
+            print(f"Streamed GPT response received: {len(content)} characters")
+            analysis = core.complete_matching(json.loads(content or "{}"), job_requirements, directly_assessed, not_assessed, prescored)
+            core.index_match(fingerprint, canonical_key(job_requirements), analysis)
+
+        except Exception as e:
+            print(f"GPT Error for streamed job matching: {str(e)}")
+            print(f"Content received: {content[:500]}")
+            deadlines.mark_partial('analysis', e)
+            analysis = core.complete_matching(None, job_requirements, directly_assessed, not_assessed, prescored)
+
+        analysis['partial'] = deadlines.partial_sections()
+        yield core.ndjson({'event': 'result', 'value': analysis})
+
+
+@app.route('/api/match-candidate/stream', methods=['POST'])
+@upload_limited_async
+@rate_limited_async(estimate_match_cost)
+async def match_candidate_stream():
+    """Streaming /api/match-candidate: newline-delimited JSON events while GPT writes the analysis"""
+    try:
+        files = await request.files
+        form = await request.form
+
+        if 'candidate_report' not in files:
+            return jsonify({'error': 'Candidate report PDF is required'}), 400
+
+        candidate_file = files['candidate_report']
+
+        try:
+            job_requirements = core.requested_job_requirements(form)
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        if not job_requirements:
+            return jsonify({'error': 'Job requirements are required'}), 400
+
+        if not candidate_file.filename.endswith('.pdf'):
+            return jsonify({'error': 'Candidate report must be PDF format'}), 400
+
+        print(f"\nSTREAMED JOB MATCHING REQUEST (async) - {candidate_file.filename}, {len(job_requirements)} traits")
+
+        # Extract before the stream starts so an unreadable PDF still gets a plain 400
+        loop = asyncio.get_running_loop()
+        candidate_text = await loop.run_in_executor(None, core.extract_text_from_pdf, candidate_file)
+        if not candidate_text:
+            return jsonify({'error': 'Could not extract text from candidate PDF'}), 400
+
+        fingerprint = core.report_index.simhash(candidate_text)
+        if form.get('reuse', '1') != '0':
+            prior = core.reuse_prior_match(fingerprint, canonical_key(job_requirements))
+            if prior is not None:
+                return Response(core.ndjson({'event': 'result', 'value': prior}), mimetype='application/x-ndjson')
+        assessed_traits = core.extract_assessed_traits(candidate_text)
+
+        budget_ms = request_budget_ms(deadlines.MATCH_DEADLINE_MS, form)
+        return Response(
+            stream_matching(candidate_text, job_requirements, assessed_traits, fingerprint, budget_ms),
+            mimetype='application/x-ndjson'
+        )
+
+    except Exception as e:
+        print(f"Error in match-candidate-stream: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+async def match_profile(candidate_text, fingerprint, assessed_traits, report, profile, allow_reuse):
+    """One profile of a multi-profile match (see app.match_extracted_report)"""
+    # Each gathered task runs in its own context, so the profile reports its own partial sections
+    with deadlines.scope(), span('match_profile', profile=profile['name']):
+        profile_key = canonical_key(profile['requirements'])
+        if allow_reuse:
+            prior = core.reuse_prior_match(fingerprint, profile_key)
+            if prior is not None:
+                return prior
+        analysis = await generate_matching_analysis_from_traits(candidate_text, profile['requirements'], assessed_traits, report)
+        core.index_match(fingerprint, profile_key, analysis)
+        analysis['partial'] = deadlines.partial_sections()
+        return analysis
+
+
+async def run_multi_matching(candidate_file, profiles, allow_reuse=True):
+    """Extract and parse the report once, then match every profile concurrently; None if the PDF has no text"""
+    loop = asyncio.get_running_loop()
+    with span('pdf_extract'):
+        candidate_text = await loop.run_in_executor(None, core.extract_text_from_pdf, candidate_file)
+    if not candidate_text:
+        return None
+
+    with span('fingerprint'):
+        fingerprint = core.report_index.simhash(candidate_text)
+    with span('extract_assessed_traits'):
+        assessed_traits = core.extract_assessed_traits(candidate_text)
+    with span('parse_report'):
+        report = core.prescoring.parse_report(candidate_text)
+
+    analyses = await asyncio.gather(*(
+        match_profile(candidate_text, fingerprint, assessed_traits, report, profile, allow_reuse) for profile in profiles
+    ))
+    return {
+        'ranking': core.rank_profile_matches(profiles, analyses),
+        'analyses': {profile['key']: analysis for profile, analysis in zip(profiles, analyses)},
+        'assessedTraits': assessed_traits,
+        'personalityType': report['personality_type']
+    }
+
+
+@app.route('/api/match-candidate/multi', methods=['POST'])
+@traced_async('match_candidate_multi')
+@upload_limited_async
+@rate_limited_async(estimate_multi_match_cost)
+async def match_candidate_multi():
+    """Match one candidate report against several job profiles and rank them (see app.match_candidate_multi)"""
+    try:
+        files = await request.files
+        form = await request.form
+
+        if 'candidate_report' not in files:
+            return jsonify({'error': 'Candidate report PDF is required'}), 400
+
+        candidate_file = files['candidate_report']
+        if not candidate_file.filename.endswith('.pdf'):
+            return jsonify({'error': 'Candidate report must be PDF format'}), 400
+
+        try:
+            profiles = core.requested_job_profiles(form)
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if not profiles:
+            return jsonify({'error': 'At least one job profile is required'}), 400
+        if len(profiles) > core.MULTI_MATCH_MAX_PROFILES:
+            return jsonify({'error': f'At most {core.MULTI_MATCH_MAX_PROFILES} job profiles per request'}), 400
+
+        allow_reuse = form.get('reuse', '1') != '0'
+        with span('pipeline'), deadlines.deadline(request_budget_ms(deadlines.MATCH_DEADLINE_MS, form)):
+            comparison = await run_multi_matching(candidate_file, profiles, allow_reuse)
+
+        if comparison is None:
+            return jsonify({'error': 'Could not extract text from candidate PDF'}), 400
+
+        return jsonify(comparison)
+
+    except Exception as e:
+        print(f"Error in match-candidate-multi: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/download-match-report', methods=['POST'])
+@traced_async('download_match_report')
+async def download_match_report():
+    """Generate PDF report for candidate-job matching analysis"""
+    try:
+        data = await request.get_json() or {}
+        with span('render_pdf'):
+            pdf_bytes = await _render_pdf_async('match', data)
+        return await send_file(
+            io.BytesIO(pdf_bytes),
+            mimetype='application/pdf',
+            as_attachment=True,
+            attachment_filename=f'candidate-job-match-{datetime.now().strftime("%Y-%m-%d")}.pdf'
+        )
+    except Exception as e:
+        print(f"Error generating match report PDF: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
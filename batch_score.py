@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""Batch scoring of exported assessment responses without going through /api/analyze
+
+Reads a JSONL file of {"id", "selectedTraits", "answers"} records, scores every trait with the
+same calculate_trait_metrics() as /api/analyze against the trait catalog, and writes one output
+record per input record (JSONL) or one row per scored trait (CSV), in input order:
+
+  python batch_score.py responses.jsonl -o scores.jsonl
+  python batch_score.py responses.jsonl -o scores.csv --format csv --workers 8
+
+Scoring runs in a process pool over chunks of lines with a bounded number of chunks in flight,
+so memory stays flat however large the file is. After every chunk the output is flushed and a
+checkpoint (<output>.checkpoint) records the last input line written; --resume truncates the
+output back to that point and carries on from the next line.
+
+--enrich adds the GPT overall assessment to each record, at most --enrich-rate calls per minute
+over --enrich-concurrency threads (uses OPENAI_API_KEY or LLM_BACKEND=stub like the server).
+"""
+import argparse
+import contextlib
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+CSV_FIELDS = ['line', 'id', 'trait', 'score', 'pattern', 'consistency', 'agreement', 'situationality',
+              'verification', 'personality_type_title', 'error']
+
+
+def _score_record(text, line_no):
+    """(record id, answers, results) for one JSONL line; raises ValueError for unusable records"""
+    import app
+    import catalog
+
+    try:
+        record = json.loads(text)
+    except ValueError as e:
+        raise ValueError(f'invalid JSON: {e}')
+    if not isinstance(record, dict):
+        raise ValueError('record is not an object')
+    record_id = record.get('id') or record.get('assessmentId') or str(line_no)
+    selected_traits = record.get('selectedTraits')
+    answers = record.get('answers') or {}
+    if not selected_traits:
+        raise ValueError('selectedTraits is empty')
+
+    known = catalog.load_catalog()['traits']
+    results = {}
+    for trait in selected_traits:
+        if trait not in known:
+            raise ValueError(f'unknown trait {trait}')
+        if trait not in answers:
+            raise ValueError(f'no answers for {trait}')
+        try:
+            results[trait] = app.calculate_trait_metrics(known[trait], answers[trait])
+        except (KeyError, TypeError, StopIteration) as e:
+            raise ValueError(f'incomplete answers for {trait}: {e!r}')
+    return record_id, answers, results
+
+
+def score_chunk(lines, keep_answers=False):
+    """Score a chunk of (line number, text) pairs in a worker; returns one entry per line"""
+    scored = []
+    for line_no, text in lines:
+        try:
+            record_id, answers, results = _score_record(text, line_no)
+            entry = {'line': line_no, 'id': record_id, 'results': results}
+            if keep_answers:
+                entry['answers'] = {trait: answers[trait] for trait in results}
+            scored.append(entry)
+        except ValueError as e:
+            scored.append({'line': line_no, 'id': None, 'error': str(e)})
+    return scored
+
+
+class Throttle:
+    """Spaces calls at least 60/rate_per_minute seconds apart across threads"""
+
+    def __init__(self, rate_per_minute):
+        self.interval = 60.0 / rate_per_minute if rate_per_minute > 0 else 0
+        self.lock = threading.Lock()
+        self.next_at = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_at)
+            self.next_at = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def enrich(entry, throttle):
+    """Add the GPT overall assessment to a scored entry (dropping the answers it was scored from)"""
+    import app
+    import catalog
+
+    answers = entry.pop('answers', None)
+    if 'results' not in entry:
+        return entry
+    throttle.wait()
+    traits = list(entry['results'])
+    trait_data = {trait: catalog.trait_payload(trait) for trait in traits}
+    assessment = app.resolve_assessment(traits, answers, trait_data, entry['results'])
+    entry['overallAssessment'] = app.generate_overall_assessment(assessment)
+    return entry
+
+
+class JsonlWriter:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, entry):
+        self.stream.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+
+class CsvWriter:
+    def __init__(self, stream, write_header):
+        self.writer = csv.DictWriter(stream, fieldnames=CSV_FIELDS, extrasaction='ignore')
+        if write_header:
+            self.writer.writeheader()
+
+    def write(self, entry):
+        if 'error' in entry:
+            self.writer.writerow({'line': entry['line'], 'id': entry['id'], 'error': entry['error']})
+            return
+        title = (entry.get('overallAssessment') or {}).get('personality_type_title')
+        for trait, result in entry['results'].items():
+            row = {'line': entry['line'], 'id': entry['id'], 'trait': trait, 'personality_type_title': title}
+            row.update({field: result.get(field) for field in CSV_FIELDS if field in result})
+            self.writer.writerow(row)
+
+
+def checkpoint_path(output):
+    return output + '.checkpoint'
+
+
+def read_checkpoint(output):
+    """(last input line written, output byte offset after it), or (0, 0) without a checkpoint"""
+    try:
+        with open(checkpoint_path(output), encoding='utf-8') as f:
+            checkpoint = json.load(f)
+        return checkpoint['line'], checkpoint['offset']
+    except FileNotFoundError:
+        return 0, 0
+
+
+def write_checkpoint(output, line_no, offset):
+    path = checkpoint_path(output)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'line': line_no, 'offset': offset}, f)
+    os.replace(path + '.tmp', path)
+
+
+def read_chunks(path, chunk_size, skip_lines):
+    """Yield lists of (line number, text) for the non-blank lines after skip_lines"""
+    chunk = []
+    with open(path, encoding='utf-8') as f:
+        for line_no, text in enumerate(f, 1):
+            if line_no <= skip_lines or not text.strip():
+                continue
+            chunk.append((line_no, text))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def run(args, out, start_line):
+    """Score args.input into `out`; returns (records, errors)"""
+    writer = CsvWriter(out, write_header=start_line == 0) if args.format == 'csv' else JsonlWriter(out)
+    enricher = ThreadPoolExecutor(max_workers=args.enrich_concurrency) if args.enrich else None
+    throttle = Throttle(args.enrich_rate)
+    records = errors = 0
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        chunks = read_chunks(args.input, args.chunk_size, start_line)
+        pending = deque()
+        # A bounded window of chunks in flight keeps memory flat
+        for chunk in chunks:
+            pending.append((chunk[-1][0], pool.submit(score_chunk, chunk, args.enrich)))
+            if len(pending) >= args.workers * 2:
+                break
+
+        while pending:
+            last_line, future = pending.popleft()
+            entries = future.result()
+            if enricher is not None:
+                entries = list(enricher.map(lambda entry: enrich(entry, throttle), entries))
+            for entry in entries:
+                writer.write(entry)
+                records += 1
+                errors += 'error' in entry
+            out.flush()
+            if args.output != '-':
+                write_checkpoint(args.output, last_line, out.tell())
+
+            next_chunk = next(chunks, None)
+            if next_chunk is not None:
+                pending.append((next_chunk[-1][0], pool.submit(score_chunk, next_chunk, args.enrich)))
+
+            elapsed = time.perf_counter() - started
+            print(f"Scored {records} records through line {last_line} ({errors} errors, {records / max(elapsed, 1e-9):.0f}/s)",
+                  file=sys.stderr)
+
+    if enricher is not None:
+        enricher.shutdown()
+    return records, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score a JSONL file of assessment responses')
+    parser.add_argument('input', help='JSONL file of {"id", "selectedTraits", "answers"} records')
+    parser.add_argument('-o', '--output', default='-', help='output file (default: stdout)')
+    parser.add_argument('--format', choices=('jsonl', 'csv'), default='jsonl')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='scoring processes (default: all cores)')
+    parser.add_argument('--chunk-size', type=int, default=500, help='records per worker task')
+    parser.add_argument('--resume', action='store_true', help='continue an interrupted run from its checkpoint')
+    parser.add_argument('--enrich', action='store_true', help='add the GPT overall assessment to each record')
+    parser.add_argument('--enrich-rate', type=float, default=30, help='GPT calls per minute (default 30)')
+    parser.add_argument('--enrich-concurrency', type=int, default=2, help='GPT calls in flight (default 2)')
+    args = parser.parse_args(argv)
+
+    if args.resume and args.output == '-':
+        parser.error('--resume needs --output')
+
+    start_line = offset = 0
+    if args.resume:
+        start_line, offset = read_checkpoint(args.output)
+        if start_line:
+            print(f"Resuming after line {start_line}", file=sys.stderr)
+
+    if args.output == '-':
+        out = sys.stdout
+    else:
+        out = open(args.output, 'r+' if start_line else 'w', encoding='utf-8', newline='')
+        # Drop whatever was written after the last checkpoint
+        out.seek(offset)
+        out.truncate()
+
+    if args.enrich:
+        import app
+        app.load_env()
+
+    try:
+        # The pipeline's progress logging goes to stderr so it never mixes with the output
+        with contextlib.redirect_stdout(sys.stderr):
+            records, errors = run(args, out, start_line)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(f"Done: {records} records scored, {errors} errors", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
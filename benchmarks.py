@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""Benchmark suite
+
+Run `python benchmarks.py` for everything or `python benchmarks.py <name> ...` for a subset.
+Each benchmark prints its measurements; redirect to bench_output.txt to keep a record.
+
+`memory-guard` also compares per-assessment peak memory of each pipeline stage against
+memory_baseline.json and exits non-zero when a stage exceeds its baseline by more than the
+tolerance (--tolerance, default 20%). Record a new baseline with --update-baseline after an
+intended change.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def _timed_subprocess(code, repeat):
+    """Median wall time of running `code` in a fresh interpreter, minus bare interpreter start-up"""
+    env = dict(os.environ)
+    env.setdefault('OPENAI_API_KEY', 'benchmark')
+
+    def run(snippet):
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, '-c', snippet], cwd=ROOT, env=env, check=True)
+            samples.append(time.perf_counter() - start)
+        return statistics.median(samples)
+
+    baseline = run('pass')
+    return run(code) - baseline
+
+
+def bench_import_time(repeat):
+    """Cold-start cost: importing the app module, building the app, warm-up and first heavy use"""
+    cases = [
+        ('import app', 'import app'),
+        ('create_app()', 'import app; app.create_app()'),
+        ('create_app() + warm_up()', 'import app; app.create_app(); app.warm_up()'),
+        ('first PDF render', 'import app; app.build_assessment_pdf({})'),
+        ('first OpenAI client', 'import app; app.get_openai_client()'),
+        ('import async_app', 'import async_app'),
+    ]
+    for label, code in cases:
+        elapsed = _timed_subprocess(code, repeat)
+        print(f"  {label:<28} {elapsed * 1000:8.1f} ms")
+
+
+def _sample_assessment(trait_count=8, question_count=12):
+    """Synthetic /api/download payload shaped like a full assessment"""
+    selected, trait_data, answers, results, analyses = [], {}, {}, {}, {}
+    for t in range(trait_count):
+        key = f'Trait{t}-Opposite{t}'
+        selected.append(key)
+        questions = [{
+            'id': q + 1,
+            'text': f'Question {q + 1} about how you approach situations involving trait {t}?',
+            'options': [{'value': v / 2, 'label': f'Option {v}', 'decoding': f'Leans towards pole {v} in this situation'} for v in range(5)],
+        } for q in range(question_count)]
+        trait_data[key] = {'interpretation': {'name': f'Trait {t}', 'lowEnd': 'Low', 'highEnd': 'High'}, 'questions': questions}
+        answers[key] = {q['id']: q['options'][q['id'] % 5]['value'] for q in questions}
+        results[key] = {'score': 1.1, 'pattern': 'balanced', 'consistency': 0.8, 'agreement': 0.7}
+        analyses[key] = {field: 'Analysis text. ' * 20 for field in ('behavioral_profile', 'self_awareness', 'adaptability', 'pattern_summary')}
+    overall = {'personality_type_title': 'Benchmark Profile'}
+    overall.update({field: 'Overall text. ' * 40 for field in ('profile_summary', 'decision_style', 'awareness_adaptability',
+                                                              'patterns_themes', 'professional_implications', 'development_insights')})
+    return {'selectedTraits': selected, 'answers': answers, 'results': results, 'traitData': trait_data,
+            'overallAssessment': overall, 'traitAnalyses': analyses}
+
+
+def _sample_match():
+    """Synthetic /api/download-match-report payload"""
+    scores = {f'Trait {i}': {'score': 3.5, 'required_level': 'high', 'analysis': 'Fit analysis. ' * 15} for i in range(10)}
+    items = [f'Item {i} with supporting detail' for i in range(6)]
+    return {'candidateName': 'Candidate', 'jobTitle': 'Position', 'matchingAnalysis': {
+        'overall_fit_score': 3.8, 'overall_fit_label': 'Good Fit', 'hiring_recommendation': 'Recommend. ' * 10,
+        'executive_summary': 'Summary. ' * 30 + '\n\n' + 'More. ' * 30, 'trait_scores': scores,
+        'key_strengths': items, 'potential_concerns': items, 'specific_evidence': items,
+        'risk_assessment': 'Risk. ' * 40, 'development_needs': items, 'onboarding_recommendations': items}}
+
+
+def bench_pdf_render(repeat):
+    """Report rendering: time and allocations per page for single reports and a 100+ page cohort"""
+    import pdf_reports
+
+    pdf_reports.prepare()
+    assessment, match = _sample_assessment(), _sample_match()
+    cases = [
+        ('assessment report', lambda: pdf_reports.render(pdf_reports.assessment_blocks(assessment))),
+        ('match report', lambda: pdf_reports.render(pdf_reports.match_blocks(match))),
+        ('cohort (12 assessments)', lambda: pdf_reports.render_cohort([('assessment', assessment)] * 12)),
+    ]
+    for label, render in cases:
+        render()
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            _, pages = render()
+            samples.append(time.perf_counter() - start)
+        tracemalloc.start()
+        render()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        elapsed = statistics.median(samples)
+        print(f"  {label:<28} {pages:4d} pages {elapsed * 1000:8.1f} ms "
+              f"{elapsed * 1000 / pages:6.2f} ms/page {peak / pages / 1024:7.1f} KiB peak/page")
+
+
+def _measure(fn, repeat, loops=200):
+    """(median seconds per call, peak traced bytes of one call)"""
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - start) / loops)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(samples), peak
+
+
+def bench_assessment_render(repeat):
+    """CPU and peak memory per assessment for the prompt, HTML and PDF consumers of the resolved view"""
+    import contextlib
+    import io
+    import random
+
+    os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+    import app
+    import catalog
+    import pdf_reports
+
+    rng = random.Random(1)
+    for count in (3, len(catalog.trait_keys())):
+        traits = rng.sample(catalog.trait_keys(), count)
+        trait_data = {trait: catalog.trait_payload(trait) for trait in traits}
+        answers = {t: {q['id']: rng.choice(q['options'])['value'] for q in trait_data[t]['questions']} for t in traits}
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = app.calculate_results(traits, answers, trait_data)
+        analyses = {t: {'behavioral_profile': 'text', 'self_awareness': 'text', 'adaptability': 'text', 'pattern_summary': 'text'} for t in traits}
+        overall = {'personality_type_title': 'Benchmark'}
+        assessment = app.resolve_assessment(traits, answers, trait_data, results)
+        payload = {'selectedTraits': traits, 'answers': answers, 'results': results, 'traitData': trait_data,
+                   'overallAssessment': overall, 'traitAnalyses': analyses}
+
+        def analyze_path():
+            resolved = app.resolve_assessment(traits, answers, trait_data, results)
+            app.build_overall_prompt(resolved)
+            for trait in resolved:
+                app.build_trait_prompt(trait)
+            app.fill_trait_placeholders(app.generate_html_structure(resolved, overall), analyses)
+
+        cases = [
+            ('resolve', lambda: app.resolve_assessment(traits, answers, trait_data, results)),
+            ('overall prompt', lambda: app.build_overall_prompt(assessment)),
+            ('trait prompts', lambda: [app.build_trait_prompt(trait) for trait in assessment]),
+            ('html + fill', lambda: app.fill_trait_placeholders(app.generate_html_structure(assessment, overall), analyses)),
+            ('analyze (all of the above)', analyze_path),
+            ('pdf blocks', lambda: pdf_reports.assessment_blocks(payload)),
+        ]
+        print(f"  {count} traits")
+        for label, fn in cases:
+            elapsed, peak = _measure(fn, repeat)
+            print(f"    {label:<28} {elapsed * 1e6:8.1f} us {peak / 1024:7.1f} KiB peak")
+
+
+def bench_html_fragments(repeat, assessments=2000):
+    """Result HTML render time per assessment without, and with, the trait card fragment cache"""
+    import contextlib
+    import io
+    import random
+
+    os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+    import app
+    import catalog
+
+    rng = random.Random(1)
+    keys = catalog.trait_keys()
+    overall = {'personality_type_title': 'Benchmark'}
+    stream = []
+    for _ in range(assessments):
+        traits = rng.sample(keys, rng.randint(3, 8))
+        trait_data = {trait: catalog.trait_payload(trait) for trait in traits}
+        answers = {t: {q['id']: rng.choice(q['options'])['value'] for q in trait_data[t]['questions']} for t in traits}
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = app.calculate_results(traits, answers, trait_data)
+        stream.append(app.resolve_assessment(traits, answers, trait_data, results))
+
+    configured = app.HTML_FRAGMENT_CACHE_CHARS
+    cases = [('no cache', 0, None), ('cache 256k chars', 256000, 256000), (f'cache {configured // 1000}k chars', configured, configured)]
+    try:
+        for label, enabled, max_chars in cases:
+            app.HTML_FRAGMENT_CACHE_CHARS = enabled
+            app.trait_card_cache = app.FragmentCache('trait_card', max_chars or 1)
+            # First pass fills the cache; the samples are the steady state of a busy server
+            samples = []
+            for _ in range(repeat + 1):
+                start = time.perf_counter()
+                for assessment in stream:
+                    app.generate_html_structure(assessment, overall)
+                samples.append((time.perf_counter() - start) / len(stream))
+            stats = app.trait_card_cache.stats()
+            hit_rate = f"{stats['hitRate'] * 100:5.1f}% hits, {stats['chars'] // 1000}k chars held" if enabled else ''
+            print(f"  {label:<28} first pass {samples[0] * 1e6:7.1f} us/assessment, "
+                  f"steady {statistics.median(samples[1:]) * 1e6:7.1f} us/assessment {hit_rate}")
+    finally:
+        app.HTML_FRAGMENT_CACHE_CHARS = configured
+        app.trait_card_cache = app.FragmentCache('trait_card', configured)
+
+
+MEMORY_BASELINE_PATH = os.path.join(ROOT, 'memory_baseline.json')
+# Absolute slack on top of the relative tolerance, so tiny stages do not flap
+MEMORY_SLACK_BYTES = 16 * 1024
+
+
+def _peak(fn):
+    """Peak traced bytes of one warm call"""
+    fn()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def _memory_cases():
+    """(stage, fn) for one full-catalog assessment through every pipeline stage"""
+    import contextlib
+    import io
+    import random
+
+    os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+    import app
+    import catalog
+    import pdf_reports
+    from werkzeug.datastructures import FileStorage
+
+    rng = random.Random(1)
+    traits = catalog.trait_keys()
+    trait_data = {trait: catalog.trait_payload(trait) for trait in traits}
+    answers = {t: {q['id']: rng.choice(q['options'])['value'] for q in trait_data[t]['questions']} for t in traits}
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = app.calculate_results(traits, answers, trait_data)
+    analyses = {t: {'behavioral_profile': 'text ' * 60, 'self_awareness': 'text ' * 40, 'adaptability': 'text ' * 40,
+                    'pattern_summary': 'text ' * 40} for t in traits}
+    overall = {'personality_type_title': 'Benchmark'}
+    assessment = app.resolve_assessment(traits, answers, trait_data, results)
+    payload = {'selectedTraits': traits, 'answers': answers, 'results': results, 'traitData': trait_data,
+               'overallAssessment': overall, 'traitAnalyses': analyses}
+    pdf_reports.prepare()
+    report_pdf = pdf_reports.render_report('assessment', payload).getvalue()
+    job_requirements = {name: {'level': 'high', 'description': name} for name in list(catalog.JOB_TRAIT_DIMENSIONS)[:8]}
+    report_text = app.extract_text_from_pdf(FileStorage(io.BytesIO(report_pdf), 'report.pdf'))
+
+    def scoring():
+        with contextlib.redirect_stdout(io.StringIO()):
+            app.calculate_results(traits, answers, trait_data)
+
+    return [
+        ('scoring', scoring),
+        ('prompt', lambda: [app.build_overall_prompt(assessment)] + [app.build_trait_prompt(trait) for trait in assessment]),
+        ('matching prompt', lambda: app.prepare_matching(report_text, job_requirements, [])),
+        ('html', lambda: app.fill_trait_placeholders(app.generate_html_structure(assessment, overall), analyses)),
+        ('pdf_build', lambda: pdf_reports.render_report('assessment', payload)),
+        ('pdf_extract', lambda: app.extract_text_from_pdf(FileStorage(io.BytesIO(report_pdf), 'report.pdf'))),
+    ]
+
+
+def bench_memory_guard(repeat, tolerance=0.2, update_baseline=False):
+    """Per-assessment peak memory of each pipeline stage against memory_baseline.json"""
+    peaks = {stage: _peak(fn) for stage, fn in _memory_cases()}
+    if update_baseline:
+        with open(MEMORY_BASELINE_PATH, 'w', encoding='utf-8') as f:
+            json.dump({'peakBytes': peaks}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"  baseline written to {os.path.basename(MEMORY_BASELINE_PATH)}")
+
+    baseline = {}
+    if os.path.exists(MEMORY_BASELINE_PATH):
+        with open(MEMORY_BASELINE_PATH, encoding='utf-8') as f:
+            baseline = json.load(f)['peakBytes']
+
+    failures = []
+    for stage, peak in peaks.items():
+        limit = baseline.get(stage)
+        if limit is None:
+            print(f"  {stage:<28} {peak / 1024:9.1f} KiB peak (no baseline)")
+            continue
+        allowed = limit * (1 + tolerance) + MEMORY_SLACK_BYTES
+        status = 'ok' if peak <= allowed else 'REGRESSION'
+        print(f"  {stage:<28} {peak / 1024:9.1f} KiB peak, baseline {limit / 1024:9.1f} KiB  {status}")
+        if peak > allowed:
+            failures.append(f"{stage}: {peak} bytes peak exceeds {int(allowed)} ({limit} + {tolerance:.0%})")
+    return failures
+
+
+BENCHMARKS = {
+    'import-time': bench_import_time,
+    'pdf-render': bench_pdf_render,
+    'assessment-render': bench_assessment_render,
+    'html-fragments': bench_html_fragments,
+    'memory-guard': bench_memory_guard,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the benchmark suite')
+    parser.add_argument('names', nargs='*', help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument('--repeat', type=int, default=5, help='samples per measurement')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='memory-guard: allowed growth over the baseline')
+    parser.add_argument('--update-baseline', action='store_true', help='memory-guard: record the current peaks as the baseline')
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    failures = []
+    for name in args.names or BENCHMARKS:
+        print(f"{name}:")
+        if name == 'memory-guard':
+            failures += BENCHMARKS[name](args.repeat, args.tolerance, args.update_baseline)
+        else:
+            BENCHMARKS[name](args.repeat)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""Streaming ZIP export of many rendered reports
+
+Reports are rendered in a process pool with a bounded window of jobs in flight and
+written into the archive in submission order as they finish; archive bytes are yielded
+as soon as each member is written. Peak memory therefore depends on the window size,
+not on the number of reports. Progress is kept in SQLite so any worker can report it.
+"""
+import json
+import multiprocessing
+import os
+import re
+import time
+import uuid
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import storage
+
+DB_NAME = 'exports'
+
+# Reports rendered concurrently (and therefore held in memory) per export
+EXPORT_PARALLELISM = int(os.environ.get('EXPORT_PARALLELISM', max(1, (os.cpu_count() or 2) - 1)))
+EXPORT_MAX_REPORTS = int(os.environ.get('EXPORT_MAX_REPORTS', 1000))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS export_jobs (
+    id TEXT PRIMARY KEY,
+    total INTEGER NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+_executor = None
+
+
+def _connect():
+    return storage.connect(DB_NAME, SCHEMA)
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=EXPORT_PARALLELISM, mp_context=multiprocessing.get_context('spawn'))
+    return _executor
+
+
+def new_job(total):
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    _connect().execute(
+        'INSERT INTO export_jobs (id, total, status, started_at, updated_at) VALUES (?, ?, ?, ?, ?)',
+        (job_id, total, 'running', now, now)
+    )
+    return job_id
+
+
+def _update_job(job_id, completed, failed, status='running'):
+    _connect().execute(
+        'UPDATE export_jobs SET completed = ?, failed = ?, status = ?, updated_at = ? WHERE id = ?',
+        (completed, failed, status, time.time(), job_id)
+    )
+
+
+def get_progress(job_id):
+    """Return the progress of an export job, or None"""
+    row = _connect().execute('SELECT * FROM export_jobs WHERE id = ?', (job_id,)).fetchone()
+    if row is None:
+        return None
+    return {
+        'jobId': row['id'],
+        'total': row['total'],
+        'completed': row['completed'],
+        'failed': row['failed'],
+        'status': row['status'],
+        'elapsedSeconds': row['updated_at'] - row['started_at']
+    }
+
+
+class _ChunkSink:
+    """Write-only file object collecting archive bytes until the generator drains them"""
+
+    def __init__(self):
+        self.chunks = []
+        self.offset = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _member_name(index, entry):
+    label = entry.get('label') or entry['kind']
+    label = re.sub(r'[^A-Za-z0-9._-]+', '-', str(label)).strip('-')[:60] or entry['kind']
+    return f"{index + 1:04d}-{entry['kind']}-{label}.pdf"
+
+
+def stream_zip(job_id, entries, render):
+    """Yield a ZIP archive of rendered reports.
+
+    entries: list of {'kind': 'assessment'|'match', 'label': str, 'load': callable returning the payload}
+    render: picklable top-level function (kind, payload) -> PDF bytes, run in the process pool
+    """
+    sink = _ChunkSink()
+    archive = zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED)
+    executor = _get_executor()
+    pending = deque()
+    manifest = []
+    completed = failed = 0
+    next_index = 0
+
+    def submit(index):
+        entry = entries[index]
+        try:
+            future = executor.submit(render, entry['kind'], entry['load']())
+        except Exception as e:
+            future = e
+        pending.append((index, future))
+
+    try:
+        while next_index < len(entries) and len(pending) < EXPORT_PARALLELISM:
+            submit(next_index)
+            next_index += 1
+
+        while pending:
+            index, future = pending.popleft()
+            entry = entries[index]
+            name = _member_name(index, entry)
+            try:
+                if isinstance(future, Exception):
+                    raise future
+                pdf_bytes = future.result()
+                archive.writestr(name, pdf_bytes)
+                del pdf_bytes
+                completed += 1
+                manifest.append({'file': name, 'kind': entry['kind'], 'label': entry.get('label'), 'status': 'ok'})
+            except Exception as e:
+                failed += 1
+                manifest.append({'file': None, 'kind': entry['kind'], 'label': entry.get('label'), 'status': 'error', 'error': str(e)})
+                print(f"Export {job_id}: failed to render {name}: {str(e)}")
+
+            # Keep the window full before handing bytes to the client
+            if next_index < len(entries):
+                submit(next_index)
+                next_index += 1
+
+            _update_job(job_id, completed, failed)
+            yield sink.drain()
+
+        archive.writestr('manifest.json', json.dumps({'jobId': job_id, 'reports': manifest}, indent=2))
+        archive.close()
+        _update_job(job_id, completed, failed, 'done')
+        yield sink.drain()
+
+    except GeneratorExit:
+        # Client went away: drop queued renders
+        for _, future in pending:
+            if not isinstance(future, Exception):
+                future.cancel()
+        _update_job(job_id, completed, failed, 'cancelled')
+        raise
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""Index of candidate trait vectors for ranking a pool against a job profile without LLM calls
+
+Every analyzed assessment is stored here as its per-dimension (score, consistency, agreement)
+values. Each process keeps the pool in a NumPy matrix (one row per candidate, three columns per
+catalog dimension, plus an assessed mask) and tops it up from SQLite with just the rows added
+since its last look, so rank() scores the whole pool with a handful of vectorized operations
+using the same arithmetic as fit_scoring.
+
+NumPy is imported on first use.
+"""
+import json
+import threading
+import time
+
+import catalog
+import fit_scoring
+import storage
+
+DB_NAME = 'candidates'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS candidates (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    label TEXT,
+    source TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    traits TEXT NOT NULL
+);
+"""
+
+FIELDS = ('score', 'consistency', 'agreement')
+
+
+def _connect():
+    return storage.connect(DB_NAME, SCHEMA)
+
+
+def save_candidate(candidate_id, traits, label=None, source='assessment'):
+    """Store (or replace) a candidate's vector; traits: {dimension: {'score', 'consistency', 'agreement'}}"""
+    vector = {
+        dim: [float(values[field]) for field in FIELDS]
+        for dim, values in traits.items()
+        if all(values.get(field) is not None for field in FIELDS)
+    }
+    if not vector:
+        return None
+    _connect().execute(
+        'INSERT OR REPLACE INTO candidates (id, label, source, created_at, traits) VALUES (?, ?, ?, ?, ?)',
+        (candidate_id, label, source, time.time(), json.dumps(vector))
+    )
+    return candidate_id
+
+
+class _Pool:
+    """This process's matrix view of the candidates table"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.dimensions = []
+        self.columns = {}
+        self.ids = []
+        self.labels = []
+        self.rows = {}
+        self.values = None
+        self.mask = None
+        self.last_seq = 0
+        self.size = 0
+
+    def _reset(self, np, dimensions):
+        self.dimensions = dimensions
+        self.columns = {dim: i for i, dim in enumerate(dimensions)}
+        self.ids, self.labels, self.rows = [], [], {}
+        self.values = np.zeros((0, len(dimensions), len(FIELDS)), dtype=np.float32)
+        self.mask = np.zeros((0, len(dimensions)), dtype=bool)
+        self.last_seq = 0
+        self.size = 0
+
+    def refresh(self):
+        """Load rows added since the last refresh (a catalog change rebuilds from scratch)"""
+        import numpy as np
+        with self.lock:
+            dimensions = catalog.trait_keys()
+            if dimensions != self.dimensions or self.values is None:
+                self._reset(np, dimensions)
+            new_rows = _connect().execute(
+                'SELECT seq, id, label, traits FROM candidates WHERE seq > ? ORDER BY seq', (self.last_seq,)
+            ).fetchall()
+            if not new_rows:
+                return
+            self._grow(np, self.size + len(new_rows))
+            for row in new_rows:
+                index = self.rows.get(row['id'])
+                if index is None:
+                    index = self.rows[row['id']] = self.size
+                    self.ids.append(row['id'])
+                    self.labels.append(row['label'])
+                    self.size += 1
+                else:
+                    self.labels[index] = row['label']
+                self.values[index] = 0
+                self.mask[index] = False
+                for dim, vector in json.loads(row['traits']).items():
+                    column = self.columns.get(dim)
+                    if column is not None:
+                        self.values[index, column] = vector
+                        self.mask[index, column] = True
+                self.last_seq = row['seq']
+
+    def _grow(self, np, needed):
+        # Amortized growth: reallocate with headroom instead of once per candidate
+        capacity = len(self.values)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 256)
+        values = np.zeros((capacity, len(self.dimensions), len(FIELDS)), dtype=np.float32)
+        mask = np.zeros((capacity, len(self.dimensions)), dtype=bool)
+        values[:self.size] = self.values[:self.size]
+        mask[:self.size] = self.mask[:self.size]
+        self.values, self.mask = values, mask
+
+
+_pool = _Pool()
+
+
+def rank(job_requirements, k=10, min_coverage=0.0):
+    """Score every indexed candidate against a job profile and return the top k.
+
+    Candidates assessed on less than `min_coverage` of the required traits are left out.
+
+    Returns {'total': pool size, 'eligible': candidates passing min_coverage, 'candidates':
+    [{'candidateId', 'label', 'overallFitScore', 'overallFitLabel', 'fitScore', 'coverage',
+    'traitScores'}]}, best first; traitScores is None for a trait the
+    candidate was not assessed on (or that no assessment dimension measures).
+    """
+    import numpy as np
+    _pool.refresh()
+    with _pool.lock:
+        size = _pool.size
+        values = _pool.values[:size]
+        mask = _pool.mask[:size]
+        ids = list(_pool.ids)
+        labels = list(_pool.labels)
+
+    total_traits = len(job_requirements)
+    mapped = [(name, _pool.columns[dim], pole, level)
+              for name, dim, pole, level in fit_scoring.profile_dimensions(job_requirements)
+              if dim in _pool.columns]
+    if size == 0 or total_traits == 0:
+        return {'total': size, 'eligible': 0, 'candidates': []}
+
+    if mapped:
+        columns = np.array([m[1] for m in mapped])
+        high = np.array([m[2] == 'high' for m in mapped])
+        targets = np.array([fit_scoring.level_target(m[3]) for m in mapped], dtype=np.float32)
+        spans = np.maximum(targets, 1 - targets)
+
+        selected = values[:, columns]                      # candidates x traits x fields
+        score, consistency, agreement = selected[..., 0], selected[..., 1], selected[..., 2]
+        lean = np.where(high, score / 2, 1 - score / 2)
+        raw = 1 + 4 * (1 - np.abs(lean - targets) / spans)
+        fit = fit_scoring.NEUTRAL_SCORE + (raw - fit_scoring.NEUTRAL_SCORE) * (consistency + agreement) / 2
+        assessed = mask[:, columns]
+        assessed_count = assessed.sum(axis=1)
+        assessed_avg = np.where(assessed, fit, 0).sum(axis=1) / np.maximum(assessed_count, 1)
+    else:
+        fit = assessed = None
+        assessed_count = np.zeros(size, dtype=np.int64)
+        assessed_avg = np.zeros(size, dtype=np.float32)
+
+    weight = fit_scoring.ASSESSED_WEIGHT
+    overall = np.where(
+        assessed_count == 0, fit_scoring.NEUTRAL_SCORE,
+        np.where(assessed_count == total_traits, assessed_avg,
+                 weight * assessed_avg + (1 - weight) * fit_scoring.NEUTRAL_SCORE)
+    )
+
+    # Best fit first, more assessed traits breaking ties; only the top k are fully sorted
+    eligible = np.flatnonzero(assessed_count >= min_coverage * total_traits - 1e-9)
+    k = max(0, min(int(k), len(eligible)))
+    order_key = overall[eligible] + assessed_count[eligible] * 1e-6
+    top = np.argpartition(-order_key, k - 1)[:k] if 0 < k < len(eligible) else np.arange(len(eligible))
+    top = eligible[top[np.argsort(-order_key[top], kind='stable')][:k]]
+
+    candidates = []
+    for i in top:
+        trait_scores = {name: None for name in job_requirements}
+        for j, (name, _, _, _) in enumerate(mapped):
+            if assessed[i, j]:
+                trait_scores[name] = round(float(fit[i, j]), 2)
+        rounded = fit_scoring.round_half(float(overall[i]))
+        candidates.append({
+            'candidateId': ids[i],
+            'label': labels[i],
+            'overallFitScore': rounded,
+            'overallFitLabel': fit_scoring.fit_label(rounded),
+            'fitScore': round(float(overall[i]), 3),
+            'coverage': round(int(assessed_count[i]) / total_traits, 3),
+            'traitScores': trait_scores
+        })
+    return {'total': size, 'eligible': len(eligible), 'candidates': candidates}
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""Server-side view of the trait catalog
+
+The catalog lives in public/js/traitData.js as JavaScript object literals. This module
+reads that file so server-side tools work from the exact data the client sends, without a
+second copy to keep in sync.
+
+It also serves the catalog to the browser in pieces: manifest() holds just what trait
+selection shows, and bundles() the per-trait questions, interpretation and patterns, each
+fingerprinted by content so the bundle URLs can be cached forever.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'public', 'js', 'traitData.js')
+
+SECTIONS = ('traits', 'traitInterpretations', 'patternInterpretations')
+
+# Traits a job profile can require, with the descriptions shown on match.html
+JOB_TRAITS = {
+    'Analytical Thinking': 'Makes decisions based on data, logic, and systematic analysis.',
+    'Intuitive Thinking': 'Relies on instinct, gut feelings, and pattern recognition.',
+    'Risk-Taking': 'Comfortable with uncertainty and willing to try unconventional approaches.',
+    'Risk Aversion': 'Prefers proven methods and careful planning.',
+    'Collaboration': 'Thrives in team settings and values group input.',
+    'Independent Work': 'Prefers autonomy and self-directed tasks.',
+    'Detail Orientation': 'Focuses on precision, accuracy, and thorough execution.',
+    'Big Picture Thinking': 'Focuses on strategy, vision, and overall objectives.',
+    'Adaptability': 'Flexible and comfortable with change.',
+    'Consistency': 'Values reliability and predictable approaches.',
+    'Proactivity': 'Takes initiative and anticipates needs.',
+    'Reactivity': 'Responds thoughtfully to situations as they arise.',
+    'Empathy': "Prioritizes understanding others' feelings and perspectives.",
+    'Task Focus': 'Prioritizes objectives and deliverables.',
+    'Innovation': 'Seeks new solutions and creative approaches.',
+    'Process Adherence': 'Follows established procedures and best practices.',
+    'Decisiveness': 'Makes quick, firm decisions with available information.',
+    'Deliberation': 'Takes time to consider multiple perspectives before deciding.',
+    'Assertiveness': 'Direct and firm in communication.',
+    'Diplomacy': 'Tactful and consensus-oriented in communication.',
+    'Optimism': 'Focuses on possibilities and positive outcomes.',
+    'Realism': 'Focuses on practical constraints and likely outcomes.',
+    'Structured': 'Prefers organized, planned approaches.',
+    'Flexible': 'Comfortable with spontaneity and fluid situations.',
+    'Results-Oriented': 'Focuses on outcomes and achievement.',
+    'Process-Oriented': 'Focuses on methods and quality of execution.',
+    'Competitive': 'Motivated by winning and outperforming others.',
+    'Cooperative': 'Motivated by mutual success and collective achievement.',
+    'Confidence': 'Self-assured and willing to take charge.',
+    'Humility': 'Values learning and acknowledges limitations.'
+}
+
+# Catalog dimension each job trait maps to, and which end of it (score 0 = low end, 2 = high end).
+# Job traits missing here are not measured by any assessment dimension.
+JOB_TRAIT_DIMENSIONS = {
+    'Analytical Thinking': ('Analytical-Intuitive', 'low'),
+    'Intuitive Thinking': ('Analytical-Intuitive', 'high'),
+    'Risk-Taking': ('Risk-Caution', 'high'),
+    'Risk Aversion': ('Risk-Caution', 'low'),
+    'Collaboration': ('Individual-Collaborative', 'high'),
+    'Independent Work': ('Independent-Guided', 'low'),
+    'Detail Orientation': ('Detail-BigPicture', 'low'),
+    'Big Picture Thinking': ('Detail-BigPicture', 'high'),
+    'Adaptability': ('ChangeTolerance', 'low'),
+    'Consistency': ('ChangeTolerance', 'high'),
+    'Proactivity': ('Proactive-Reactive', 'low'),
+    'Reactivity': ('Proactive-Reactive', 'high'),
+    'Empathy': ('Empathetic-Objective', 'low'),
+    'Task Focus': ('Empathetic-Objective', 'high'),
+    'Innovation': ('Innovative-Traditional', 'low'),
+    'Process Adherence': ('Innovative-Traditional', 'high'),
+    'Assertiveness': ('Assertive-Accommodating', 'low'),
+    'Diplomacy': ('Assertive-Accommodating', 'high'),
+    'Structured': ('Structure-Flexibility', 'low'),
+    'Flexible': ('Structure-Flexibility', 'high'),
+    'Results-Oriented': ('Process-Outcome', 'high'),
+    'Process-Oriented': ('Process-Outcome', 'low'),
+    'Competitive': ('Competitive-Cooperative', 'low'),
+    'Cooperative': ('Competitive-Cooperative', 'high')
+}
+
+_catalog = None
+_catalog_mtime = None
+_bundles = None
+_bundles_source = None
+_lock = threading.Lock()
+
+# Strings, comments, bare object keys, and trailing commas - in that priority order
+_TOKEN = re.compile(r'''
+    (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+  | (?P<comment>//[^\n]*|/\*.*?\*/)
+  | (?P<key>(?<=[{,\s])[A-Za-z_$][\w$]*(?=\s*:))
+  | (?P<trailing>,(?=\s*(?://[^\n]*\s*|/\*.*?\*/\s*)*[}\]]))
+''', re.VERBOSE | re.DOTALL)
+
+
+def _js_to_json(source):
+    """Convert a JS object literal (unquoted keys, comments, trailing commas) to JSON text"""
+    def replace(match):
+        if match.group('string'):
+            text = match.group('string')
+            if text[0] == "'":
+                text = json.dumps(json.loads('"' + text[1:-1].replace("\\'", "'").replace('"', '\\"') + '"'))
+            return text
+        if match.group('comment') or match.group('trailing'):
+            return ''
+        return json.dumps(match.group('key'))
+    return _TOKEN.sub(replace, source)
+
+
+def _extract_literal(source, name):
+    """Return the object literal assigned to `const <name> = {...};`"""
+    start = re.search(r'\bconst\s+' + name + r'\s*=\s*', source)
+    if start is None:
+        raise ValueError(f'{name} not found in {CATALOG_PATH}')
+    depth = 0
+    pos = start.end()
+    i = pos
+    while i < len(source):
+        ch = source[i]
+        if ch in '"\'':
+            i += 1
+            while source[i] != ch:
+                i += 2 if source[i] == '\\' else 1
+        elif source.startswith('//', i):
+            i = source.index('\n', i)
+        elif source.startswith('/*', i):
+            i = source.index('*/', i) + 1
+        elif ch in '{[':
+            depth += 1
+        elif ch in '}]':
+            depth -= 1
+            if depth == 0:
+                return source[pos:i + 1]
+        i += 1
+    raise ValueError(f'Unterminated literal for {name} in {CATALOG_PATH}')
+
+
+def parse_catalog(source):
+    """Parse traitData.js source into {'traits', 'traitInterpretations', 'patternInterpretations'}"""
+    return {name: json.loads(_js_to_json(_extract_literal(source, name))) for name in SECTIONS}
+
+
+def load_catalog():
+    """Return the parsed catalog, re-reading the file only when it changes"""
+    global _catalog, _catalog_mtime
+    mtime = os.path.getmtime(CATALOG_PATH)
+    if _catalog is None or mtime != _catalog_mtime:
+        with _lock:
+            if _catalog is None or mtime != _catalog_mtime:
+                with open(CATALOG_PATH, encoding='utf-8') as f:
+                    _catalog = parse_catalog(f.read())
+                _catalog_mtime = mtime
+    return _catalog
+
+
+def trait_keys():
+    """Trait keys in catalog order"""
+    return list(load_catalog()['traits'])
+
+
+def trait_payload(trait):
+    """The traitData entry the client sends for one trait"""
+    catalog = load_catalog()
+    return {
+        'questions': catalog['traits'][trait],
+        'interpretation': catalog['traitInterpretations'].get(trait, {}),
+        'patterns': catalog['patternInterpretations'].get(trait, {})
+    }
+
+
+def bundles():
+    """{trait: (fingerprint, JSON bytes)} of the per-trait client bundles, rebuilt when the catalog changes"""
+    global _bundles, _bundles_source
+    catalog = load_catalog()
+    if _bundles_source is not catalog:
+        built = {}
+        for trait in catalog['traits']:
+            body = json.dumps(trait_payload(trait), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            built[trait] = (hashlib.sha256(body).hexdigest()[:16], body)
+        _bundles, _bundles_source = built, catalog
+    return _bundles
+
+
+def bundle_url(trait, fingerprint):
+    return f'/api/catalog/{fingerprint}/{trait}.json'
+
+
+def manifest():
+    """Trait selection data: per trait its name, ends, question count and bundle URL.
+
+    'version' changes whenever any bundle does.
+    """
+    catalog = load_catalog()
+    built = bundles()
+    traits = []
+    for trait, questions in catalog['traits'].items():
+        interpretation = catalog['traitInterpretations'].get(trait, {})
+        fingerprint = built[trait][0]
+        traits.append({
+            'key': trait,
+            'name': interpretation.get('name', trait),
+            'lowEnd': interpretation.get('lowEnd'),
+            'highEnd': interpretation.get('highEnd'),
+            'questionCount': len(questions),
+            'bundle': bundle_url(trait, fingerprint)
+        })
+    version = hashlib.sha256(''.join(built[t['key']][0] for t in traits).encode('utf-8')).hexdigest()[:16]
+    return {'version': version, 'traits': traits}
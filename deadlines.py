@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""Per-request time budgets for the GPT-backed endpoints
+
+A view opens deadline(budget_ms) around its pipeline; everything running inside it, asyncio tasks
+included, sees the same deadline through a context variable:
+
+  call_timeout()   seconds the next LLM call may take, or DeadlineExceeded when less than
+                   MIN_LLM_CALL_MS is left, so the caller switches to its fallback at once
+  remaining_ms()   what is left, also handed to model routing as the call's latency budget
+  mark_partial()   records that a section of the response was replaced by its fallback;
+                   partial_sections() is what the response reports under "partial"
+
+Outside a deadline (batch scoring, benchmarks) calls are unbounded and nothing is recorded.
+Clients may ask for a shorter budget with the X-Request-Deadline-Ms header or a "deadlineMs"
+body field; requests are never given more than the configured budget.
+
+Settings: ANALYZE_DEADLINE_MS (default 60000), MATCH_DEADLINE_MS (default 60000),
+MIN_LLM_CALL_MS (default 2000), LLM_CALL_ATTEMPTS (default 3), LLM_RETRY_BACKOFF_MS (default 500).
+"""
+import contextlib
+import contextvars
+import os
+import time
+
+ANALYZE_DEADLINE_MS = int(os.environ.get('ANALYZE_DEADLINE_MS', 60000))
+MATCH_DEADLINE_MS = int(os.environ.get('MATCH_DEADLINE_MS', 60000))
+# An LLM call is not started with less than this left; its fallback is used instead
+MIN_LLM_CALL_MS = int(os.environ.get('MIN_LLM_CALL_MS', 2000))
+# Attempts an LLM call gets under a deadline, and the wait before the first retry (doubling after)
+LLM_CALL_ATTEMPTS = int(os.environ.get('LLM_CALL_ATTEMPTS', 3))
+LLM_RETRY_BACKOFF_MS = int(os.environ.get('LLM_RETRY_BACKOFF_MS', 500))
+DEADLINE_HEADER = 'X-Request-Deadline-Ms'
+
+
+class DeadlineExceeded(Exception):
+    """Not enough of the request's time budget is left for the next step"""
+
+
+class Deadline:
+    def __init__(self, budget_ms, expires_at=None):
+        self.budget_ms = budget_ms
+        self.expires_at = expires_at if expires_at is not None else time.monotonic() + budget_ms / 1000
+        self.partial = []
+
+    def remaining_ms(self):
+        return (self.expires_at - time.monotonic()) * 1000
+
+
+_current = contextvars.ContextVar('deadline', default=None)
+
+
+def budget_ms(configured_ms, requested=None):
+    """The budget for a request: the client's value when it is valid and shorter, else configured_ms"""
+    try:
+        requested = int(requested)
+    except (TypeError, ValueError):
+        return configured_ms
+    return min(max(requested, 0), configured_ms)
+
+
+@contextlib.contextmanager
+def deadline(budget_ms):
+    """Run the enclosed block under a deadline budget_ms from now; yields the Deadline"""
+    current = Deadline(budget_ms)
+    token = _current.set(current)
+    try:
+        yield current
+    finally:
+        _current.reset(token)
+
+
+@contextlib.contextmanager
+def scope():
+    """The current deadline again, with partial sections of its own (for one of several parallel
+    sub-requests, each reporting what it had to cut); no-op without a deadline
+    """
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    token = _current.set(Deadline(parent.budget_ms, parent.expires_at))
+    try:
+        yield _current.get()
+    finally:
+        _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+def remaining_ms():
+    """Milliseconds left before the current deadline, or None without one"""
+    current = _current.get()
+    return None if current is None else current.remaining_ms()
+
+
+def call_timeout():
+    """Timeout in seconds for the next LLM call (None without a deadline).
+
+    Raises DeadlineExceeded when less than MIN_LLM_CALL_MS is left.
+    """
+    left = remaining_ms()
+    if left is None:
+        return None
+    if left < MIN_LLM_CALL_MS:
+        raise DeadlineExceeded(f'{max(left, 0):.0f} ms left of the request deadline')
+    return left / 1000
+
+
+def out_of_time(error):
+    """Whether a failed step failed because the deadline ran out (rather than on an error)"""
+    if isinstance(error, DeadlineExceeded):
+        return True
+    left = remaining_ms()
+    return left is not None and left < MIN_LLM_CALL_MS
+
+
+def mark_partial(section, error):
+    """Record that `section` of the response holds its fallback because of `error`"""
+    current = _current.get()
+    if current is not None:
+        current.partial.append({'section': section, 'reason': 'deadline' if out_of_time(error) else 'error'})
+
+
+def partial_sections():
+    """[{'section', 'reason'}] for every section replaced by its fallback so far"""
+    current = _current.get()
+    return list(current.partial) if current is not None else []
+
+
+def bounded(client):
+    """`client` limited to a single attempt that ends by the deadline (unchanged without one).
+
+    The SDK would give every retry the whole timeout again; under a deadline callers retry
+    themselves with retry_delay(), each attempt bounded by what is left when it starts.
+    """
+    timeout = call_timeout()
+    if timeout is None:
+        return client
+    return client.with_options(timeout=timeout, max_retries=0)
+
+
+def retryable(error):
+    """Whether a failed LLM call is worth another attempt: rate limits, server errors and dropped
+    connections, but not timeouts, which have already spent the budget
+    """
+    status = getattr(error, 'status_code', None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    names = {cls.__name__ for cls in type(error).__mro__}
+    return 'APIConnectionError' in names and 'APITimeoutError' not in names
+
+
+def retry_delay(error, attempt):
+    """Seconds to wait before another attempt at an LLM call that failed on attempt number
+    `attempt`, or None when it should not be retried (no deadline: the SDK's own retries ran)
+    """
+    left = remaining_ms()
+    if left is None or attempt >= LLM_CALL_ATTEMPTS or not retryable(error):
+        return None
+    delay = LLM_RETRY_BACKOFF_MS * 2 ** (attempt - 1)
+    if left - delay < MIN_LLM_CALL_MS:
+        return None
+    return delay / 1000
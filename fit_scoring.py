@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Deterministic trait fit arithmetic on the 1-5 scale used by the matching analysis
+
+For a job trait measured by an assessment dimension (catalog.JOB_TRAIT_DIMENSIONS):
+
+  strength   = how far the candidate leans toward the job trait, 0..1 (from the 0..2 score)
+  closeness  = 1 - |strength - target| / largest possible gap, with target 0 / 0.5 / 1
+               for a required level of low / medium / high
+  raw        = 1 + 4 * closeness
+  confidence = (consistency + agreement) / 2
+  fit        = 3 + (raw - 3) * confidence   (uncertain evidence pulls toward neutral 3)
+
+Traits the candidate was not assessed on score NEUTRAL_SCORE. The overall fit weights the
+assessed average at 85% and the non-assessed average at 15%, rounded to the nearest 0.5.
+"""
+import catalog
+
+NEUTRAL_SCORE = 3.0
+ASSESSED_WEIGHT = 0.85
+LEVEL_TARGETS = {'low': 0.0, 'medium': 0.5, 'high': 1.0}
+
+
+def level_target(level):
+    return LEVEL_TARGETS.get(str(level).lower(), 0.5)
+
+
+def strength(score, pole):
+    """Lean toward the job trait (0..1) from a dimension score (0 = low end, 2 = high end)"""
+    return score / 2 if pole == 'high' else 1 - score / 2
+
+
+def trait_fit(score, consistency, agreement, pole, level):
+    """Fit of one assessed job trait on the 1-5 scale"""
+    target = level_target(level)
+    closeness = 1 - abs(strength(score, pole) - target) / max(target, 1 - target)
+    raw = 1 + 4 * closeness
+    confidence = (consistency + agreement) / 2
+    return NEUTRAL_SCORE + (raw - NEUTRAL_SCORE) * confidence
+
+
+def round_half(value):
+    """Round to the nearest 0.5 (halves round up)"""
+    return int(value * 2 + 0.5) / 2
+
+
+def overall_fit(assessed_scores, non_assessed_count):
+    """Unrounded 85/15 weighted overall fit from assessed trait scores and the number of non-assessed traits"""
+    if not assessed_scores:
+        return NEUTRAL_SCORE
+    assessed_avg = sum(assessed_scores) / len(assessed_scores)
+    if not non_assessed_count:
+        return assessed_avg
+    return ASSESSED_WEIGHT * assessed_avg + (1 - ASSESSED_WEIGHT) * NEUTRAL_SCORE
+
+
+def fit_label(score):
+    """Label for a rounded overall fit score"""
+    if score >= 4.5:
+        return 'Excellent Fit'
+    if score >= 3.5:
+        return 'Good Fit'
+    if score >= 3.0:
+        return 'Adequate'
+    if score >= 2.0:
+        return 'Below Average'
+    return 'Poor Fit'
+
+
+def profile_dimensions(job_requirements):
+    """[(job trait, dimension, pole, level)] for the required traits an assessment can measure"""
+    mapped = []
+    for name, requirement in job_requirements.items():
+        dimension = catalog.JOB_TRAIT_DIMENSIONS.get(name)
+        if dimension:
+            mapped.append((name, dimension[0], dimension[1], requirement.get('level', 'medium')))
+    return mapped
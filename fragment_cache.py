@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Bounded LRU cache of rendered HTML fragments
+
+A fragment is cached under a key made of everything it is rendered from, so a hit is always
+byte-identical to a fresh render. Memory is bounded by the characters held (fragments plus
+the text in their keys); the least recently used fragments are evicted first.
+"""
+import threading
+from collections import OrderedDict
+
+
+def key_chars(key):
+    """Characters of text referenced by a (possibly nested) tuple key"""
+    total = 0
+    for part in key:
+        if isinstance(part, str):
+            total += len(part)
+        elif isinstance(part, tuple):
+            total += key_chars(part)
+    return total
+
+
+class FragmentCache:
+    """Thread-safe LRU of rendered fragments holding at most max_chars characters"""
+
+    def __init__(self, name, max_chars):
+        self.name = name
+        self.max_chars = max_chars
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._chars = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, key, html):
+        size = len(html) + key_chars(key)
+        if size > self.max_chars:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._chars -= old[1]
+            self._entries[key] = (html, size)
+            self._chars += size
+            while self._chars > self.max_chars:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._chars -= evicted
+                self._evictions += 1
+
+    def get_or_render(self, key, render):
+        """Cached fragment for key, rendering and storing it on a miss"""
+        html = self.get(key)
+        if html is None:
+            html = render()
+            self.put(key, html)
+        return html
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._chars = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'name': self.name,
+                'entries': len(self._entries),
+                'chars': self._chars,
+                'maxChars': self.max_chars,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hitRate': self._hits / lookups if lookups else None,
+                'evictions': self._evictions
+            }
@@ -0,0 +1,21 @@
+"""Gunicorn settings: `gunicorn app:app` picks this file up automatically"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+# Threaded workers let identical in-flight requests coalesce and keep LLM waits off the accept loop
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+
+# Import the app (and its heavy dependencies) once in the master so workers share those pages.
+# Per-process resources such as the OpenAI client and SQLite connections are created after fork.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+if preload_app:
+    os.environ.setdefault('PRELOAD_HEAVY_IMPORTS', '1')
+
+
+def post_worker_init(worker):
+    # Every worker warms itself up (fonts, catalog, LLM connection); /readyz reports when it is hot
+    import app
+    app.start_warm_up()
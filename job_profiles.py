@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Stored job profiles that match requests refer to by id
+
+A profile is a named set of trait requirements, the same shape /api/match-candidate takes as
+job_requirements: {"name": ..., "requirements": {trait: {"level": "low|medium|high",
+"description": ...}}}. Requests that pass job_profile_id instead of the requirements send a
+few bytes instead of the whole profile, and always hit the same compiled prompt prefix.
+"""
+import json
+import time
+import uuid
+
+import storage
+
+DB_NAME = 'job_profiles'
+
+LEVELS = ('low', 'medium', 'high')
+MAX_NAME_CHARS = 200
+MAX_DESCRIPTION_CHARS = 2000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS job_profiles (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    requirements TEXT NOT NULL
+);
+"""
+
+
+def _connect():
+    return storage.connect(DB_NAME, SCHEMA)
+
+
+def new_profile_id():
+    return uuid.uuid4().hex
+
+
+def normalize_requirements(requirements):
+    """Validated requirements as {trait: {'level', 'description'}}; raises ValueError"""
+    if not isinstance(requirements, dict) or not requirements:
+        raise ValueError('requirements must be a non-empty object of trait: {level, description}')
+    normalized = {}
+    for trait, requirement in requirements.items():
+        if not isinstance(requirement, dict) or requirement.get('level') not in LEVELS:
+            raise ValueError(f'{trait}: level must be one of {", ".join(LEVELS)}')
+        description = requirement.get('description') or ''
+        if not isinstance(description, str) or len(description) > MAX_DESCRIPTION_CHARS:
+            raise ValueError(f'{trait}: description must be text of at most {MAX_DESCRIPTION_CHARS} characters')
+        normalized[trait] = {'level': requirement['level'], 'description': description}
+    return normalized
+
+
+def normalize_name(name):
+    if not isinstance(name, str) or not name.strip() or len(name) > MAX_NAME_CHARS:
+        raise ValueError(f'name must be non-empty text of at most {MAX_NAME_CHARS} characters')
+    return name.strip()
+
+
+def _profile(row):
+    return {
+        'id': row['id'],
+        'name': row['name'],
+        'requirements': json.loads(row['requirements']),
+        'createdAt': row['created_at'],
+        'updatedAt': row['updated_at']
+    }
+
+
+def save_profile(profile_id, name, requirements):
+    """Create or replace a profile (already normalized); returns the stored profile"""
+    now = time.time()
+    conn = _connect()
+    with storage.transaction(conn):
+        row = conn.execute('SELECT created_at FROM job_profiles WHERE id = ?', (profile_id,)).fetchone()
+        conn.execute(
+            'INSERT OR REPLACE INTO job_profiles (id, name, created_at, updated_at, requirements) VALUES (?, ?, ?, ?, ?)',
+            (profile_id, name, row['created_at'] if row else now, now, json.dumps(requirements))
+        )
+    return get_profile(profile_id)
+
+
+def get_profile(profile_id):
+    """The stored profile, or None"""
+    row = _connect().execute('SELECT * FROM job_profiles WHERE id = ?', (profile_id,)).fetchone()
+    return _profile(row) if row else None
+
+
+def list_profiles():
+    """Every profile without its requirements, most recently updated first"""
+    rows = _connect().execute('SELECT * FROM job_profiles ORDER BY updated_at DESC').fetchall()
+    profiles = []
+    for row in rows:
+        profile = _profile(row)
+        profile['traits'] = list(profile.pop('requirements'))
+        profiles.append(profile)
+    return profiles
+
+
+def delete_profile(profile_id):
+    """Delete a profile; False if there was none"""
+    return _connect().execute('DELETE FROM job_profiles WHERE id = ?', (profile_id,)).rowcount > 0
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Incremental parser for a JSON object arriving in chunks (streamed LLM output)
+
+Feed text as it arrives; feed() returns the events completed by that chunk:
+
+  ('field', name, value)          a top-level field whose value is complete
+  ('entry', field, name, value)   an entry of a top-level object listed in `nested`,
+                                  e.g. one trait in "trait_scores", before the whole object ends
+
+Anything before the first '{' (such as a ```json fence) and after the closing '}' is ignored.
+The complete text is still parsed normally afterwards; events are an early preview.
+"""
+import json
+
+
+class _Frame:
+    __slots__ = ('kind', 'expect', 'key', 'value_start')
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.expect = 'key' if kind == '{' else 'value'
+        self.key = None
+        self.value_start = None
+
+
+class IncrementalJSONParser:
+    def __init__(self, nested=()):
+        self.nested = set(nested)
+        self.done = False
+        self._text = ''
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+
+    def feed(self, chunk):
+        events = []
+        if self.done or not chunk:
+            return events
+        self._text += chunk
+        text = self._text
+        stack = self._stack
+        i = self._pos
+        while i < len(text) and not self.done:
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._string_closed(i, events)
+            elif not stack:
+                if ch == '{':
+                    stack.append(_Frame('{'))
+            elif ch == '"':
+                self._in_string = True
+                self._string_start = i
+                self._value_begins(i)
+            elif ch in '{[':
+                self._value_begins(i)
+                stack.append(_Frame(ch))
+            elif ch in '}]':
+                self._scalar_ends(i, events)
+                stack.pop()
+                if stack:
+                    self._value_complete(i + 1, events)
+                else:
+                    self.done = True
+            elif ch == ',':
+                self._scalar_ends(i, events)
+                stack[-1].expect = 'key' if stack[-1].kind == '{' else 'value'
+            elif ch == ':':
+                stack[-1].expect = 'value'
+            elif not ch.isspace():
+                self._value_begins(i)
+            i += 1
+        self._pos = i
+        return events
+
+    def _value_begins(self, i):
+        top = self._stack[-1]
+        if top.expect == 'value' and top.value_start is None:
+            top.value_start = i
+
+    def _string_closed(self, i, events):
+        top = self._stack[-1]
+        if top.kind == '{' and top.expect == 'key':
+            top.key = json.loads(self._text[self._string_start:i + 1])
+            top.expect = 'colon'
+        else:
+            self._value_complete(i + 1, events)
+
+    def _scalar_ends(self, i, events):
+        top = self._stack[-1]
+        if top.expect == 'value' and top.value_start is not None:
+            self._value_complete(i, events)
+
+    def _value_complete(self, end, events):
+        top = self._stack[-1]
+        if top.value_start is None:
+            return
+        raw = self._text[top.value_start:end]
+        top.value_start = None
+        top.expect = 'after'
+        if top.kind != '{':
+            return
+        depth = len(self._stack)
+        if depth == 1:
+            events.append(('field', top.key, json.loads(raw)))
+        elif depth == 2 and self._stack[0].key in self.nested:
+            events.append(('entry', self._stack[0].key, top.key, json.loads(raw)))
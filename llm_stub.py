@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""Stand-in for the OpenAI client used in load tests and local runs
+
+Enable with LLM_BACKEND=stub. Completions sleep for STUB_LLM_LATENCY_MS (plus up to
+STUB_LLM_JITTER_MS of random jitter) and return well-formed JSON shaped like the real
+responses, so the whole pipeline - parsing, HTML, storage, PDFs - runs as in production.
+With stream=True the same content arrives as delta chunks spread over the latency. A call
+given a `timeout` shorter than its latency raises TimeoutError once the timeout has passed.
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import time
+import types
+
+LATENCY_MS = float(os.environ.get('STUB_LLM_LATENCY_MS', 800))
+JITTER_MS = float(os.environ.get('STUB_LLM_JITTER_MS', 400))
+# Share of the latency spent before the first streamed chunk
+FIRST_CHUNK_SHARE = 0.25
+CHUNK_CHARS = 48
+
+
+def enabled():
+    return os.environ.get('LLM_BACKEND', 'openai') == 'stub'
+
+
+def _delay():
+    return (LATENCY_MS + random.uniform(0, JITTER_MS)) / 1000
+
+
+def _overall():
+    return {
+        'personality_type_title': 'Adaptive Strategist',
+        'profile_summary': 'Stub profile summary. ' * 12,
+        'decision_style': 'Stub decision style. ' * 10,
+        'awareness_adaptability': 'Stub awareness and adaptability. ' * 8,
+        'patterns_themes': 'Stub patterns and themes. ' * 8,
+        'professional_implications': 'Stub professional implications. ' * 8,
+        'development_insights': 'Stub development insights. ' * 8
+    }
+
+
+def _trait():
+    return {
+        'behavioral_profile': 'Stub behavioral profile. ' * 10,
+        'self_awareness': 'Stub self-awareness analysis. ' * 6,
+        'adaptability': 'Stub adaptability analysis. ' * 6,
+        'pattern_summary': 'Stub pattern summary. ' * 6
+    }
+
+
+def _matching(prompt):
+    # Job requirements appear in the prompt as "**<Trait>** (Required: <LEVEL>)"
+    traits = dict(re.findall(r'\*\*([^*]+)\*\* \(Required: (\w+)\)', prompt))
+    return {
+        'overall_fit_score': 3.6,
+        'overall_fit_label': 'Good Fit',
+        'trait_scores': {
+            name: {'score': 3.5, 'required_level': level.lower(), 'analysis': 'Stub trait fit analysis. ' * 5}
+            for name, level in traits.items()
+        },
+        'executive_summary': 'Stub executive summary. ' * 10 + '\n\n' + 'Stub summary detail. ' * 10,
+        'hiring_recommendation': 'Proceed to interview (stub).',
+        'key_strengths': ['Stub strength one', 'Stub strength two', 'Stub strength three'],
+        'potential_concerns': ['Stub concern one', 'Stub concern two'],
+        'specific_evidence': ['Stub evidence one', 'Stub evidence two'],
+        'risk_assessment': 'Stub risk assessment. ' * 8,
+        'development_needs': ['Stub development need'],
+        'onboarding_recommendations': ['Stub onboarding recommendation']
+    }
+
+
+def _respond(kwargs):
+    system = kwargs['messages'][0]['content']
+    prompt = kwargs['messages'][-1]['content']
+    if 'HR analyst' in system:
+        body = _matching(prompt)
+    elif 'personality type title' in system:
+        body = _overall()
+    else:
+        body = _trait()
+    content = json.dumps(body)
+    message = types.SimpleNamespace(role='assistant', content=content)
+    usage = types.SimpleNamespace(prompt_tokens=len(prompt) // 4, completion_tokens=len(content) // 4)
+    return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message, finish_reason='stop')], usage=usage)
+
+
+def _chunks(kwargs):
+    """The response content as streamed chunks (choices[0].delta.content), last one with finish_reason"""
+    content = _respond(kwargs).choices[0].message.content
+    pieces = [content[i:i + CHUNK_CHARS] for i in range(0, len(content), CHUNK_CHARS)]
+    chunks = []
+    for i, piece in enumerate(pieces):
+        delta = types.SimpleNamespace(role='assistant' if i == 0 else None, content=piece)
+        finish_reason = 'stop' if i == len(pieces) - 1 else None
+        chunks.append(types.SimpleNamespace(choices=[types.SimpleNamespace(delta=delta, finish_reason=finish_reason)]))
+    return chunks
+
+
+def _stream_pauses(count):
+    """Sleep before the first chunk and between chunks, adding up to one stub latency"""
+    total = _delay()
+    gap = total * (1 - FIRST_CHUNK_SHARE) / max(1, count - 1)
+    return [total * FIRST_CHUNK_SHARE] + [gap] * (count - 1)
+
+
+def _stream(kwargs, timeout=None):
+    chunks = _chunks(kwargs)
+    waited = 0
+    for pause, chunk in zip(_stream_pauses(len(chunks)), chunks):
+        if timeout is not None and waited + pause > timeout:
+            time.sleep(max(timeout - waited, 0))
+            raise TimeoutError('Stub completion timed out')
+        time.sleep(pause)
+        waited += pause
+        yield chunk
+
+
+async def _stream_async(kwargs, timeout=None):
+    chunks = _chunks(kwargs)
+    waited = 0
+    for pause, chunk in zip(_stream_pauses(len(chunks)), chunks):
+        if timeout is not None and waited + pause > timeout:
+            await asyncio.sleep(max(timeout - waited, 0))
+            raise TimeoutError('Stub completion timed out')
+        await asyncio.sleep(pause)
+        waited += pause
+        yield chunk
+
+
+class _Completions:
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+
+    def create(self, stream=False, timeout=None, **kwargs):
+        timeout = timeout if timeout is not None else self.timeout
+        if stream:
+            return _stream(kwargs, timeout)
+        delay = _delay()
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError('Stub completion timed out')
+        time.sleep(delay)
+        return _respond(kwargs)
+
+
+class _AsyncCompletions(_Completions):
+    async def create(self, stream=False, timeout=None, **kwargs):
+        timeout = timeout if timeout is not None else self.timeout
+        if stream:
+            return _stream_async(kwargs, timeout)
+        delay = _delay()
+        if timeout is not None and delay > timeout:
+            await asyncio.sleep(timeout)
+            raise TimeoutError('Stub completion timed out')
+        await asyncio.sleep(delay)
+        return _respond(kwargs)
+
+
+class StubClient:
+    """Drop-in for openai.OpenAI (chat.completions.create and with_options only)"""
+    completions_class = _Completions
+
+    def __init__(self, timeout=None):
+        self.chat = types.SimpleNamespace(completions=self.completions_class(timeout))
+
+    def with_options(self, timeout=None, **options):
+        # The stub never retries; only the timeout carries over
+        return type(self)(timeout)
+
+
+class AsyncStubClient(StubClient):
+    """Drop-in for openai.AsyncOpenAI (chat.completions.create and with_options only)"""
+    completions_class = _AsyncCompletions
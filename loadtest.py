@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""Load-test harness driving scripted user journeys against a running server
+
+Each virtual user repeats the full journey over the real trait catalog:
+
+  1. POST /api/analyze                  random traits and answers
+  2. POST /api/download                 personality report PDF
+  3. POST /api/match-candidate          that PDF against a random job profile
+  4. POST /api/download-match-report    match report PDF
+
+Start the server with the stub LLM so results measure this service, not OpenAI:
+
+  LLM_BACKEND=stub STUB_LLM_LATENCY_MS=800 RATE_LIMIT_ENABLED=0 gunicorn app:app
+  python loadtest.py --url http://127.0.0.1:5000 --concurrency 8 --journeys 40
+
+Prints throughput and p50/p95/p99 latency per endpoint (--json also writes them to a file).
+"""
+import argparse
+import json
+import math
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import defaultdict
+
+import catalog
+
+ENDPOINTS = ['/api/analyze', '/api/download', '/api/match-candidate', '/api/download-match-report']
+
+
+class Recorder:
+    """Thread-safe latency and status samples per endpoint"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.journeys = 0
+        self.failed_journeys = 0
+
+    def record(self, endpoint, status, elapsed):
+        with self.lock:
+            self.statuses[endpoint][status] += 1
+            if 200 <= status < 300:
+                self.samples[endpoint].append(elapsed)
+
+    def journey_done(self, ok):
+        with self.lock:
+            self.journeys += 1
+            if not ok:
+                self.failed_journeys += 1
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _request(recorder, base_url, endpoint, body, content_type, timeout):
+    req = urllib.request.Request(base_url + endpoint, data=body, method='POST', headers={'Content-Type': content_type})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            payload = resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        payload = e.read()
+        status = e.code
+    except Exception as e:
+        print(f"{endpoint}: {str(e)}", file=sys.stderr)
+        payload = b''
+        status = 0
+    recorder.record(endpoint, status, time.perf_counter() - start)
+    return status, payload
+
+
+def _post_json(recorder, base_url, endpoint, data, timeout):
+    return _request(recorder, base_url, endpoint, json.dumps(data).encode('utf-8'), 'application/json', timeout)
+
+
+def _post_multipart(recorder, base_url, endpoint, fields, files, timeout):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode('utf-8'))
+    for name, (filename, content) in files.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                     f'Content-Type: application/pdf\r\n\r\n'.encode('utf-8') + content + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode('utf-8'))
+    return _request(recorder, base_url, endpoint, b''.join(parts), f'multipart/form-data; boundary={boundary}', timeout)
+
+
+def build_assessment(rng, trait_count):
+    """Random selection and answers over the real catalog, shaped like the client's submission"""
+    selected = rng.sample(catalog.trait_keys(), trait_count)
+    trait_data = {trait: catalog.trait_payload(trait) for trait in selected}
+    answers = {
+        trait: {q['id']: rng.choice(q['options'])['value'] for q in trait_data[trait]['questions']}
+        for trait in selected
+    }
+    return {'selectedTraits': selected, 'answers': answers, 'traitData': trait_data}
+
+
+def build_job_profile(rng, trait_count):
+    names = rng.sample(list(catalog.JOB_TRAITS), trait_count)
+    return {
+        name: {'level': rng.choice(['low', 'medium', 'high']), 'name': name, 'description': catalog.JOB_TRAITS[name]}
+        for name in names
+    }
+
+
+def run_journey(recorder, args, rng):
+    """One user journey; returns True when every step succeeded"""
+    assessment = build_assessment(rng, args.traits)
+    status, body = _post_json(recorder, args.url, '/api/analyze', assessment, args.timeout)
+    if status != 200:
+        return False
+    analysis = json.loads(body)
+
+    status, report_pdf = _post_json(recorder, args.url, '/api/download', {
+        'selectedTraits': assessment['selectedTraits'],
+        'answers': assessment['answers'],
+        'results': analysis.get('results', {}),
+        'overallAssessment': analysis.get('overallAssessment', {}),
+        'traitAnalyses': analysis.get('traitAnalyses', {}),
+        'traitData': assessment['traitData']
+    }, args.timeout)
+    if status != 200:
+        return False
+
+    job_profile = build_job_profile(rng, args.job_traits)
+    status, body = _post_multipart(recorder, args.url, '/api/match-candidate',
+                                   {'job_requirements': json.dumps(job_profile)},
+                                   {'candidate_report': ('candidate.pdf', report_pdf)}, args.timeout)
+    if status != 200:
+        return False
+
+    status, _ = _post_json(recorder, args.url, '/api/download-match-report', {
+        'matchingAnalysis': json.loads(body),
+        'jobRequirements': job_profile,
+        'candidateName': 'Load Test',
+        'jobTitle': 'Benchmark Role'
+    }, args.timeout)
+    return status == 200
+
+
+def summarize(recorder, wall_time, concurrency):
+    """Per-endpoint throughput and latency percentiles (milliseconds)"""
+    endpoints = {}
+    for endpoint in ENDPOINTS:
+        samples = sorted(recorder.samples.get(endpoint, []))
+        statuses = dict(recorder.statuses.get(endpoint, {}))
+        endpoints[endpoint] = {
+            'requests': sum(statuses.values()),
+            'ok': len(samples),
+            'statuses': {str(k): v for k, v in sorted(statuses.items())},
+            'throughput_rps': len(samples) / wall_time if wall_time else 0,
+            'p50_ms': percentile(samples, 50) * 1000 if samples else None,
+            'p95_ms': percentile(samples, 95) * 1000 if samples else None,
+            'p99_ms': percentile(samples, 99) * 1000 if samples else None,
+            'max_ms': samples[-1] * 1000 if samples else None
+        }
+    return {
+        'concurrency': concurrency,
+        'wall_time_s': wall_time,
+        'journeys': recorder.journeys,
+        'failed_journeys': recorder.failed_journeys,
+        'journeys_per_s': recorder.journeys / wall_time if wall_time else 0,
+        'endpoints': endpoints
+    }
+
+
+def print_summary(summary):
+    def ms(value):
+        return f"{value:9.1f}" if value is not None else f"{'-':>9}"
+
+    print(f"\nconcurrency {summary['concurrency']}: {summary['journeys']} journeys "
+          f"({summary['failed_journeys']} failed) in {summary['wall_time_s']:.1f}s, "
+          f"{summary['journeys_per_s']:.2f} journeys/s")
+    print(f"  {'endpoint':<30} {'ok/req':>9} {'req/s':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}  statuses")
+    for endpoint, stats in summary['endpoints'].items():
+        print(f"  {endpoint:<30} {stats['ok']:>4}/{stats['requests']:<4} {stats['throughput_rps']:7.2f} "
+              f"{ms(stats['p50_ms'])} {ms(stats['p95_ms'])} {ms(stats['p99_ms'])} {ms(stats['max_ms'])}  {stats['statuses']}")
+
+
+def run(args, concurrency):
+    recorder = Recorder()
+    deadline = time.monotonic() + args.duration if args.duration else None
+    remaining = [args.journeys]
+    remaining_lock = threading.Lock()
+
+    def take():
+        if deadline is not None:
+            return time.monotonic() < deadline
+        with remaining_lock:
+            if remaining[0] <= 0:
+                return False
+            remaining[0] -= 1
+            return True
+
+    def user(index):
+        rng = random.Random(args.seed * 1000 + index)
+        while take():
+            try:
+                ok = run_journey(recorder, args, rng)
+            except Exception as e:
+                print(f"Journey failed: {str(e)}", file=sys.stderr)
+                ok = False
+            recorder.journey_done(ok)
+
+    threads = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(recorder, time.perf_counter() - start, concurrency)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Drive scripted assessment/matching journeys against a server')
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='server base URL')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[4],
+                        help='concurrent virtual users; several values run one stage each')
+    parser.add_argument('--journeys', type=int, default=20, help='journeys per stage (ignored with --duration)')
+    parser.add_argument('--duration', type=float, default=None, help='seconds per stage instead of a journey count')
+    parser.add_argument('--traits', type=int, default=3, help='traits selected per assessment')
+    parser.add_argument('--job-traits', type=int, default=6, help='traits in each job profile')
+    parser.add_argument('--timeout', type=float, default=180, help='per-request timeout in seconds')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', dest='json_path', help='also write the summaries to this file')
+    args = parser.parse_args(argv)
+    args.url = args.url.rstrip('/')
+
+    summaries = []
+    for concurrency in args.concurrency:
+        summary = run(args, concurrency)
+        print_summary(summary)
+        summaries.append(summary)
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(summaries, f, indent=2)
+    return 0 if all(s['failed_journeys'] == 0 for s in summaries) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
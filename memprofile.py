@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""Opt-in allocation profiling of the report pipeline stages with tracemalloc
+
+With MEMORY_PROFILING=1 the process traces allocations from start-up, and every pipeline stage
+(scoring, prompt, html, pdf_build, pdf_extract) records per call:
+
+  peak      highest traced memory during the stage, above what was allocated when it started
+  retained  traced memory still allocated when it finished, relative to its start
+
+top_allocators() lists the source lines holding the most memory now, or the ones that grew
+most since start-up (growth=True), which is what attributes a slowly growing worker RSS.
+
+tracemalloc's peak is per process, so with several threads per worker (gunicorn gthread) a
+stage's peak includes whatever other requests allocated meanwhile; profile with
+GUNICORN_THREADS=1 for exact per-stage figures. Tracing slows allocation-heavy code down
+noticeably, so leave it off in normal operation.
+
+Settings: MEMORY_PROFILING (default 0), MEMORY_PROFILING_FRAMES (traceback depth, default 10).
+"""
+import contextlib
+import contextvars
+import functools
+import os
+import threading
+import time
+import tracemalloc
+
+MEMORY_PROFILING = os.environ.get('MEMORY_PROFILING', '0') == '1'
+MEMORY_PROFILING_FRAMES = int(os.environ.get('MEMORY_PROFILING_FRAMES', 10))
+
+STAGES = ('scoring', 'prompt', 'html', 'pdf_build', 'pdf_extract')
+
+_stack = contextvars.ContextVar('memory_stages', default=())
+_lock = threading.Lock()
+_stats = {}
+_baseline = None
+_started_at = None
+
+
+def start():
+    """Start tracing (once per process) and remember the start-up snapshot for growth reports"""
+    global _baseline, _started_at
+    if not MEMORY_PROFILING or tracemalloc.is_tracing():
+        return
+    tracemalloc.start(MEMORY_PROFILING_FRAMES)
+    _baseline = tracemalloc.take_snapshot()
+    _started_at = time.time()
+    print(f"Memory profiling enabled ({MEMORY_PROFILING_FRAMES} frames)")
+
+
+class _Frame:
+    def __init__(self, start_current):
+        self.start_current = start_current
+        self.child_peak = 0
+
+
+def _record(name, peak, retained):
+    with _lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = {'calls': 0, 'peakMax': 0, 'peakTotal': 0, 'retainedTotal': 0, 'lastPeak': 0, 'lastRetained': 0}
+        stats['calls'] += 1
+        stats['peakMax'] = max(stats['peakMax'], peak)
+        stats['peakTotal'] += peak
+        stats['retainedTotal'] += retained
+        stats['lastPeak'] = peak
+        stats['lastRetained'] = retained
+
+
+@contextlib.contextmanager
+def stage(name):
+    """Record peak and retained allocations of a pipeline stage (no-op unless profiling)"""
+    if not MEMORY_PROFILING or not tracemalloc.is_tracing():
+        yield
+        return
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    frame = _Frame(current)
+    token = _stack.set(_stack.get() + (frame,))
+    try:
+        yield
+    finally:
+        _stack.reset(token)
+        current, peak = tracemalloc.get_traced_memory()
+        # A nested stage reset the peak; its own peak still counts toward ours
+        peak = max(peak, frame.child_peak)
+        parents = _stack.get()
+        if parents:
+            parents[-1].child_peak = max(parents[-1].child_peak, peak)
+        _record(name, peak - frame.start_current, current - frame.start_current)
+
+
+def profiled(name):
+    """Decorator form of stage()"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def stage_stats():
+    """Per-stage call count and peak/retained bytes (max, mean, last) since start-up"""
+    with _lock:
+        snapshot = {name: dict(stats) for name, stats in _stats.items()}
+    report = {}
+    for name, stats in snapshot.items():
+        calls = stats['calls']
+        report[name] = {
+            'calls': calls,
+            'peakMaxBytes': stats['peakMax'],
+            'peakMeanBytes': stats['peakTotal'] // calls,
+            'lastPeakBytes': stats['lastPeak'],
+            'retainedMeanBytes': stats['retainedTotal'] // calls,
+            'retainedTotalBytes': stats['retainedTotal'],
+            'lastRetainedBytes': stats['lastRetained']
+        }
+    return report
+
+
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>')
+)
+
+
+def top_allocators(limit=25, group_by='lineno', growth=False):
+    """Source locations holding the most traced memory, or (growth=True) that grew most since start-up"""
+    snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+    if growth and _baseline is not None:
+        stats = snapshot.compare_to(_baseline.filter_traces(_IGNORED), group_by)
+        stats.sort(key=lambda s: s.size_diff, reverse=True)
+    else:
+        stats = snapshot.statistics(group_by)
+    top = []
+    for stat in stats[:limit]:
+        entry = {
+            'location': [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+            'sizeBytes': stat.size,
+            'count': stat.count
+        }
+        if growth:
+            entry['sizeDiffBytes'] = stat.size_diff
+            entry['countDiff'] = stat.count_diff
+        top.append(entry)
+    return top
+
+
+def report(limit=25, group_by='lineno', growth=False):
+    """Everything the debug endpoint shows"""
+    if not tracemalloc.is_tracing():
+        return {'enabled': False}
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        'enabled': True,
+        'pid': os.getpid(),
+        'since': _started_at,
+        'tracedBytes': current,
+        'tracedPeakBytes': peak,
+        'tracemallocOverheadBytes': tracemalloc.get_tracemalloc_memory(),
+        'stages': stage_stats(),
+        'top': top_allocators(limit, group_by, growth)
+    }
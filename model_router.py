@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""Per-task model routing for the GPT calls (overall, trait, matching)
+
+route(task, prompt) picks the model and max_tokens for one call:
+
+  1. the task's configured model, or its `large_model` when the prompt is over `large_prompt_tokens`
+  2. the task's `fallback` model instead when the chosen model's recent error rate or p95
+     latency crosses the thresholds below, or its p95 exceeds the call's latency budget
+  3. max_tokens trimmed so prompt plus completion fit the model's context window
+
+Every decision and every call outcome is recorded in a local SQLite database (shared by all
+gunicorn workers), which is also where the recent latency/error figures come from.
+
+Configure with LLM_ROUTES, JSON merged over DEFAULT_ROUTES, e.g.
+  LLM_ROUTES='{"matching": {"model": "gpt-4o", "fallback": "gpt-4o-mini", "budget_ms": 45000}}'
+"""
+import itertools
+import json
+import math
+import os
+import time
+
+import storage
+
+DB_NAME = 'routing'
+
+DEFAULT_ROUTES = {
+    'overall': {'model': 'gpt-4o-mini', 'max_tokens': 2500},
+    'trait': {'model': 'gpt-4o-mini', 'max_tokens': 1200},
+    'matching': {'model': 'gpt-4o-mini', 'max_tokens': 5000}
+}
+
+# Context windows in tokens; unknown models get DEFAULT_CONTEXT_TOKENS
+MODEL_CONTEXT_TOKENS = {
+    'gpt-4o-mini': 128000,
+    'gpt-4o': 128000,
+    'gpt-4.1': 1047576,
+    'gpt-4.1-mini': 1047576,
+    'gpt-4.1-nano': 1047576,
+    'gpt-3.5-turbo': 16385
+}
+DEFAULT_CONTEXT_TOKENS = 128000
+MIN_COMPLETION_TOKENS = 256
+
+# A model is degraded when, over its last LLM_HEALTH_WINDOW calls younger than
+# LLM_HEALTH_MAX_AGE seconds (and at least LLM_HEALTH_MIN_SAMPLES of them), its error rate
+# or p95 latency is above these thresholds. Old samples ageing out lets a primary recover.
+LLM_FALLBACK_ERROR_RATE = float(os.environ.get('LLM_FALLBACK_ERROR_RATE', 0.2))
+LLM_FALLBACK_P95_MS = float(os.environ.get('LLM_FALLBACK_P95_MS', 30000))
+LLM_HEALTH_WINDOW = int(os.environ.get('LLM_HEALTH_WINDOW', 50))
+LLM_HEALTH_MAX_AGE = int(os.environ.get('LLM_HEALTH_MAX_AGE', 300))
+LLM_HEALTH_MIN_SAMPLES = int(os.environ.get('LLM_HEALTH_MIN_SAMPLES', 5))
+# Decisions and outcomes older than this are pruned (checked every PRUNE_EVERY calls per process)
+ROUTING_RETENTION = int(os.environ.get('ROUTING_RETENTION', 7 * 24 * 3600))
+PRUNE_EVERY = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS decisions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    task TEXT NOT NULL,
+    model TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    max_tokens INTEGER NOT NULL,
+    budget_ms REAL
+);
+CREATE INDEX IF NOT EXISTS decisions_ts ON decisions (ts);
+CREATE TABLE IF NOT EXISTS outcomes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    model TEXT NOT NULL,
+    latency_ms REAL NOT NULL,
+    ok INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outcomes_model ON outcomes (model, ts);
+"""
+
+_routes = None
+_observed = itertools.count(1)
+
+
+def _connect():
+    return storage.connect(DB_NAME, SCHEMA)
+
+
+def routes():
+    """DEFAULT_ROUTES with the LLM_ROUTES overrides applied"""
+    global _routes
+    if _routes is None:
+        merged = {task: dict(cfg) for task, cfg in DEFAULT_ROUTES.items()}
+        overrides = os.environ.get('LLM_ROUTES')
+        if overrides:
+            for task, cfg in json.loads(overrides).items():
+                merged.setdefault(task, {}).update(cfg)
+        _routes = merged
+    return _routes
+
+
+def max_tokens(task):
+    """Configured completion budget of a task (for cost estimates)"""
+    return routes()[task]['max_tokens']
+
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token)"""
+    return len(text) // 4
+
+
+def _percentile(sorted_values, pct):
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def model_health(model, now=None):
+    """Recent call count, error rate and p95 latency of a model, and whether it is degraded"""
+    now = now or time.time()
+    rows = _connect().execute(
+        'SELECT latency_ms, ok FROM outcomes WHERE model = ? AND ts > ? ORDER BY ts DESC LIMIT ?',
+        (model, now - LLM_HEALTH_MAX_AGE, LLM_HEALTH_WINDOW)
+    ).fetchall()
+    latencies = sorted(row['latency_ms'] for row in rows if row['ok'])
+    errors = sum(1 for row in rows if not row['ok'])
+    health = {
+        'model': model,
+        'calls': len(rows),
+        'errorRate': errors / len(rows) if rows else 0.0,
+        'p95Ms': _percentile(latencies, 95) if latencies else None,
+        'degraded': None
+    }
+    if len(rows) >= LLM_HEALTH_MIN_SAMPLES:
+        if health['errorRate'] > LLM_FALLBACK_ERROR_RATE:
+            health['degraded'] = 'error_rate'
+        elif health['p95Ms'] is not None and health['p95Ms'] > LLM_FALLBACK_P95_MS:
+            health['degraded'] = 'p95_latency'
+    return health
+
+
+def route(task, prompt, budget_ms=None):
+    """Choose (model, max_tokens) for one call of `task` and record the decision.
+
+    `budget_ms` is the time this call may take (what is left of the request's deadline); the
+    task's configured budget_ms applies when it is tighter or no budget is given.
+    """
+    cfg = routes()[task]
+    prompt_tokens = estimate_tokens(prompt)
+    if budget_ms is None or (cfg.get('budget_ms') and cfg['budget_ms'] < budget_ms):
+        budget_ms = cfg.get('budget_ms')
+    model = cfg['model']
+    tokens = cfg['max_tokens']
+    reason = 'primary'
+
+    if cfg.get('large_model') and prompt_tokens > cfg.get('large_prompt_tokens', math.inf):
+        model = cfg['large_model']
+        reason = 'prompt_size'
+
+    fallback = cfg.get('fallback')
+    if fallback and fallback != model:
+        try:
+            health = model_health(model)
+            switch = health['degraded']
+            if not switch and budget_ms and health['p95Ms'] is not None and health['p95Ms'] > budget_ms:
+                switch = 'latency_budget'
+            # Only move to a fallback that is not itself degraded
+            if switch and not model_health(fallback)['degraded']:
+                model = fallback
+                tokens = cfg.get('fallback_max_tokens', tokens)
+                reason = f'fallback_{switch}'
+        except Exception as e:
+            print(f"Model routing health error: {str(e)}")
+
+    room = MODEL_CONTEXT_TOKENS.get(model, DEFAULT_CONTEXT_TOKENS) - prompt_tokens
+    if tokens > room:
+        tokens = max(MIN_COMPLETION_TOKENS, room)
+        reason += '+trimmed'
+
+    record_decision(task, model, reason, prompt_tokens, tokens, budget_ms)
+    return model, tokens
+
+
+def record_decision(task, model, reason, prompt_tokens, tokens, budget_ms):
+    try:
+        _connect().execute(
+            'INSERT INTO decisions (ts, task, model, reason, prompt_tokens, max_tokens, budget_ms) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (time.time(), task, model, reason, prompt_tokens, tokens, budget_ms)
+        )
+    except Exception as e:
+        print(f"Model routing record error: {str(e)}")
+
+
+def observe(model, latency_s, ok):
+    """Record how a call to `model` went; feeds the health figures used for fallback"""
+    now = time.time()
+    try:
+        conn = _connect()
+        conn.execute('INSERT INTO outcomes (ts, model, latency_ms, ok) VALUES (?, ?, ?, ?)',
+                     (now, model, latency_s * 1000, 1 if ok else 0))
+        if next(_observed) % PRUNE_EVERY == 0:
+            conn.execute('DELETE FROM outcomes WHERE ts < ?', (now - ROUTING_RETENTION,))
+            conn.execute('DELETE FROM decisions WHERE ts < ?', (now - ROUTING_RETENTION,))
+    except Exception as e:
+        print(f"Model routing record error: {str(e)}")
+
+
+def stats(since_seconds=3600):
+    """Health of every configured model and recent decision counts by task, model and reason"""
+    models = set()
+    for cfg in routes().values():
+        models.update(m for m in (cfg.get('model'), cfg.get('fallback'), cfg.get('large_model')) if m)
+    rows = _connect().execute(
+        'SELECT task, model, reason, COUNT(*) AS n FROM decisions WHERE ts > ? GROUP BY task, model, reason ORDER BY task, n DESC',
+        (time.time() - since_seconds,)
+    ).fetchall()
+    return {
+        'routes': routes(),
+        'models': {model: model_health(model) for model in sorted(models)},
+        'decisions': [dict(row) for row in rows]
+    }
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""Declarative PDF report engine for assessment and match reports
+
+A report is a list of blocks - plain tuples such as ('heading', text) or ('bullets', items) -
+produced from the request payload by a spec function, and every report is turned into
+ReportLab flowables by the single render() code path. Paragraph styles are built once per
+process, and flowables whose text never changes (titles, section headings) are parsed once
+and copied per use.
+"""
+import copy
+import io
+import threading
+from datetime import datetime
+
+import memprofile
+from resolved_assessment import resolve_assessment
+
+_styles = None
+_styles_lock = threading.Lock()
+_static_cache = {}
+
+# Section tables: (heading, field) in the order they appear in the report
+OVERALL_SECTIONS = [
+    ('Personality Profile', 'profile_summary'),
+    ('Decision-Making Style', 'decision_style'),
+    ('Self-Awareness &amp; Adaptability', 'awareness_adaptability'),
+    ('Behavioral Patterns &amp; Themes', 'patterns_themes'),
+    ('Professional Implications', 'professional_implications'),
+    ('Development Insights', 'development_insights'),
+]
+
+TRAIT_ANALYSIS_SECTIONS = [
+    ('Behavioral Profile', 'behavioral_profile'),
+    ('Self-Awareness Analysis', 'self_awareness'),
+    ('Adaptability', 'adaptability'),
+    ('Pattern Summary', 'pattern_summary'),
+]
+
+# (heading, field, layout, default, page break before)
+MATCH_LIST_SECTIONS = [
+    ('Key Strengths', 'key_strengths', 'bullets', None, True),
+    ('Potential Concerns', 'potential_concerns', 'bullets', None, False),
+    ('Specific Evidence from Report', 'specific_evidence', 'bullets', None, False),
+    ('Risk Assessment', 'risk_assessment', 'paragraphs', 'No risk assessment available', True),
+    ('Development Needs', 'development_needs', 'bullets', None, False),
+    ('Onboarding Recommendations', 'onboarding_recommendations', 'bullets', None, False),
+]
+
+# Headings the spec emits only when the payload has the section
+OVERALL_HEADING = "Overall Personality Assessment"
+RESPONSES_SUBHEADING = "<b>Your Responses</b>"
+
+# Block kinds that may carry text fixed by the spec; only that text (collected by prepare()) is
+# cached, since headings such as trait names come from the payload
+STATIC_KINDS = ('title', 'heading', 'subheading')
+
+
+def get_styles():
+    """Paragraph styles, built once per process"""
+    global _styles
+    if _styles is None:
+        with _styles_lock:
+            if _styles is None:
+                from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+                from reportlab.lib.enums import TA_CENTER
+
+                sample = getSampleStyleSheet()
+                _styles = {
+                    'normal': sample['Normal'],
+                    'title': ParagraphStyle('CustomTitle', parent=sample['Heading1'], fontSize=24,
+                                            textColor='#5a9f8a', spaceAfter=12, alignment=TA_CENTER),
+                    'heading': ParagraphStyle('CustomHeading', parent=sample['Heading2'], fontSize=16,
+                                              textColor='#4a8f7a', spaceAfter=10, spaceBefore=15),
+                    'subheading': ParagraphStyle('CustomSubheading', parent=sample['Heading3'], fontSize=13,
+                                                 textColor='#3a7f6a', spaceAfter=8, spaceBefore=10),
+                    'body': ParagraphStyle('CustomBody', parent=sample['Normal'], fontSize=10,
+                                           spaceAfter=6, leading=14),
+                }
+    return _styles
+
+
+def _cache_static(kind, text):
+    from reportlab.platypus import Paragraph
+
+    if (kind, text) not in _static_cache:
+        _static_cache[(kind, text)] = Paragraph(text, get_styles()[kind])
+
+
+def _static_paragraph(kind, text):
+    """A shallow copy of the paragraph parsed once for spec-defined text (layout state is per
+    copy), or a freshly parsed one for any other text
+    """
+    from reportlab.platypus import Paragraph
+
+    paragraph = _static_cache.get((kind, text))
+    if paragraph is None:
+        return Paragraph(text, get_styles()[kind])
+    return copy.copy(paragraph)
+
+
+def prepare():
+    """Build styles and the static flowables of both report types ahead of the first request"""
+    get_styles()
+    for blocks in (assessment_blocks({}), match_blocks({})):
+        for block in blocks:
+            if block[0] in STATIC_KINDS:
+                _cache_static(block[0], block[1])
+    for heading, _ in OVERALL_SECTIONS + TRAIT_ANALYSIS_SECTIONS:
+        _cache_static('subheading', f'<b>{heading}</b>')
+    for heading, *_ in MATCH_LIST_SECTIONS:
+        _cache_static('heading', heading)
+    _cache_static('heading', OVERALL_HEADING)
+    _cache_static('subheading', RESPONSES_SUBHEADING)
+
+
+def _flowables(blocks):
+    """The one code path turning blocks into ReportLab flowables"""
+    from reportlab.platypus import Paragraph, Spacer, PageBreak
+    from reportlab.lib.units import inch
+
+    styles = get_styles()
+    if not _static_cache:
+        prepare()
+    for block in blocks:
+        kind = block[0]
+        if kind in STATIC_KINDS:
+            yield _static_paragraph(kind, block[1])
+        elif kind in ('body', 'normal'):
+            yield Paragraph(block[1], styles[kind])
+        elif kind == 'paragraphs':
+            for para in block[1].split('\n\n'):
+                if para.strip():
+                    yield Paragraph(para.strip(), styles['body'])
+        elif kind == 'bullets':
+            for item in block[1]:
+                yield Paragraph(f"• {item}", styles['body'])
+        elif kind == 'spacer':
+            yield Spacer(1, block[1] * inch)
+        elif kind == 'pagebreak':
+            yield PageBreak()
+        else:
+            raise ValueError(f'Unknown report block: {kind}')
+
+
+def render(blocks, buffer=None):
+    """Render blocks into a PDF; returns (buffer, page_count)"""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate
+
+    buffer = buffer or io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.75*inch, bottomMargin=0.75*inch)
+    doc.build(list(_flowables(blocks)))
+    buffer.seek(0)
+    return buffer, doc.page
+
+
+def assessment_blocks(data):
+    """Report spec for a personality assessment (/api/download payload)"""
+    overall_assessment = data.get('overallAssessment', {})
+    trait_analyses = data.get('traitAnalyses', {})
+    assessment = resolve_assessment(data.get('selectedTraits', []), data.get('answers', {}),
+                                    data.get('traitData', {}), data.get('results', {}))
+
+    blocks = [
+        ('title', "Personality Assessment Report"),
+        ('normal', f"Generated: {datetime.now().strftime('%B %d, %Y')}"),
+        ('spacer', 0.5),
+    ]
+
+    if overall_assessment:
+        personality_title = overall_assessment.get('personality_type_title', 'Multifaceted Professional')
+        blocks += [
+            ('heading', OVERALL_HEADING),
+            ('body', f"<b>Your Personality Type: {personality_title}</b>"),
+            ('spacer', 0.2),
+        ]
+        for i, (heading, field) in enumerate(OVERALL_SECTIONS):
+            blocks += [('subheading', f"<b>{heading}</b>"), ('body', overall_assessment.get(field, ''))]
+            if i < len(OVERALL_SECTIONS) - 1:
+                blocks.append(('spacer', 0.1))
+        blocks.append(('pagebreak',))
+
+    for trait in assessment:
+        result = trait.result
+        trait_analysis = trait_analyses.get(trait.key, {})
+
+        blocks += [
+            ('heading', f"{trait.name}"),
+            ('body', f"<i>{trait.low_end} ↔ {trait.high_end}</i>"),
+            ('spacer', 0.1),
+            ('body', f"<b>Score:</b> {result.get('score', 0):.2f} | <b>Pattern:</b> {result.get('pattern', 'N/A')} | <b>Consistency:</b> {int(result.get('consistency', 0)*100)}% | <b>Self-Awareness:</b> {int(result.get('agreement', 0)*100)}%"),
+            ('spacer', 0.15),
+        ]
+
+        if trait_analysis:
+            for i, (heading, field) in enumerate(TRAIT_ANALYSIS_SECTIONS):
+                blocks += [('subheading', f"<b>{heading}</b>"), ('body', trait_analysis.get(field, ''))]
+                if i < len(TRAIT_ANALYSIS_SECTIONS) - 1:
+                    blocks.append(('spacer', 0.1))
+
+        blocks += [('spacer', 0.2), ('subheading', RESPONSES_SUBHEADING)]
+
+        for answer in trait.answers:
+            blocks += [
+                ('body', f"<b>Q{answer.id}:</b> {answer.text}"),
+                ('body', f"<i>Your choice:</i> {answer.label} (Score: {answer.value})"),
+                ('body', f"<i>Reveals:</i> {answer.decoding}"),
+                ('spacer', 0.1),
+            ]
+
+        blocks.append(('pagebreak',))
+
+    return blocks
+
+
+def match_blocks(data):
+    """Report spec for a candidate-job match (/api/download-match-report payload)"""
+    matching_analysis = data.get('matchingAnalysis', {})
+    candidate_name = data.get('candidateName', 'Candidate')
+    job_title = data.get('jobTitle', 'Position')
+
+    overall_fit = matching_analysis.get('overall_fit_score', 3)
+    fit_label = matching_analysis.get('overall_fit_label', 'Adequate Fit')
+
+    blocks = [
+        ('title', "Candidate-Job Matching Report"),
+        ('normal', f"Candidate: {candidate_name}"),
+        ('normal', f"Position: {job_title}"),
+        ('normal', f"Generated: {datetime.now().strftime('%B %d, %Y')}"),
+        ('spacer', 0.5),
+        ('heading', "Overall Candidate Fit"),
+        ('body', f"<b>Fit Score:</b> {overall_fit:.1f}/5.0 - {fit_label}"),
+        ('spacer', 0.2),
+        ('heading', "Hiring Recommendation"),
+        ('body', matching_analysis.get('hiring_recommendation', 'No recommendation available')),
+        ('spacer', 0.2),
+        ('heading', "Executive Summary"),
+        ('paragraphs', matching_analysis.get('executive_summary', 'No summary available')),
+        ('spacer', 0.2),
+        ('pagebreak',),
+        ('heading', "Trait-by-Trait Fit Analysis"),
+    ]
+
+    for trait_name, trait_score in matching_analysis.get('trait_scores', {}).items():
+        score = trait_score.get('score', 3)
+        required_level = trait_score.get('required_level', 'N/A')
+        blocks += [
+            ('subheading', f"<b>{trait_name}</b>"),
+            ('body', f"Score: {score:.1f}/5.0 | Required Level: {required_level.upper()}"),
+            ('body', trait_score.get('analysis', '')),
+            ('spacer', 0.15),
+        ]
+
+    for i, (heading, field, layout, default, page_break) in enumerate(MATCH_LIST_SECTIONS):
+        if page_break:
+            blocks.append(('pagebreak',))
+        blocks.append(('heading', heading))
+        blocks.append((layout, matching_analysis.get(field, default if default is not None else [])))
+        if i < len(MATCH_LIST_SECTIONS) - 1:
+            blocks.append(('spacer', 0.2))
+
+    return blocks
+
+
+SPECS = {
+    'assessment': assessment_blocks,
+    'match': match_blocks,
+}
+
+
+@memprofile.profiled('pdf_build')
+def render_report(kind, data):
+    """Render one report of the given kind; returns a rewound buffer"""
+    buffer, _ = render(SPECS[kind](data))
+    return buffer
+
+
+def render_cohort(reports):
+    """Render many (kind, data) reports into a single document, each starting on a new page"""
+    blocks = []
+    for kind, data in reports:
+        if blocks and blocks[-1] != ('pagebreak',):
+            blocks.append(('pagebreak',))
+        blocks.extend(SPECS[kind](data))
+    return render(blocks)
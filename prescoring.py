@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Deterministic pre-scoring of a candidate report against a job profile
+
+The personality report PDF prints, for every assessed dimension, a "<low end> ↔ <high end>"
+line followed by "Score: x | Pattern: ... | Consistency: n% | Self-Awareness: n%". parse_report()
+reads those back (with the candidate's choices) from the extracted text, and prescore() turns
+them into per-trait and overall fit with fit_scoring. The matching prompt then only asks GPT to
+write the narrative around the computed scores.
+
+Reports that do not contain these lines (other formats) parse to no dimensions; callers fall
+back to sending the raw text.
+"""
+import re
+
+import catalog
+import fit_scoring
+
+_METRICS = re.compile(
+    r'^(?P<low>[^\n↔]+?)\s*↔\s*(?P<high>[^\n]+?)\s*\n\s*'
+    r'Score:\s*(?P<score>\d+(?:\.\d+)?)\s*\|\s*Pattern:\s*(?P<pattern>\S+)\s*\|\s*'
+    r'Consistency:\s*(?P<consistency>\d+)%\s*\|\s*Self-Awareness:\s*(?P<agreement>\d+)%',
+    re.MULTILINE
+)
+_CHOICE = re.compile(r'Your choice:\s*(.+?)\s*\(Score:\s*\d+\)', re.DOTALL)
+_PERSONALITY_TYPE = re.compile(r'Your Personality Type:\s*(.+)')
+
+MAX_CHOICE_CHARS = 160
+
+
+def parse_report(candidate_text):
+    """Metrics printed in a personality report.
+
+    Returns {'personality_type': str or None, 'dimensions': {dimension key: {'name', 'low_end',
+    'high_end', 'score', 'pattern', 'consistency', 'agreement', 'choices'}}}.
+    """
+    interpretations = catalog.load_catalog()['traitInterpretations']
+    by_ends = {(interp.get('lowEnd'), interp.get('highEnd')): key for key, interp in interpretations.items()}
+
+    matches = list(_METRICS.finditer(candidate_text))
+    dimensions = {}
+    for i, match in enumerate(matches):
+        key = by_ends.get((match.group('low').strip(), match.group('high').strip()))
+        if key is None:
+            continue
+        section_end = matches[i + 1].start() if i + 1 < len(matches) else len(candidate_text)
+        choices = [
+            ' '.join(choice.split())[:MAX_CHOICE_CHARS]
+            for choice in _CHOICE.findall(candidate_text, match.end(), section_end)
+        ]
+        dimensions[key] = {
+            'name': interpretations[key].get('name', key),
+            'low_end': match.group('low').strip(),
+            'high_end': match.group('high').strip(),
+            'score': float(match.group('score')),
+            'pattern': match.group('pattern'),
+            'consistency': int(match.group('consistency')) / 100,
+            'agreement': int(match.group('agreement')) / 100,
+            'choices': choices
+        }
+
+    personality_type = _PERSONALITY_TYPE.search(candidate_text)
+    return {
+        'personality_type': personality_type.group(1).strip() if personality_type else None,
+        'dimensions': dimensions
+    }
+
+
+def prescore(job_requirements, report):
+    """Per-trait fit and the weighted overall fit for a parsed report.
+
+    Returns {'trait_scores', 'overall_fit_score', 'overall_fit_label', 'directly_assessed',
+    'not_assessed'}; trait_scores entries carry score, required_level, directly_assessed,
+    confidence_level and, for assessed traits, the dimension they were measured on.
+    """
+    trait_scores = {}
+    assessed_fits = []
+    directly_assessed = []
+    not_assessed = []
+    for name, requirement in job_requirements.items():
+        level = requirement['level']
+        dimension = catalog.JOB_TRAIT_DIMENSIONS.get(name)
+        metrics = report['dimensions'].get(dimension[0]) if dimension else None
+        if metrics is None:
+            not_assessed.append(name)
+            trait_scores[name] = {
+                'score': fit_scoring.NEUTRAL_SCORE,
+                'required_level': level,
+                'directly_assessed': False,
+                'confidence_level': 'low'
+            }
+            continue
+        fit = fit_scoring.trait_fit(metrics['score'], metrics['consistency'], metrics['agreement'], dimension[1], level)
+        assessed_fits.append(fit)
+        directly_assessed.append(name)
+        trait_scores[name] = {
+            'score': round(fit, 1),
+            'required_level': level,
+            'directly_assessed': True,
+            'confidence_level': 'high' if (metrics['consistency'] + metrics['agreement']) / 2 >= 0.75 else 'medium',
+            'dimension': dimension[0]
+        }
+
+    overall = fit_scoring.round_half(fit_scoring.overall_fit(assessed_fits, len(not_assessed)))
+    return {
+        'trait_scores': trait_scores,
+        'overall_fit_score': overall,
+        'overall_fit_label': fit_scoring.fit_label(overall),
+        'directly_assessed': directly_assessed,
+        'not_assessed': not_assessed
+    }
+
+
+def apply_scores(analysis, prescored):
+    """Overwrite the scores in a GPT analysis with the computed ones, keeping its narrative"""
+    written = analysis.get('trait_scores')
+    written = written if isinstance(written, dict) else {}
+    trait_scores = {}
+    for name, computed in prescored['trait_scores'].items():
+        entry = written.get(name)
+        entry = dict(entry) if isinstance(entry, dict) else {}
+        entry.update(computed)
+        trait_scores[name] = entry
+    analysis['trait_scores'] = trait_scores
+    analysis['overall_fit_score'] = prescored['overall_fit_score']
+    analysis['overall_fit_label'] = prescored['overall_fit_label']
+    return analysis
@@ -3,17 +3,46 @@ let answers = {};
 let selectedTraits = [];
 let allQuestionsData = {};
 
+// Trait catalog: a small manifest for trait selection, per-trait bundles fetched on demand
+let catalogManifest = { traits: [] };
+let manifestByTrait = {};
+const traitBundles = {};
+
 // Constants
 const MINUTES_PER_QUESTION = 1.5;
 
+async function loadManifest() {
+  const response = await fetch('/api/catalog/manifest');
+  if (!response.ok) {
+    throw new Error('Could not load the trait catalog');
+  }
+  catalogManifest = await response.json();
+  manifestByTrait = {};
+  catalogManifest.traits.forEach(entry => {
+    manifestByTrait[entry.key] = entry;
+  });
+}
+
+// Fetch the question bundles of the given traits that are not loaded yet
+async function loadTraitBundles(traitKeys) {
+  const missing = traitKeys.filter(trait => !traitBundles[trait]);
+  await Promise.all(missing.map(async trait => {
+    const response = await fetch(manifestByTrait[trait].bundle);
+    if (!response.ok) {
+      throw new Error(`Could not load questions for ${manifestByTrait[trait].name}`);
+    }
+    traitBundles[trait] = await response.json();
+  }));
+}
+
 // Initialize UI
 function renderTraitSelection() {
   const checkboxDiv = document.getElementById("traitCheckboxes");
   checkboxDiv.innerHTML = "";
   
-  Object.keys(traits).forEach(trait => {
-    const traitInfo = traitInterpretations[trait];
-    const questionCount = traits[trait].length;
+  catalogManifest.traits.forEach(traitInfo => {
+    const trait = traitInfo.key;
+    const questionCount = traitInfo.questionCount;
     const estimatedTime = Math.ceil(questionCount * MINUTES_PER_QUESTION);
     
     const card = document.createElement("div");
@@ -63,7 +92,7 @@ function updateTimeEstimate() {
   
   let totalQuestions = 0;
   checkedTraits.forEach(cb => {
-    totalQuestions += traits[cb.value].length;
+    totalQuestions += manifestByTrait[cb.value].questionCount;
   });
   
   const totalMinutes = Math.ceil(totalQuestions * MINUTES_PER_QUESTION);
@@ -90,7 +119,7 @@ window.onclick = (event) => {
 };
 
 // Start assessment
-function startAssessment() {
+async function startAssessment() {
   const checkboxes = document.querySelectorAll("#traitCheckboxes input[type='checkbox']");
   selectedTraits = Array.from(checkboxes).filter(cb => cb.checked).map(cb => cb.value);
   
@@ -99,6 +128,20 @@ function startAssessment() {
     return;
   }
 
+  const startBtn = document.getElementById("startBtn");
+  startBtn.disabled = true;
+  startBtn.textContent = "Loading questions...";
+  try {
+    await loadTraitBundles(selectedTraits);
+  } catch (error) {
+    console.error('Error:', error);
+    alert(`Sorry, the questions could not be loaded. Please try again.\n${error.message}`);
+    return;
+  } finally {
+    startBtn.disabled = false;
+    startBtn.textContent = "Start Assessment";
+  }
+
   answers = {};
   selectedTraits.forEach(trait => {
     answers[trait] = {};
@@ -106,7 +149,7 @@ function startAssessment() {
 
   let allQuestions = [];
   for (const trait of selectedTraits) {
-    traits[trait].forEach(q => {
+    traitBundles[trait].questions.forEach(q => {
       allQuestions.push({ ...q, trait: trait });
     });
   }
@@ -184,7 +227,7 @@ function shuffleArray(array) {
 
 function checkAllAnswered() {
   for (const trait of selectedTraits) {
-    for (const q of traits[trait]) {
+    for (const q of traitBundles[trait].questions) {
       if (answers[trait][q.id] === undefined) return false;
     }
   }
@@ -204,13 +247,9 @@ document.getElementById("calculateBtn").onclick = async () => {
     traitData: {}
   };
 
-  // Include trait definitions and question data
+  // Include trait definitions and question data (each bundle is already in this shape)
   selectedTraits.forEach(trait => {
-    assessmentData.traitData[trait] = {
-      questions: traits[trait],
-      interpretation: traitInterpretations[trait],
-      patterns: patternInterpretations[trait]
-    };
+    assessmentData.traitData[trait] = traitBundles[trait];
   });
 
   try {
@@ -321,4 +360,13 @@ document.getElementById("downloadBtn").onclick = async () => {
 };
 
 // Initialize
-renderTraitSelection();
+loadManifest()
+  .then(renderTraitSelection)
+  .catch(error => {
+    console.error('Error:', error);
+    document.getElementById("traitCheckboxes").innerHTML = `
+      <div class="card" style="background: hsl(var(--warning) / 0.1); border-color: hsl(var(--warning));">
+        <p>Sorry, the trait catalog could not be loaded. Please refresh the page.</p>
+      </div>
+    `;
+  });
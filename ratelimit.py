@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""Per-client token-bucket rate limiting and in-flight concurrency caps
+
+Budgets are expressed in estimated LLM tokens rather than requests, so one /api/analyze
+with many traits costs more than a single-trait one. State lives in a local SQLite
+database, which makes the limits hold across all gunicorn workers on the box.
+"""
+import functools
+import math
+import os
+import time
+import uuid
+
+from flask import request, jsonify, make_response
+
+import storage
+
+DB_NAME = 'ratelimit'
+
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') != '0'
+# Bucket size and refill rate, in estimated LLM tokens
+RATE_LIMIT_BURST_TOKENS = int(os.environ.get('RATE_LIMIT_BURST_TOKENS', 60000))
+RATE_LIMIT_TOKENS_PER_MINUTE = int(os.environ.get('RATE_LIMIT_TOKENS_PER_MINUTE', 30000))
+# Maximum number of LLM-backed requests a client may have running at once
+RATE_LIMIT_MAX_CONCURRENT = int(os.environ.get('RATE_LIMIT_MAX_CONCURRENT', 2))
+# In-flight leases older than this are considered abandoned (e.g. a worker was killed)
+RATE_LIMIT_LEASE_TTL = int(os.environ.get('RATE_LIMIT_LEASE_TTL', 300))
+# Only honour X-Forwarded-For when running behind a trusted proxy
+RATE_LIMIT_TRUST_PROXY = os.environ.get('RATE_LIMIT_TRUST_PROXY', '0') == '1'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    client TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS inflight (
+    id TEXT PRIMARY KEY,
+    client TEXT NOT NULL,
+    started_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS inflight_client ON inflight (client, started_at);
+"""
+
+
+def _connect():
+    return storage.connect(DB_NAME, SCHEMA)
+
+
+def client_id(current=None):
+    """Identify the calling client for quota purposes (`current` defaults to Flask's request)"""
+    current = current if current is not None else request
+    if RATE_LIMIT_TRUST_PROXY:
+        forwarded = current.headers.get('X-Forwarded-For', '')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return current.remote_addr or 'unknown'
+
+
+def acquire(client, cost):
+    """Try to start a request costing `cost` tokens.
+
+    Returns (lease_id, None) when admitted, or (None, retry_after_seconds) when rejected.
+    """
+    now = time.time()
+    refill_per_second = RATE_LIMIT_TOKENS_PER_MINUTE / 60.0
+    # A single request larger than the whole bucket may still run once the bucket is full
+    cost = min(cost, RATE_LIMIT_BURST_TOKENS)
+
+    conn = _connect()
+    with storage.transaction(conn):
+        conn.execute('DELETE FROM inflight WHERE started_at < ?', (now - RATE_LIMIT_LEASE_TTL,))
+
+        running = conn.execute('SELECT COUNT(*) FROM inflight WHERE client = ?', (client,)).fetchone()[0]
+        if running >= RATE_LIMIT_MAX_CONCURRENT:
+            return None, 1
+
+        row = conn.execute('SELECT tokens, updated_at FROM buckets WHERE client = ?', (client,)).fetchone()
+        if row is None:
+            tokens = float(RATE_LIMIT_BURST_TOKENS)
+        else:
+            tokens = min(RATE_LIMIT_BURST_TOKENS, row['tokens'] + (now - row['updated_at']) * refill_per_second)
+
+        if tokens < cost:
+            conn.execute(
+                'INSERT OR REPLACE INTO buckets (client, tokens, updated_at) VALUES (?, ?, ?)',
+                (client, tokens, now)
+            )
+            return None, max(1, math.ceil((cost - tokens) / refill_per_second))
+
+        lease_id = uuid.uuid4().hex
+        conn.execute(
+            'INSERT OR REPLACE INTO buckets (client, tokens, updated_at) VALUES (?, ?, ?)',
+            (client, tokens - cost, now)
+        )
+        conn.execute('INSERT INTO inflight (id, client, started_at) VALUES (?, ?, ?)', (lease_id, client, now))
+    return lease_id, None
+
+
+def release(lease_id):
+    """Mark an admitted request as finished"""
+    conn = _connect()
+    conn.execute('DELETE FROM inflight WHERE id = ?', (lease_id,))
+
+
+def _release_quietly(lease_id):
+    try:
+        release(lease_id)
+    except Exception as e:
+        print(f"Rate limiter release error: {str(e)}")
+
+
+def _too_many(jsonify, retry_after):
+    response = jsonify({
+        'error': 'Too many requests. Please wait before trying again.',
+        'retryAfter': retry_after
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+def rate_limited(estimate_cost):
+    """Decorate a Flask view so it is admitted only within the caller's token and concurrency budget.
+
+    `estimate_cost` is called inside the request context and returns the estimated LLM tokens.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not RATE_LIMIT_ENABLED:
+                return view(*args, **kwargs)
+
+            client = client_id()
+            cost = estimate_cost()
+            try:
+                lease_id, retry_after = acquire(client, cost)
+            except Exception as e:
+                # Fail open: a broken limiter store must not take the service down
+                print(f"Rate limiter error: {str(e)}")
+                return view(*args, **kwargs)
+
+            if lease_id is None:
+                print(f"Rate limited {client} on {request.path} (estimated {cost} tokens, retry in {retry_after}s)")
+                return _too_many(jsonify, retry_after)
+
+            try:
+                response = make_response(view(*args, **kwargs))
+            except Exception:
+                _release_quietly(lease_id)
+                raise
+            if response.is_streamed:
+                # The LLM work happens while the body is sent; hold the lease until then
+                response.call_on_close(lambda: _release_quietly(lease_id))
+            else:
+                _release_quietly(lease_id)
+            return response
+        return wrapper
+    return decorator
+
+
+def rate_limited_async(estimate_cost):
+    """Quart variant of rate_limited; `estimate_cost` is awaited inside the request context"""
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(*args, **kwargs):
+            from quart import request, jsonify, make_response
+            from quart.wrappers.response import IterableBody
+
+            if not RATE_LIMIT_ENABLED:
+                return await view(*args, **kwargs)
+
+            client = client_id(request)
+            cost = await estimate_cost()
+            try:
+                lease_id, retry_after = acquire(client, cost)
+            except Exception as e:
+                print(f"Rate limiter error: {str(e)}")
+                return await view(*args, **kwargs)
+
+            if lease_id is None:
+                print(f"Rate limited {client} on {request.path} (estimated {cost} tokens, retry in {retry_after}s)")
+                return _too_many(jsonify, retry_after)
+
+            try:
+                response = await make_response(await view(*args, **kwargs))
+            except BaseException:
+                _release_quietly(lease_id)
+                raise
+            if isinstance(response.response, IterableBody):
+                # Quart has no call_on_close; release when the server closes the streamed body
+                response.response = _leased_body(IterableBody, response.response, lease_id)
+            else:
+                _release_quietly(lease_id)
+            return response
+        return wrapper
+    return decorator
+
+
+def _leased_body(body_class, body, lease_id):
+    class LeasedBody(body_class):
+        def __init__(self):
+            self.iter = body.iter
+
+        async def __aexit__(self, exc_type, exc_value, tb):
+            try:
+                await body.__aexit__(exc_type, exc_value, tb)
+            finally:
+                _release_quietly(lease_id)
+
+    return LeasedBody()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Near-duplicate index of candidate reports and their matching analyses
+
+A candidate re-uploading the same assessment (re-saved, renamed, re-exported) produces a
+different file but nearly the same extracted text. Each report's text gets a 64-bit SimHash
+of its word shingles; reports within NEAR_DUP_MAX_DISTANCE bits of each other count as the
+same report. The stored analysis for a near-duplicate report under the same job profile can
+then be returned instead of running the GPT matching call again.
+
+Lookups use the four 16-bit bands of the fingerprint: two fingerprints within 3 bits of each
+other must agree on at least one band, so only reports sharing a band are compared. Larger
+distances fall back to comparing every report stored for the job profile.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+
+import storage
+
+DB_NAME = 'reports'
+
+# 0 disables reuse; 3 (the default) tolerates small differences such as a changed date line
+NEAR_DUP_MAX_DISTANCE = int(os.environ.get('NEAR_DUP_MAX_DISTANCE', 3))
+# Stored analyses older than this are not reused
+NEAR_DUP_MAX_AGE = int(os.environ.get('NEAR_DUP_MAX_AGE', 30 * 24 * 3600))
+
+SHINGLE_WORDS = 3
+BANDS = 4
+BAND_BITS = 64 // BANDS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id TEXT PRIMARY KEY,
+    profile_key TEXT NOT NULL,
+    simhash INTEGER NOT NULL,
+    band0 INTEGER NOT NULL,
+    band1 INTEGER NOT NULL,
+    band2 INTEGER NOT NULL,
+    band3 INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    analysis TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reports_band0 ON reports (profile_key, band0);
+CREATE INDEX IF NOT EXISTS reports_band1 ON reports (profile_key, band1);
+CREATE INDEX IF NOT EXISTS reports_band2 ON reports (profile_key, band2);
+CREATE INDEX IF NOT EXISTS reports_band3 ON reports (profile_key, band3);
+"""
+
+_WORD = re.compile(r'\w+')
+
+
+def _connect():
+    return storage.connect(DB_NAME, SCHEMA)
+
+
+def simhash(text):
+    """64-bit SimHash of the text's lower-cased word shingles"""
+    words = _WORD.findall(text.lower())
+    if len(words) < SHINGLE_WORDS:
+        shingles = [' '.join(words)]
+    else:
+        shingles = [' '.join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)]
+    counts = [0] * 64
+    for shingle in set(shingles):
+        h = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(64):
+            counts[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if counts[bit] > 0)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def _bands(fingerprint):
+    mask = (1 << BAND_BITS) - 1
+    return [fingerprint >> (i * BAND_BITS) & mask for i in range(BANDS)]
+
+
+def _signed(fingerprint):
+    # SQLite integers are signed 64-bit
+    return fingerprint - (1 << 64) if fingerprint >= 1 << 63 else fingerprint
+
+
+def _unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+def find_near_duplicate(fingerprint, profile_key, max_distance=None):
+    """Closest stored report for the same job profile within max_distance bits.
+
+    Returns {'reportId', 'distance', 'createdAt', 'analysis'} or None.
+    """
+    max_distance = NEAR_DUP_MAX_DISTANCE if max_distance is None else max_distance
+    if max_distance <= 0:
+        return None
+    conn = _connect()
+    since = time.time() - NEAR_DUP_MAX_AGE
+    if max_distance < BANDS:
+        bands = _bands(fingerprint)
+        where = ' OR '.join(f'band{i} = ?' for i in range(BANDS))
+        rows = conn.execute(
+            f'SELECT id, simhash, created_at FROM reports WHERE profile_key = ? AND created_at > ? AND ({where})',
+            [profile_key, since] + bands
+        ).fetchall()
+    else:
+        rows = conn.execute(
+            'SELECT id, simhash, created_at FROM reports WHERE profile_key = ? AND created_at > ?',
+            (profile_key, since)
+        ).fetchall()
+
+    # Closest first, most recent among equally close ones
+    matches = [(hamming(fingerprint, _unsigned(row['simhash'])), -row['created_at'], row) for row in rows]
+    matches = [m for m in matches if m[0] <= max_distance]
+    if not matches:
+        return None
+    distance, _, row = min(matches, key=lambda m: m[:2])
+    analysis = conn.execute('SELECT analysis FROM reports WHERE id = ?', (row['id'],)).fetchone()['analysis']
+    return {'reportId': row['id'], 'distance': distance, 'createdAt': row['created_at'], 'analysis': json.loads(analysis)}
+
+
+def save_report(fingerprint, profile_key, analysis):
+    """Index a report's fingerprint with the analysis produced for this job profile"""
+    report_id = uuid.uuid4().hex
+    _connect().execute(
+        'INSERT INTO reports (id, profile_key, simhash, band0, band1, band2, band3, created_at, analysis) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        [report_id, profile_key, _signed(fingerprint)] + _bands(fingerprint) + [time.time(), json.dumps(analysis)]
+    )
+    return report_id
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Per-request view of an assessment with every answer resolved to its chosen option
+
+Prompts, result HTML and the PDF all walk the same "question -> chosen option" pairs.
+resolve_assessment() does that lookup once per request (options indexed by value) and
+the consumers share the result instead of each re-scanning the questions and options.
+"""
+
+
+class ResolvedAnswer:
+    """One answered question and the option the respondent chose"""
+    __slots__ = ('id', 'text', 'value', 'label', 'decoding')
+
+    def __init__(self, id, text, value, label, decoding):
+        self.id = id
+        self.text = text
+        self.value = value
+        self.label = label
+        self.decoding = decoding
+
+
+class ResolvedTrait:
+    """A trait's interpretation, metrics, pattern interpretation and answered questions"""
+    __slots__ = ('key', 'name', 'low_end', 'high_end', 'interpretation', 'result', 'pattern_info', 'answers')
+
+    def __init__(self, key, trait_info, trait_answers, result):
+        interp = trait_info.get('interpretation', {})
+        self.key = key
+        self.name = interp.get('name', key)
+        self.low_end = interp.get('lowEnd', '')
+        self.high_end = interp.get('highEnd', '')
+        self.interpretation = interp
+        self.result = result
+        self.pattern_info = trait_info.get('patterns', {}).get(result.get('pattern'), {})
+        self.answers = answers = []
+        for q in trait_info.get('questions', []):
+            q_id = q.get('id', '')
+            option = _chosen_option(q.get('options', []), trait_answers.get(q_id))
+            if option is not None:
+                answers.append(ResolvedAnswer(q_id, q.get('text', ''), option.get('value', 0),
+                                              option.get('label', ''), option.get('decoding', 'N/A')))
+
+
+class ResolvedAssessment:
+    """All selected traits, in selection order"""
+    __slots__ = ('selected_traits', 'traits')
+
+    def __init__(self, selected_traits, traits):
+        self.selected_traits = selected_traits
+        self.traits = traits
+
+    def __iter__(self):
+        return iter(self.traits.values())
+
+    def __len__(self):
+        return len(self.traits)
+
+    @property
+    def results(self):
+        return {key: trait.result for key, trait in self.traits.items()}
+
+
+def _chosen_option(options, value):
+    """The first option whose value equals the answer, or None"""
+    try:
+        # Index the options by value (reversed so the first of any duplicates wins)
+        return {opt.get('value'): opt for opt in reversed(options)}.get(value)
+    except TypeError:
+        # Unhashable answer or option value: fall back to comparing one by one
+        return next((opt for opt in options if opt.get('value') == value), None)
+
+
+def resolve_assessment(selected_traits, answers, trait_data, results=None):
+    """Build the resolved view; results default to empty metrics (e.g. for a bare PDF payload)"""
+    results = results or {}
+    traits = {}
+    for key in selected_traits:
+        traits[key] = ResolvedTrait(key, trait_data.get(key, {}), answers.get(key, {}), results.get(key, {}))
+    return ResolvedAssessment(list(selected_traits), traits)
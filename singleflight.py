@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""Single-flight request coalescing
+
+Concurrent calls that share a key attach to the one computation already in flight and
+all receive its result (or its exception). Coalescing is per process: run gunicorn with
+threaded workers (or the ASGI app) so duplicate submits land on the same in-flight call.
+"""
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+# How many recently finished keys to keep waiter metrics for
+RECENT_KEYS = 256
+
+
+def canonical_key(*parts):
+    """Hash request inputs into a stable key (dict ordering and whitespace do not matter)"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, (bytes, bytearray)):
+            digest.update(hashlib.sha256(part).digest())
+        else:
+            digest.update(json.dumps(part, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class _Call:
+    __slots__ = ('event', 'future', 'result', 'error', 'waiters', 'started_at')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.future = None
+        self.result = None
+        self.error = None
+        self.waiters = 0
+        self.started_at = time.time()
+
+
+class SingleFlight:
+    """Deduplicate concurrent identical computations, with per-key waiter metrics"""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._recent = OrderedDict()
+        self._executions = 0
+        self._coalesced = 0
+
+    def _join(self, key):
+        """Return (call, is_leader) for key, registering a new call if none is in flight"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._coalesced += 1
+                return call, False
+            call = self._calls[key] = _Call()
+            self._executions += 1
+            return call, True
+
+    def _finish(self, key, call):
+        with self._lock:
+            self._calls.pop(key, None)
+            self._recent[key] = {
+                'waiters': call.waiters,
+                'duration_seconds': time.time() - call.started_at,
+                'failed': call.error is not None,
+                'finished_at': time.time()
+            }
+            self._recent.move_to_end(key)
+            while len(self._recent) > RECENT_KEYS:
+                self._recent.popitem(last=False)
+
+    def do(self, key, fn):
+        """Run fn() once for all concurrent callers with the same key; returns (result, shared)"""
+        call, leader = self._join(key)
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            self._finish(key, call)
+            call.event.set()
+        return call.result, False
+
+    async def do_async(self, key, coro_fn):
+        """Async counterpart of do() for the ASGI app; coro_fn() returns an awaitable.
+
+        The work runs as its own task, so a leader cancelled with its request (client gone)
+        leaves it running for the followers.
+        """
+        call, leader = self._join(key)
+        if not leader:
+            return await asyncio.shield(call.future), True
+
+        call.future = asyncio.get_running_loop().create_future()
+        task = asyncio.ensure_future(coro_fn())
+        task.add_done_callback(lambda done: self._settle(key, call, done))
+        return await asyncio.shield(task), False
+
+    def _settle(self, key, call, task):
+        """Hand the finished task's outcome to the followers"""
+        if task.cancelled():
+            # Only the work itself was cancelled (e.g. shutdown); followers get an error, not a cancellation
+            call.error = RuntimeError(f'{self.name} computation was cancelled')
+        else:
+            call.error = task.exception()
+        if call.error is not None:
+            call.future.set_exception(call.error)
+            # Followers retrieve the exception; avoid "never retrieved" warnings when there are none
+            call.future.exception()
+        else:
+            call.result = task.result()
+            call.future.set_result(call.result)
+        self._finish(key, call)
+
+    def stats(self):
+        """Snapshot of in-flight keys and recently finished keys with their waiter counts"""
+        now = time.time()
+        with self._lock:
+            return {
+                'name': self.name,
+                'executions': self._executions,
+                'coalesced': self._coalesced,
+                'in_flight': {
+                    key: {'waiters': call.waiters, 'age_seconds': now - call.started_at}
+                    for key, call in self._calls.items()
+                },
+                'recent': dict(reversed(self._recent.items()))
+            }
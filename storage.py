@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""SQLite helpers shared by the server-side stores"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# All local state lives under DATA_DIR so every gunicorn worker on the box sees the same files
+DATA_DIR = os.environ.get('DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance'))
+
+_local = threading.local()
+
+
+def db_path(name):
+    """Return the on-disk path of the named database"""
+    return os.path.join(DATA_DIR, f'{name}.db')
+
+
+def connect(name, schema=None):
+    """Return this thread's connection to the named database, creating the schema on first use"""
+    connections = getattr(_local, 'connections', None)
+    if connections is None or getattr(_local, 'pid', None) != os.getpid():
+        # Never reuse a connection inherited across fork (gunicorn --preload)
+        connections = _local.connections = {}
+        _local.pid = os.getpid()
+
+    conn = connections.get(name)
+    if conn is None:
+        os.makedirs(DATA_DIR, exist_ok=True)
+        conn = sqlite3.connect(db_path(name), timeout=30, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        if schema:
+            conn.executescript(schema)
+        connections[name] = conn
+    return conn
+
+
+@contextmanager
+def transaction(conn):
+    """Run a block inside an IMMEDIATE transaction so concurrent workers serialize their writes"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
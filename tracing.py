@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""Lightweight per-request stage tracing
+
+A route decorated with @traced(name) opens a trace for the request; code anywhere below
+it marks stages with `with span('stage'):`. When the request finishes, stage durations
+are sent back in a Server-Timing header. With TRACE_EXPORT_PATH set, the whole trace (spans
+with parents and start offsets) is also appended as one JSON line to that file for offline
+waterfall/flame analysis; once it reaches TRACE_EXPORT_MAX_BYTES it is renamed to <path>.1
+(replacing the previous one) and a new file is started. Spans outside a traced request are no-ops.
+
+Settings: TRACING_ENABLED (default 1), TRACE_EXPORT_PATH (default empty: no file export, e.g.
+instance/traces.jsonl), TRACE_EXPORT_MAX_BYTES (default 50 MB).
+"""
+import contextlib
+import contextvars
+import functools
+import itertools
+import json
+import os
+import re
+import threading
+import time
+import uuid
+
+TRACING_ENABLED = os.environ.get('TRACING_ENABLED', '1') == '1'
+TRACE_EXPORT_PATH = os.environ.get('TRACE_EXPORT_PATH', '')
+TRACE_EXPORT_MAX_BYTES = int(os.environ.get('TRACE_EXPORT_MAX_BYTES', 50 * 1024 * 1024))
+
+_current_trace = contextvars.ContextVar('trace', default=None)
+_current_span = contextvars.ContextVar('span', default=None)
+_export_lock = threading.Lock()
+
+
+class Trace:
+    """Spans recorded for one request"""
+
+    def __init__(self, name):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex
+        self.wall_start = time.time()
+        self.start = time.perf_counter()
+        self.spans = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def next_id(self):
+        with self._lock:
+            return next(self._ids)
+
+    def record(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+
+
+@contextlib.contextmanager
+def span(name, **attrs):
+    """Time a stage of the current request; yields a dict for attributes known only at the end"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield attrs
+        return
+    span_id = trace.next_id()
+    parent = _current_span.get()
+    token = _current_span.set(span_id)
+    start = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        end = time.perf_counter()
+        _current_span.reset(token)
+        trace.record({
+            'id': span_id,
+            'parent': parent,
+            'name': name,
+            'startMs': round((start - trace.start) * 1000, 3),
+            'durationMs': round((end - start) * 1000, 3),
+            'attrs': {k: v for k, v in attrs.items() if v is not None}
+        })
+
+
+def start_trace(name):
+    trace = Trace(name)
+    return trace, _current_trace.set(trace)
+
+
+def _metric_name(name):
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', name)
+
+
+def server_timing(trace, total_ms):
+    """Server-Timing header value: one entry per span in start order, then the request total"""
+    entries = []
+    for s in sorted(trace.spans, key=lambda s: s['startMs']):
+        entry = f"{_metric_name(s['name'])};dur={s['durationMs']:.1f}"
+        label = s['attrs'].get('trait')
+        if label:
+            entry += ';desc="' + str(label).replace('"', "'") + '"'
+        entries.append(entry)
+    entries.append(f"total;dur={total_ms:.1f}")
+    return ', '.join(entries)
+
+
+def _rotate():
+    try:
+        size = os.path.getsize(TRACE_EXPORT_PATH)
+    except OSError:
+        return
+    if size >= TRACE_EXPORT_MAX_BYTES:
+        os.replace(TRACE_EXPORT_PATH, TRACE_EXPORT_PATH + '.1')
+
+
+def export(trace, total_ms, status):
+    """Append the trace as one JSON line"""
+    if not TRACE_EXPORT_PATH:
+        return
+    line = json.dumps({
+        'traceId': trace.trace_id,
+        'name': trace.name,
+        'start': trace.wall_start,
+        'durationMs': round(total_ms, 3),
+        'status': status,
+        'pid': os.getpid(),
+        'spans': sorted(trace.spans, key=lambda s: s['startMs'])
+    })
+    try:
+        with _export_lock:
+            os.makedirs(os.path.dirname(TRACE_EXPORT_PATH) or '.', exist_ok=True)
+            _rotate()
+            with open(TRACE_EXPORT_PATH, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+    except Exception as e:
+        print(f"Trace export error: {str(e)}")
+
+
+def _finish(trace, token, response):
+    total_ms = trace.elapsed_ms()
+    _current_trace.reset(token)
+    response.headers['Server-Timing'] = server_timing(trace, total_ms)
+    export(trace, total_ms, response.status_code)
+    return response
+
+
+def traced(name):
+    """Trace a Flask view: Server-Timing header on the response plus a JSONL export"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not TRACING_ENABLED:
+                return view(*args, **kwargs)
+            from flask import make_response
+            trace, token = start_trace(name)
+            try:
+                response = make_response(view(*args, **kwargs))
+            except Exception:
+                _current_trace.reset(token)
+                raise
+            return _finish(trace, token, response)
+        return wrapper
+    return decorator
+
+
+def traced_async(name):
+    """Trace a Quart view (same output as traced)"""
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(*args, **kwargs):
+            if not TRACING_ENABLED:
+                return await view(*args, **kwargs)
+            from quart import make_response
+            trace, token = start_trace(name)
+            try:
+                response = await make_response(await view(*args, **kwargs))
+            except Exception:
+                _current_trace.reset(token)
+                raise
+            return _finish(trace, token, response)
+        return wrapper
+    return decorator
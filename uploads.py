@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Memory-bounded handling of uploaded candidate reports
+
+Uploads are parsed into SpooledTemporaryFiles that stay in memory up to UPLOAD_SPOOL_BYTES and
+move to a temporary file on disk beyond that, and PDF extraction reads straight from that file.
+Requests are rejected before their body is read when they announce more than MAX_REQUEST_BYTES
+(413), or when the uploads already being handled by this process plus this one would exceed
+MAX_INFLIGHT_UPLOAD_BYTES (503 with Retry-After). A single file over MAX_UPLOAD_BYTES is a 413.
+"""
+import functools
+import os
+import tempfile
+import threading
+
+# Whole request body (file plus form fields); also the framework's MAX_CONTENT_LENGTH
+MAX_REQUEST_BYTES = int(os.environ.get('MAX_REQUEST_BYTES', 12 * 1024 * 1024))
+# One uploaded file
+MAX_UPLOAD_BYTES = int(os.environ.get('MAX_UPLOAD_BYTES', 10 * 1024 * 1024))
+# Uploaded files larger than this are spooled to disk
+UPLOAD_SPOOL_BYTES = int(os.environ.get('UPLOAD_SPOOL_BYTES', 512 * 1024))
+# Upload bytes this process may be handling at once
+MAX_INFLIGHT_UPLOAD_BYTES = int(os.environ.get('MAX_INFLIGHT_UPLOAD_BYTES', 64 * 1024 * 1024))
+UPLOAD_RETRY_AFTER = 2
+
+
+def spooled_stream_factory(total_content_length, content_type, filename=None, content_length=None):
+    """Stream factory for the multipart parsers: memory first, disk above UPLOAD_SPOOL_BYTES"""
+    return tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES, mode='w+b')
+
+
+def file_size(file_storage):
+    """Size in bytes of an uploaded file, leaving the stream where it was"""
+    stream = file_storage.stream
+    position = stream.tell()
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(position)
+    return size
+
+
+class _InflightBytes:
+    """Upload bytes admitted and not yet finished in this process"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.lock = threading.Lock()
+        self.current = 0
+
+    def reserve(self, size):
+        with self.lock:
+            # One request may always run on an idle process, whatever its size
+            if self.current and self.current + size > self.limit:
+                return False
+            self.current += size
+            return True
+
+    def release(self, size):
+        with self.lock:
+            self.current -= size
+
+
+inflight = _InflightBytes(MAX_INFLIGHT_UPLOAD_BYTES)
+
+
+def _reservation(content_length):
+    # Chunked bodies have no length up front; the framework still cuts them off at MAX_REQUEST_BYTES
+    return MAX_REQUEST_BYTES if content_length is None else content_length
+
+
+def _too_large(jsonify, message):
+    response = jsonify({'error': message})
+    response.status_code = 413
+    return response
+
+
+def _busy(jsonify):
+    response = jsonify({
+        'error': 'Server is busy handling other uploads. Please try again shortly.',
+        'retryAfter': UPLOAD_RETRY_AFTER
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(UPLOAD_RETRY_AFTER)
+    return response
+
+
+def _oversized_file(files):
+    for file_storage in files.values():
+        if file_size(file_storage) > MAX_UPLOAD_BYTES:
+            return file_storage.filename
+    return None
+
+
+def upload_limited(view):
+    """Decorate a Flask view taking a file upload with the size limits and the in-flight byte cap.
+
+    Put it above rate_limited so oversized or excess uploads are turned away before the cost
+    estimate reads the form.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        from flask import request, jsonify
+        from werkzeug.exceptions import RequestEntityTooLarge
+
+        size = _reservation(request.content_length)
+        if size > MAX_REQUEST_BYTES:
+            return _too_large(jsonify, f'Request is larger than {MAX_REQUEST_BYTES} bytes')
+        if not inflight.reserve(size):
+            print(f"Upload rejected on {request.path}: {inflight.current} bytes in flight, {size} requested")
+            return _busy(jsonify)
+        try:
+            try:
+                oversized = _oversized_file(request.files)
+            except RequestEntityTooLarge:
+                return _too_large(jsonify, f'Request is larger than {MAX_REQUEST_BYTES} bytes')
+            if oversized:
+                return _too_large(jsonify, f'{oversized} is larger than {MAX_UPLOAD_BYTES} bytes')
+            return view(*args, **kwargs)
+        finally:
+            inflight.release(size)
+    return wrapper
+
+
+def upload_limited_async(view):
+    """Quart variant of upload_limited"""
+    @functools.wraps(view)
+    async def wrapper(*args, **kwargs):
+        from quart import request, jsonify
+        from werkzeug.exceptions import RequestEntityTooLarge
+
+        size = _reservation(request.content_length)
+        if size > MAX_REQUEST_BYTES:
+            return _too_large(jsonify, f'Request is larger than {MAX_REQUEST_BYTES} bytes')
+        if not inflight.reserve(size):
+            print(f"Upload rejected on {request.path}: {inflight.current} bytes in flight, {size} requested")
+            return _busy(jsonify)
+        try:
+            try:
+                oversized = _oversized_file(await request.files)
+            except RequestEntityTooLarge:
+                return _too_large(jsonify, f'Request is larger than {MAX_REQUEST_BYTES} bytes')
+            if oversized:
+                return _too_large(jsonify, f'{oversized} is larger than {MAX_UPLOAD_BYTES} bytes')
+            return await view(*args, **kwargs)
+        finally:
+            inflight.release(size)
+    return wrapper
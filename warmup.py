@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Per-worker warm-up and the readiness state behind /readyz
+
+A freshly started worker pays on its first requests for ReportLab styles and fonts, catalog
+parsing and the first TLS handshake with the LLM API. With WARM_UP=1 (the default) every
+worker runs those steps in the background as soon as it starts and only reports ready once
+they are done, so a load balancer polling /readyz sends it traffic when it is hot. /healthz
+(liveness) answers regardless.
+
+A failing step is logged and recorded but does not keep the worker out of rotation; warm-up
+only makes the first requests faster, they work without it.
+
+Settings: WARM_UP (default 1), WARM_UP_TIMEOUT (seconds for the LLM connection step, default 10).
+"""
+import contextlib
+import os
+import threading
+import time
+
+WARM_UP = os.environ.get('WARM_UP', '1') == '1'
+WARM_UP_TIMEOUT = float(os.environ.get('WARM_UP_TIMEOUT', 10))
+
+_lock = threading.Lock()
+_state = {'pid': None, 'status': 'pending', 'startedAt': None, 'finishedAt': None, 'steps': []}
+
+
+def begin():
+    """Start a warm-up in this process; False if one has already started here"""
+    with _lock:
+        if _state['pid'] == os.getpid():
+            return False
+        # A worker forked after its parent started warming up starts over
+        _state.update(pid=os.getpid(), status='warming', startedAt=time.time(), finishedAt=None, steps=[])
+    print(f"Warm-up started in worker {os.getpid()}")
+    return True
+
+
+@contextlib.contextmanager
+def step(name):
+    """Time one warm-up step, recording (not raising) its error"""
+    start = time.perf_counter()
+    entry = {'name': name, 'ok': True}
+    try:
+        yield
+    except Exception as e:
+        print(f"Warm-up step {name} failed: {str(e)}")
+        entry.update(ok=False, error=str(e))
+    entry['ms'] = round((time.perf_counter() - start) * 1000, 1)
+    with _lock:
+        _state['steps'].append(entry)
+
+
+def finish():
+    with _lock:
+        _state.update(status='ready', finishedAt=time.time())
+        total = sum(entry['ms'] for entry in _state['steps'])
+    print(f"Warm-up finished in worker {os.getpid()} ({total:.0f} ms)")
+
+
+def run(steps):
+    """Run (name, fn) steps in order and mark this process ready"""
+    for name, fn in steps:
+        with step(name):
+            fn()
+    finish()
+
+
+def start(steps):
+    """Warm this process up in a background thread (once per process; no-op unless WARM_UP)"""
+    if not WARM_UP or not begin():
+        return
+    threading.Thread(target=run, args=(steps,), name='warm-up', daemon=True).start()
+
+
+def _ready(current):
+    return not WARM_UP or (current and _state['status'] == 'ready')
+
+
+def ready():
+    """Whether this process should take traffic"""
+    with _lock:
+        return _ready(_state['pid'] == os.getpid())
+
+
+def status():
+    """What /readyz reports"""
+    with _lock:
+        current = _state['pid'] == os.getpid()
+        return {
+            'ready': _ready(current),
+            'warmUp': WARM_UP,
+            'pid': os.getpid(),
+            'status': _state['status'] if current else 'pending',
+            'startedAt': _state['startedAt'] if current else None,
+            'finishedAt': _state['finishedAt'] if current else None,
+            'steps': [dict(entry) for entry in _state['steps']] if current else []
+        }
+